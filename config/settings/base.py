@@ -1,6 +1,7 @@
 """
 Base settings to build other settings files upon.
 """
+import tempfile
 from pathlib import Path
 
 import environ
@@ -67,6 +68,7 @@ DJANGO_APPS = [
     "django.contrib.staticfiles",
     # "django.contrib.humanize", # Handy template tags
     "django.contrib.admin",
+    "django.contrib.postgres",
     "django.forms",
 ]
 THIRD_PARTY_APPS = [
@@ -277,4 +279,33 @@ SOCIALACCOUNT_FORMS = {"signup": "neurohub.users.forms.UserSocialSignupForm"}
 # ------------------------------------------------------------------------------
 CRF_TABLE_PATH = "CRF.xlsx"
 PYLABBER_TABLE_PATH = "pylabber.csv"
+# Directory holding columnar copies of the external tables above.
+EXTERNAL_TABLE_CACHE_DIR = env(
+    "EXTERNAL_TABLE_CACHE_DIR", default=str(ROOT_DIR / "external_tables")
+)
 QUESTIONNAIRE_PATH = "questionnaire.xlsx"
+# Parquet dataset holding the tables of tensor derivatives.
+DERIVATIVE_STORE_DIR = env(
+    "DERIVATIVE_STORE_DIR", default=str(ROOT_DIR / "derivative_store")
+)
+# Directory holding aggregated long-format tensor derivative tables.
+DERIVATIVE_TABLE_CACHE_DIR = env(
+    "DERIVATIVE_TABLE_CACHE_DIR", default=str(ROOT_DIR / "derivative_tables")
+)
+# Local directory holding decompressed copies of .nii.gz files.
+NIFTI_SCRATCH_DIR = env(
+    "NIFTI_SCRATCH_DIR", default=str(Path(tempfile.gettempdir()) / "neurohub-nifti")
+)
+# Maximal total size (in bytes) of the decompressed copies.
+NIFTI_SCRATCH_MAX_BYTES = env.int("NIFTI_SCRATCH_MAX_BYTES", default=20 * 1024**3)
+# Directory holding gzip seek indices of .nii.gz files.
+NIFTI_GZIP_INDEX_DIR = env("NIFTI_GZIP_INDEX_DIR", default=str(ROOT_DIR / "gzip_index"))
+# Maximal estimated memory footprint (in bytes) of the process-wide file cache.
+FILE_CACHE_MAX_BYTES = env.int("FILE_CACHE_MAX_BYTES", default=1024**3)
+# Callable fetching hourly weather data of a date range, swappable for
+# neurohub.base_models.weather.read_weather_file to work offline.
+WEATHER_FETCHER = env(
+    "WEATHER_FETCHER", default="neurohub.base_models.weather.fetch_meteostat"
+)
+# CSV file of hourly weather data read by read_weather_file.
+WEATHER_FILE = env("WEATHER_FILE", default=str(ROOT_DIR / "weather.csv"))
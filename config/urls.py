@@ -18,6 +18,7 @@ urlpatterns = [
     path("users/", include("neurohub.users.urls", namespace="users")),
     path("accounts/", include("allauth.urls")),
     # Your stuff: custom urls includes go here
+    path("scans/", include("neurohub.base_models.urls", namespace="base_models")),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
 
@@ -1,3 +1,246 @@
-from django.contrib import admin  # noqa: F401
+from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import IntegerField, OuterRef, QuerySet, Subquery
+from django.utils.functional import cached_property
 
-# Register your models here.
+from neurohub.base_models.models import (
+    Condition,
+    Group,
+    NIfTI,
+    Session,
+    Study,
+    Subject,
+    TensorDerivative,
+)
+
+#: Tables estimated to hold fewer rows than this are counted exactly.
+EXACT_COUNT_THRESHOLD: int = 10000
+
+
+def get_estimated_count(model) -> int:
+    """
+    Returns the planner's estimate of the number of rows in a model's table,
+    which is read from the catalog instead of scanning the table.
+
+    Parameters
+    ----------
+    model : type[models.Model]
+        Model class
+
+    Returns
+    -------
+    int
+        Estimated number of rows, or -1 if the table was never analyzed
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else -1
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginates unfiltered querysets of large tables using the estimated row
+    count rather than a full ``COUNT(*)``.
+    """
+
+    @cached_property
+    def count(self) -> int:
+        if isinstance(self.object_list, QuerySet) and not self.object_list.query.where:
+            estimate = get_estimated_count(self.object_list.model)
+            if estimate >= EXACT_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class SubqueryCount(Subquery):
+    """
+    Counts the rows of a correlated subquery. Unlike aggregating over joins,
+    it is only evaluated for the rows of the displayed page and several
+    counts do not multiply each other.
+    """
+
+    template = "(SELECT COUNT(*) FROM (%(subquery)s) _count)"
+    output_field = IntegerField()
+
+
+def count_related(model, field: str) -> SubqueryCount:
+    """
+    Returns an annotation counting the *model* rows whose *field* refers to
+    the outer row.
+
+    Parameters
+    ----------
+    model : type[models.Model]
+        Related model class
+    field : str
+        Name of the field referring to the outer row
+
+    Returns
+    -------
+    SubqueryCount
+        Count annotation
+    """
+    return SubqueryCount(model.objects.filter(**{field: OuterRef("pk")}).values("pk"))
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Base admin for tables that may hold many rows.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(Subject)
+class SubjectAdmin(LargeTableAdmin):
+    list_display = ["pylabber_id", "first_name", "last_name", "session_count"]
+    search_fields = ["pylabber_id", "first_name", "last_name"]
+
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(session_count=count_related(Session, "subject"))
+        )
+
+    @admin.display(description="sessions", ordering="session_count")
+    def session_count(self, obj):
+        return obj.session_count
+
+
+@admin.register(Session)
+class SessionAdmin(LargeTableAdmin):
+    list_display = ["__str__", "bids_dir", "time", "nifti_count", "derivative_count"]
+    list_select_related = ["subject"]
+    search_fields = ["bids_dir", "subject__pylabber_id"]
+    date_hierarchy = "time"
+    raw_id_fields = ["subject"]
+
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(
+                nifti_count=count_related(NIfTI, "session"),
+                derivative_count=count_related(TensorDerivative, "session_parent"),
+            )
+        )
+
+    @admin.display(description="NIfTI files", ordering="nifti_count")
+    def nifti_count(self, obj):
+        return obj.nifti_count
+
+    @admin.display(description="derivatives", ordering="derivative_count")
+    def derivative_count(self, obj):
+        return obj.derivative_count
+
+
+@admin.register(NIfTI)
+class NIfTIAdmin(LargeTableAdmin):
+    list_display = [
+        "path",
+        "session",
+        "datatype",
+        "suffix",
+        "shape",
+        "is_raw",
+        "derivative_count",
+    ]
+    list_select_related = ["session"]
+    list_filter = ["datatype", "suffix", "is_raw"]
+    search_fields = ["path"]
+    raw_id_fields = ["parent", "session"]
+
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(derivative_count=count_related(TensorDerivative, "nifti_parent"))
+        )
+
+    @admin.display(description="derivatives", ordering="derivative_count")
+    def derivative_count(self, obj):
+        return obj.derivative_count
+
+
+@admin.register(TensorDerivative)
+class TensorDerivativeAdmin(LargeTableAdmin):
+    list_display = [
+        "path",
+        "subject",
+        "session",
+        "acquisition",
+        "atlas",
+        "label",
+        "software_used",
+        "session_parent",
+    ]
+    list_select_related = ["session_parent"]
+    list_filter = ["software_used", "atlas", "label"]
+    search_fields = ["path", "subject"]
+    raw_id_fields = ["nifti_parent", "session_parent"]
+
+
+class SubjectSessionCollectionAdmin(admin.ModelAdmin):
+    """
+    Base admin for models grouping subjects and sessions.
+    """
+
+    list_display = ["title", "subject_count", "session_count"]
+    search_fields = ["title"]
+    autocomplete_fields = ["subjects", "sessions"]
+
+    def get_queryset(self, request):
+        through_subjects = self.model.subjects.through
+        through_sessions = self.model.sessions.through
+        field = self.model._meta.model_name
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(
+                subject_count=count_related(through_subjects, field),
+                session_count=count_related(through_sessions, field),
+            )
+        )
+
+    @admin.display(description="subjects", ordering="subject_count")
+    def subject_count(self, obj):
+        return obj.subject_count
+
+    @admin.display(description="sessions", ordering="session_count")
+    def session_count(self, obj):
+        return obj.session_count
+
+
+@admin.register(Group)
+class GroupAdmin(SubjectSessionCollectionAdmin):
+    pass
+
+
+@admin.register(Condition)
+class ConditionAdmin(SubjectSessionCollectionAdmin):
+    pass
+
+
+@admin.register(Study)
+class StudyAdmin(admin.ModelAdmin):
+    list_display = ["title", "group_list", "condition_list"]
+    search_fields = ["title"]
+    filter_horizontal = ["groups", "conditions"]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related("groups", "conditions")
+
+    @admin.display(description="groups")
+    def group_list(self, obj):
+        return ", ".join(group.title for group in obj.groups.all())
+
+    @admin.display(description="conditions")
+    def condition_list(self, obj):
+        return ", ".join(condition.title for condition in obj.conditions.all())
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ModelsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "neurohub.base_models"
+
+    def ready(self):
+        import neurohub.base_models.signals  # noqa F401
@@ -0,0 +1,116 @@
+"""
+A fast parser of BIDS entities from file paths, equivalent to pybids'
+:func:`~bids.layout.parse_file_entities` with its default "bids" and
+"derivatives" configurations, but with precompiled patterns and memoized
+results instead of loading the configurations on every call.
+"""
+import re
+from collections.abc import Iterable
+from functools import lru_cache
+from pathlib import Path
+
+from bids.layout.utils import PaddedInt
+
+#: Maximal number of memoized paths.
+PARSE_CACHE_SIZE: int = 65536
+
+_LABEL = r"([a-zA-Z0-9+]+)"
+
+#: Entity patterns (and value types), in pybids' configuration order.
+ENTITY_PATTERNS: dict[str, tuple[str, type]] = {
+    "subject": (rf"[/\\]+sub-{_LABEL}", str),
+    "session": (rf"[_/\\]+ses-{_LABEL}", str),
+    "sample": (rf"[_/\\]+sample-{_LABEL}", str),
+    "task": (rf"[_/\\]+task-{_LABEL}", str),
+    "tracksys": (rf"[_/\\]+tracksys-{_LABEL}", str),
+    "acquisition": (rf"[_/\\]+acq-{_LABEL}", str),
+    "nucleus": (rf"[_/\\]+nuc-{_LABEL}", str),
+    "volume": (rf"[_/\\]+voi-{_LABEL}", str),
+    "ceagent": (rf"[_/\\]+ce-{_LABEL}", str),
+    "staining": (rf"[_/\\]+stain-{_LABEL}", str),
+    "tracer": (rf"[_/\\]+trc-{_LABEL}", str),
+    "reconstruction": (rf"[_/\\]+rec-{_LABEL}", str),
+    "direction": (rf"[_/\\]+dir-{_LABEL}", str),
+    "run": (r"[_/\\]+run-(\d+)", PaddedInt),
+    "proc": (rf"[_/\\]+proc-{_LABEL}", str),
+    "modality": (rf"[_/\\]+mod-{_LABEL}", str),
+    "echo": (r"[_/\\]+echo-([0-9]+)", str),
+    "flip": (r"[_/\\]+flip-([0-9]+)", str),
+    "inv": (r"[_/\\]+inv-([0-9]+)", str),
+    "mt": (r"[_/\\]+mt-(on|off)", str),
+    "part": (r"[_/\\]+part-(imag|mag|phase|real)", str),
+    "recording": (rf"[_/\\]+recording-{_LABEL}", str),
+    "space": (rf"[_/\\]+space-{_LABEL}", str),
+    "chunk": (r"[_/\\]+chunk-([0-9]+)", str),
+    "suffix": (r"(?:^|[_/\\])([a-zA-Z0-9+]+)\.[^/\\]+$", str),
+    "scans": (r"(.*\_scans.tsv)$", str),
+    "fmap": (r"(phasediff|magnitude[1-2]|phase[1-2]|fieldmap|epi)\.nii", str),
+    "datatype": (
+        r"[/\\]+(anat|beh|dwi|eeg|fmap|func|ieeg|meg|micr|motion|mrs|nirs|perf|pet)"
+        r"[/\\]+",
+        str,
+    ),
+    "extension": (r"[^./\\](\.[^/\\]+)$", str),
+    "atlas": (rf"atlas-{_LABEL}", str),
+    "roi": (rf"roi-{_LABEL}", str),
+    "label": (rf"label-{_LABEL}", str),
+    "desc": (rf"desc-{_LABEL}", str),
+    "from": (rf"(?:^|_)from-{_LABEL}.*xfm", str),
+    "to": (rf"(?:^|_)to-{_LABEL}.*xfm", str),
+    "mode": (rf"(?:^|_)mode-{_LABEL}.*xfm", str),
+    "hemi": (r"hemi-(L|R)", str),
+    "segmentation": (rf"seg-{_LABEL}", str),
+    "res": (rf"res-{_LABEL}", str),
+    "den": (rf"den-{_LABEL}", str),
+    "model": (rf"model-{_LABEL}", str),
+    "subset": (rf"subset-{_LABEL}", str),
+}
+
+_COMPILED_PATTERNS = [
+    (entity, re.compile(pattern), dtype)
+    for entity, (pattern, dtype) in ENTITY_PATTERNS.items()
+]
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_entities(path: str) -> tuple[tuple[str, object], ...]:
+    entities = []
+    for entity, regex, dtype in _COMPILED_PATTERNS:
+        match = regex.search(path)
+        if match is not None:
+            entities.append((entity, dtype(match.group(1))))
+    return tuple(entities)
+
+
+def parse_entities(path: str | Path) -> dict:
+    """
+    Parses the BIDS entities of a file path. Results are memoized by path.
+
+    Parameters
+    ----------
+    path : str | Path
+        File path
+
+    Returns
+    -------
+    dict
+        Entity values by name, only including matched entities
+    """
+    return dict(_parse_entities(str(path)))
+
+
+def parse_entities_batch(paths: Iterable[str | Path]) -> list[dict]:
+    """
+    Parses the BIDS entities of multiple file paths.
+
+    Parameters
+    ----------
+    paths : Iterable[str | Path]
+        File paths
+
+    Returns
+    -------
+    list[dict]
+        Entity values by name of each path
+    """
+    return [parse_entities(path) for path in paths]
@@ -0,0 +1,219 @@
+"""
+Streamed content hashing of NIfTI files and their associated files, used to
+detect duplicate exports of the same acquisition.
+"""
+import hashlib
+import os
+from collections import defaultdict
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.db.models import Count, QuerySet
+
+from neurohub.base_models.models import NIfTI
+
+#: Hash algorithm, as named by :mod:`hashlib`.
+HASH_ALGORITHM: str = "sha256"
+
+#: Default number of bytes read at once.
+DEFAULT_CHUNK_SIZE: int = 1024 * 1024
+
+#: Number of rows updated per query.
+UPDATE_BATCH_SIZE: int = 1000
+
+#: :class:`~neurohub.base_models.models.nifti.NIfTI` fields updated when
+#: checksums are recomputed.
+CHECKSUM_FIELDS = ["content_hash", "file_hashes", "content_hash_mtime_ns"]
+
+
+def hash_file(path: Path, chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+    """
+    Computes the digest of a file's contents, reading it in chunks so that
+    memory use does not depend on the file size. :mod:`hashlib` releases the
+    GIL while hashing, so files may be hashed concurrently in threads.
+
+    Parameters
+    ----------
+    path : Path
+        File path
+    chunk_size : int, optional
+        Number of bytes read at once, by default 1 MiB
+
+    Returns
+    -------
+    str
+        Hexadecimal digest
+    """
+    digest = hashlib.new(HASH_ALGORITHM)
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_file_key(path: Path) -> str:
+    """
+    Returns the name by which a file's hash is stored, its extension(s), so
+    that the hashes of copies of the same data under different names match.
+
+    Parameters
+    ----------
+    path : Path
+        File path
+
+    Returns
+    -------
+    str
+        File key (e.g. ".nii.gz")
+    """
+    return "".join(Path(path).suffixes)
+
+
+def combine_hashes(file_hashes: dict[str, str]) -> str:
+    """
+    Combines the hashes of a set of files into a single content hash.
+
+    Parameters
+    ----------
+    file_hashes : dict[str, str]
+        Digest by file key
+
+    Returns
+    -------
+    str
+        Hexadecimal digest
+    """
+    digest = hashlib.new(HASH_ALGORITHM)
+    for key, value in sorted(file_hashes.items()):
+        digest.update(f"{key}:{value}\n".encode())
+    return digest.hexdigest()
+
+
+def get_latest_mtime(paths: list[Path]) -> int:
+    """
+    Returns the latest modification time of a set of files.
+
+    Parameters
+    ----------
+    paths : list[Path]
+        File paths
+
+    Returns
+    -------
+    int
+        Latest modification time in nanoseconds
+    """
+    return max(os.stat(path).st_mtime_ns for path in paths)
+
+
+def update_checksums(
+    niftis: QuerySet = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_workers: int = None,
+) -> int:
+    """
+    Hashes the files associated with each image in a thread pool and stores
+    the digests, skipping images none of whose files changed since they were
+    last hashed.
+
+    Parameters
+    ----------
+    niftis : QuerySet, optional
+        Images to process, by default all images
+    chunk_size : int, optional
+        Number of bytes read at once, by default 1 MiB
+    max_workers : int, optional
+        Number of threads, by default chosen by
+        :class:`~concurrent.futures.ThreadPoolExecutor`
+
+    Returns
+    -------
+    int
+        Number of (re)hashed images
+    """
+    if niftis is None:
+        niftis = NIfTI.objects.all()
+    stale = []
+    for nifti in niftis.only("id", "path", "content_hash", "content_hash_mtime_ns"):
+        try:
+            paths = nifti.get_file_paths()
+            mtime_ns = get_latest_mtime(paths)
+        except OSError:
+            continue
+        if nifti.content_hash is None or mtime_ns != nifti.content_hash_mtime_ns:
+            stale.append((nifti, paths, mtime_ns))
+    if not stale:
+        return 0
+    all_paths = [path for _, paths, _ in stale for path in paths]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        digests = dict(
+            zip(
+                all_paths,
+                executor.map(hash_file, all_paths, [chunk_size] * len(all_paths)),
+            )
+        )
+    for nifti, paths, mtime_ns in stale:
+        nifti.file_hashes = {get_file_key(path): digests[path] for path in paths}
+        nifti.content_hash = combine_hashes(nifti.file_hashes)
+        nifti.content_hash_mtime_ns = mtime_ns
+    NIfTI.objects.bulk_update(
+        [nifti for nifti, _, _ in stale],
+        CHECKSUM_FIELDS,
+        batch_size=UPDATE_BATCH_SIZE,
+    )
+    return len(stale)
+
+
+def find_duplicates(niftis: QuerySet = None) -> dict[str, list[str]]:
+    """
+    Groups images with identical contents.
+
+    Parameters
+    ----------
+    niftis : QuerySet, optional
+        Images to check, by default all images
+
+    Returns
+    -------
+    dict[str, list[str]]
+        Paths of the images sharing each duplicated content hash
+    """
+    if niftis is None:
+        niftis = NIfTI.objects.all()
+    duplicated = (
+        niftis.filter(content_hash__isnull=False)
+        .values("content_hash")
+        .annotate(count=Count("id"))
+        .filter(count__gt=1)
+        .values("content_hash")
+    )
+    groups = defaultdict(list)
+    rows = niftis.filter(content_hash__in=duplicated).order_by("path")
+    for content_hash, path in rows.values_list("content_hash", "path"):
+        groups[content_hash].append(path)
+    return dict(groups)
+
+
+def group_by_content(niftis: Iterable[NIfTI]) -> list[tuple[str, list[NIfTI]]]:
+    """
+    Groups images with identical contents, so that processing stages handle
+    each distinct acquisition once.
+
+    Parameters
+    ----------
+    niftis : Iterable[NIfTI]
+        Images to group
+
+    Returns
+    -------
+    list[tuple[str, list[NIfTI]]]
+        Content hash and images of each group, in order of first appearance;
+        images whose hash is missing or outdated form groups of their own
+        with a *None* hash
+    """
+    groups = defaultdict(list)
+    for nifti in niftis:
+        content_hash = nifti.get_current_content_hash()
+        groups[content_hash or f"#{nifti.pk}"].append(nifti)
+    return [(group[0].get_current_content_hash(), group) for group in groups.values()]
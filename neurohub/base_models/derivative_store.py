@@ -0,0 +1,361 @@
+"""
+A Parquet dataset holding the tables of all
+:class:`~neurohub.base_models.models.tensor_derivative.TensorDerivative`
+pickles, partitioned by estimator and atlas.
+
+Each derivative is stored as one file of its partition directory, with key
+columns identifying its subject, session, acquisition, label and regions.
+Cross-subject reads scan a single partition, push filters down to the Parquet
+reader and only read the requested metric columns.
+"""
+import hashlib
+import os
+import pickle
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from django.conf import settings
+from django.db.models import QuerySet
+
+#: Columns identifying the rows of stored derivative tables.
+STORE_KEY_COLUMNS = ("subject", "session", "acquisition", "label", "region")
+
+#: :class:`TensorDerivative` fields a derivative is converted from.
+CONVERTED_FIELDS = (
+    "path",
+    "software_used",
+    "atlas",
+    "subject",
+    "session",
+    "acquisition",
+    "label",
+)
+
+#: Errors raised when a derivative pickle cannot be read.
+DERIVATIVE_READ_ERRORS = (OSError, EOFError, pickle.UnpicklingError)
+
+
+def get_partition_dir(software_used: str, atlas: str) -> Path:
+    """
+    Returns the directory of the derivatives of an estimator and atlas.
+
+    Parameters
+    ----------
+    software_used : str
+        Tensor estimator
+    atlas : str
+        Parcellation atlas
+
+    Returns
+    -------
+    Path
+        Partition directory
+    """
+    root = Path(settings.DERIVATIVE_STORE_DIR)
+    return root / f"software_used={software_used}" / f"atlas={atlas}"
+
+
+def get_store_path(path: str, software_used: str, atlas: str) -> Path:
+    """
+    Returns the path of the stored copy of a derivative.
+
+    Parameters
+    ----------
+    path : str
+        Derivative pickle path
+    software_used : str
+        Tensor estimator
+    atlas : str
+        Parcellation atlas
+
+    Returns
+    -------
+    Path
+        Parquet file path
+    """
+    digest = hashlib.sha1(str(path).encode()).hexdigest()
+    return get_partition_dir(software_used, atlas) / f"{digest}.parquet"
+
+
+def is_stored(path: str, store_path: Path) -> bool:
+    """
+    Whether a derivative's stored copy exists and is not older than its
+    pickle.
+
+    Parameters
+    ----------
+    path : str
+        Derivative pickle path
+    store_path : Path
+        Stored copy path
+
+    Returns
+    -------
+    bool
+        Whether the stored copy is current
+    """
+    try:
+        return os.stat(store_path).st_mtime_ns >= os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def convert_derivative(
+    path: str,
+    software_used: str,
+    atlas: str,
+    subject: str = None,
+    session: str = None,
+    acquisition: str = None,
+    label: str = None,
+    force: bool = False,
+) -> bool:
+    """
+    Writes a derivative pickle to its partition of the store, unless its
+    stored copy is current. Runs inside worker processes, so it must not
+    touch the database.
+
+    Parameters
+    ----------
+    path : str
+        Derivative pickle path
+    software_used : str
+        Tensor estimator
+    atlas : str
+        Parcellation atlas
+    subject : str, optional
+        Subject label
+    session : str, optional
+        Session label
+    acquisition : str, optional
+        Acquisition label
+    label : str, optional
+        Derivative label
+    force : bool, optional
+        Whether to convert the pickle even if its stored copy is current, by
+        default False
+
+    Returns
+    -------
+    bool
+        Whether the derivative was written; tables that cannot be stored in
+        Parquet are left to be read from their pickle
+    """
+    if software_used is None or atlas is None:
+        return False
+    store_path = get_store_path(path, software_used, atlas)
+    if not force and is_stored(path, store_path):
+        return False
+    table = pd.read_pickle(path).copy()
+    keys = {
+        "subject": subject,
+        "session": session,
+        "acquisition": acquisition,
+        "label": label,
+        "region": list(table.index.astype(str)),
+    }
+    if set(keys).intersection(map(str, table.columns)):
+        return False
+    for column, value in keys.items():
+        # Typed as strings even if missing, so that all files share a schema.
+        table[column] = pd.Series(value, index=table.index, dtype="string")
+    store_path.parent.mkdir(parents=True, exist_ok=True)
+    temporary_path = store_path.with_name(f".{store_path.name}.{os.getpid()}")
+    try:
+        table.to_parquet(temporary_path)
+    except (ValueError, TypeError):
+        temporary_path.unlink(missing_ok=True)
+        return False
+    os.replace(temporary_path, store_path)
+    return True
+
+
+def _convert_fields(fields: dict) -> bool:
+    try:
+        return convert_derivative(**fields)
+    except DERIVATIVE_READ_ERRORS:
+        return False
+
+
+def convert_derivatives(
+    derivatives: QuerySet, max_workers: int = None, force: bool = False
+) -> int:
+    """
+    Writes derivative pickles to the store in a process pool, skipping those
+    whose stored copy is current.
+
+    Parameters
+    ----------
+    derivatives : QuerySet
+        :class:`~neurohub.base_models.models.tensor_derivative.TensorDerivative`
+        rows
+    max_workers : int, optional
+        Number of converting processes, by default the number of CPUs
+    force : bool, optional
+        Whether to convert pickles even if their stored copy is current, by
+        default False
+
+    Returns
+    -------
+    int
+        Number of written derivatives
+    """
+    rows = [
+        {**fields, "force": force}
+        for fields in derivatives.filter(
+            software_used__isnull=False, atlas__isnull=False
+        ).values(*CONVERTED_FIELDS)
+    ]
+    if not rows:
+        return 0
+    max_workers = max_workers or os.cpu_count()
+    chunksize = max(1, len(rows) // (max_workers * 4))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return sum(executor.map(_convert_fields, rows, chunksize=chunksize))
+
+
+def read_stored_derivative(store_path: Path) -> pd.DataFrame:
+    """
+    Reads a derivative's table from its stored copy.
+
+    Parameters
+    ----------
+    store_path : Path
+        Stored copy path
+
+    Returns
+    -------
+    pd.DataFrame
+        Derivative table, as stored in its pickle
+    """
+    return pd.read_parquet(store_path).drop(columns=list(STORE_KEY_COLUMNS))
+
+
+def merge_types(types: list[pa.DataType]) -> pa.DataType:
+    """
+    Returns a type all values of a column stored with different types can be
+    read as.
+
+    Parameters
+    ----------
+    types : list[pa.DataType]
+        Types of the column in different files
+
+    Returns
+    -------
+    pa.DataType
+        Common type: the shared type, float64 for mixed numeric types, or
+        string otherwise
+    """
+    types = {data_type for data_type in types if not pa.types.is_null(data_type)}
+    if not types:
+        return pa.null()
+    if len(types) == 1:
+        return types.pop()
+    if all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in types):
+        return pa.float64()
+    return pa.string()
+
+
+def read_partition_schema(paths: list[str]) -> tuple[pa.Schema, set[str]]:
+    """
+    Reads the schemas of a partition's files and merges them, so that metrics
+    missing from some files and integer metrics stored as floats elsewhere are
+    still read.
+
+    Parameters
+    ----------
+    paths : list[str]
+        Parquet file paths
+
+    Returns
+    -------
+    tuple[pa.Schema, set[str]]
+        Merged schema and names of the columns holding pandas index levels
+    """
+    schemas = [pq.read_schema(path) for path in paths]
+    index_columns = {
+        name
+        for schema in schemas
+        for name in (schema.pandas_metadata or {}).get("index_columns", [])
+        # Range indices are stored as metadata rather than as columns.
+        if isinstance(name, str)
+    }
+    types = {}
+    for schema in schemas:
+        for field in schema:
+            types.setdefault(field.name, []).append(field.type)
+    merged = pa.schema([(name, merge_types(column)) for name, column in types.items()])
+    return merged, index_columns
+
+
+def read_derivative_store(
+    software_used: str,
+    atlas: str,
+    subjects: Iterable[str] = None,
+    sessions: Iterable[str] = None,
+    regions: Iterable[str] = None,
+    metrics: Iterable[str] = None,
+) -> pd.DataFrame:
+    """
+    Reads the stored derivatives of an estimator and atlas, only reading the
+    rows of the given subjects, sessions and regions and the given metric
+    columns.
+
+    Parameters
+    ----------
+    software_used : str
+        Tensor estimator
+    atlas : str
+        Parcellation atlas
+    subjects : Iterable[str], optional
+        Subject labels, by default all
+    sessions : Iterable[str], optional
+        Session labels, by default all
+    regions : Iterable[str], optional
+        Region names, by default all
+    metrics : Iterable[str], optional
+        Metric columns, by default all
+
+    Returns
+    -------
+    pd.DataFrame
+        Key columns (see :data:`STORE_KEY_COLUMNS`) and metric columns
+    """
+    partition = get_partition_dir(software_used, atlas)
+    if not partition.is_dir():
+        return pd.DataFrame(columns=list(STORE_KEY_COLUMNS))
+    files = ds.dataset(partition, format="parquet").files
+    if not files:
+        # Every derivative of the partition was removed.
+        return pd.DataFrame(columns=list(STORE_KEY_COLUMNS))
+    schema, index_columns = read_partition_schema(files)
+    dataset = ds.dataset(files, schema=schema, format="parquet")
+    available = [
+        name
+        for name in schema.names
+        if name not in STORE_KEY_COLUMNS and name not in index_columns
+    ]
+    if metrics is not None:
+        metrics = set(metrics)
+        available = [name for name in available if name in metrics]
+    expression = None
+    for column, values in (
+        ("subject", subjects),
+        ("session", sessions),
+        ("region", regions),
+    ):
+        if values is None:
+            continue
+        condition = pc.field(column).isin(list(values))
+        expression = condition if expression is None else expression & condition
+    table = dataset.to_table(
+        columns=[*STORE_KEY_COLUMNS, *available], filter=expression
+    )
+    return table.to_pandas(ignore_metadata=True)
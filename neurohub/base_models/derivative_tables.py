@@ -0,0 +1,228 @@
+"""
+Aggregation of many :class:`~neurohub.base_models.models.tensor_derivative.TensorDerivative`
+tables into a single long-format table.
+
+Derivative files are loaded in a process pool and stacked once. Aggregated
+tables are written to one Parquet file per query, named by a signature of
+their member derivatives, so they are reused until a derivative is added,
+removed or modified, and replaced when it is.
+"""
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+from django.conf import settings
+from django.db.models import QuerySet
+
+from neurohub.base_models.derivative_store import DERIVATIVE_READ_ERRORS
+
+#: Columns of long-format derivative tables.
+LONG_FORMAT_COLUMNS = ("subject", "session", "region", "metric", "value")
+
+#: Key columns of long-format derivative tables, stored as categoricals.
+LONG_FORMAT_KEYS = ("subject", "session", "region", "metric")
+
+
+def to_long_format(table: pd.DataFrame) -> pd.DataFrame:
+    """
+    Stacks a derivative table, whose rows are regions and whose numeric
+    columns are metrics, into one row per region and metric.
+
+    Parameters
+    ----------
+    table : pd.DataFrame
+        Derivative table
+
+    Returns
+    -------
+    pd.DataFrame
+        *region*, *metric* and *value* columns
+    """
+    table = table.select_dtypes("number")
+    if isinstance(table.columns, pd.MultiIndex):
+        table.columns = ["_".join(map(str, column)) for column in table.columns]
+    values = table.to_numpy(dtype=float)
+    regions = table.index.astype(str)
+    metrics = table.columns.astype(str)
+    return pd.DataFrame(
+        {
+            "region": regions.repeat(len(metrics)),
+            "metric": list(metrics) * len(regions),
+            "value": values.ravel(),
+        }
+    )
+
+
+def read_long_format(path: str) -> pd.DataFrame:
+    """
+    Reads a derivative file into long format. Runs inside worker processes,
+    so it must not touch the database.
+
+    Parameters
+    ----------
+    path : str
+        Derivative file path
+
+    Returns
+    -------
+    pd.DataFrame
+        *region*, *metric* and *value* columns
+    """
+    return to_long_format(pd.read_pickle(path))
+
+
+def _read_readable(path: str) -> pd.DataFrame:
+    try:
+        return read_long_format(path)
+    except DERIVATIVE_READ_ERRORS:
+        return None
+
+
+def get_signature(rows: list[tuple]) -> str:
+    """
+    Returns a value that changes whenever one of the given derivatives is
+    added, removed or modified.
+
+    Parameters
+    ----------
+    rows : list[tuple]
+        Primary key, path and modification time of each derivative
+
+    Returns
+    -------
+    str
+        Signature of the derivatives
+    """
+    digest = hashlib.sha256()
+    for pk, path, modified in sorted(rows):
+        digest.update(f"{pk}\0{path}\0{modified.isoformat()}\n".encode())
+    return digest.hexdigest()
+
+
+def get_query_key(derivatives: QuerySet) -> str:
+    """
+    Returns a value identifying the query selecting a set of derivatives, so
+    that each query keeps a single cached aggregate.
+
+    Parameters
+    ----------
+    derivatives : QuerySet
+        Derivatives query
+
+    Returns
+    -------
+    str
+        Query key
+    """
+    return hashlib.sha1(str(derivatives.query).encode()).hexdigest()
+
+
+def get_cache_path(key: str, signature: str) -> Path:
+    """
+    Returns the path of the cached aggregate of a set of derivatives.
+
+    Parameters
+    ----------
+    key : str
+        Key of the derivatives query, see :func:`get_query_key`
+    signature : str
+        Signature of the derivatives, see :func:`get_signature`
+
+    Returns
+    -------
+    Path
+        Parquet file path
+    """
+    return Path(settings.DERIVATIVE_TABLE_CACHE_DIR) / f"{key}-{signature}.parquet"
+
+
+def stack_derivatives(
+    rows: list[tuple], max_workers: int = None
+) -> tuple[pd.DataFrame, list[str]]:
+    """
+    Loads derivative files in a process pool and stacks them into a single
+    long-format table, skipping files that cannot be read.
+
+    Parameters
+    ----------
+    rows : list[tuple]
+        Path, subject and session of each derivative
+    max_workers : int, optional
+        Number of loading processes, by default the number of CPUs
+
+    Returns
+    -------
+    tuple[pd.DataFrame, list[str]]
+        Long-format table (see :data:`LONG_FORMAT_COLUMNS`) and paths of the
+        unreadable files
+    """
+    tables = []
+    if rows:
+        paths = [path for path, _, _ in rows]
+        max_workers = max_workers or os.cpu_count()
+        chunksize = max(1, len(paths) // (max_workers * 4))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            tables = list(executor.map(_read_readable, paths, chunksize=chunksize))
+    unreadable = [row[0] for row, table in zip(rows, tables) if table is None]
+    readable = [(row, table) for row, table in zip(rows, tables) if table is not None]
+    if not readable:
+        empty = pd.DataFrame(columns=LONG_FORMAT_COLUMNS).astype(
+            {key: "category" for key in LONG_FORMAT_KEYS} | {"value": float}
+        )
+        return empty, unreadable
+    lengths = [len(table) for _, table in readable]
+    stacked = pd.concat([table for _, table in readable], ignore_index=True)
+    for position, key in enumerate(("subject", "session"), start=1):
+        values = pd.Series([row[position] for row, _ in readable]).repeat(lengths)
+        stacked.insert(position - 1, key, values.to_numpy())
+    return stacked.astype({key: "category" for key in LONG_FORMAT_KEYS}), unreadable
+
+
+def aggregate_derivatives(
+    derivatives: QuerySet, max_workers: int = None
+) -> pd.DataFrame:
+    """
+    Returns the tables of *derivatives* stacked into a single long-format
+    table, leaving out files that cannot be read. The result is cached on
+    disk until one of the derivatives is added, removed or modified, and the
+    previous aggregate of the same query is then replaced. Results missing
+    unreadable files are not cached.
+
+    Parameters
+    ----------
+    derivatives : QuerySet
+        :class:`~neurohub.base_models.models.tensor_derivative.TensorDerivative`
+        rows
+    max_workers : int, optional
+        Number of loading processes, by default the number of CPUs
+
+    Returns
+    -------
+    pd.DataFrame
+        Long-format table, see :data:`LONG_FORMAT_COLUMNS`
+    """
+    rows = list(
+        derivatives.order_by("subject", "session", "path").values_list(
+            "pk", "path", "modified", "subject", "session"
+        )
+    )
+    stacked_rows = [row[1:2] + row[3:] for row in rows]
+    if not rows:
+        return stack_derivatives(stacked_rows, max_workers)[0]
+    key = get_query_key(derivatives)
+    path = get_cache_path(key, get_signature([row[:3] for row in rows]))
+    if path.exists():
+        return pd.read_parquet(path)
+    stacked, unreadable = stack_derivatives(stacked_rows, max_workers)
+    if unreadable:
+        return stacked
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary_path = path.with_name(f".{path.name}.{os.getpid()}")
+    stacked.to_parquet(temporary_path, index=False)
+    os.replace(temporary_path, path)
+    for outdated in path.parent.glob(f"{key}-*.parquet"):
+        if outdated != path:
+            outdated.unlink(missing_ok=True)
+    return stacked
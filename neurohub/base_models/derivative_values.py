@@ -0,0 +1,266 @@
+"""
+A normalized table of the values of
+:class:`~neurohub.base_models.models.tensor_derivative.TensorDerivative`
+tables, one
+:class:`~neurohub.base_models.models.derivative_value.DerivativeValue` row per
+derivative, region and metric.
+
+Values are read in worker processes and written in bulk during ingestion.
+Region and metric names are stored once in lookup tables, so regional values
+of a whole cohort are read with a single indexed query.
+"""
+import os
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.db.models import QuerySet
+
+from neurohub.base_models.derivative_store import DERIVATIVE_READ_ERRORS
+from neurohub.base_models.derivative_tables import read_long_format
+from neurohub.base_models.models.derivative_value import DerivativeValue
+from neurohub.base_models.models.metric import Metric
+from neurohub.base_models.models.region import Region
+from neurohub.base_models.models.tensor_derivative import TensorDerivative
+
+#: Number of rows written per query.
+WRITE_BATCH_SIZE: int = 5000
+
+#: Number of derivatives whose values are read and written at once.
+DERIVATIVE_BATCH_SIZE: int = 500
+
+
+class RegionalValues(NamedTuple):
+    """
+    Values of a metric across derivatives, as parallel arrays.
+    """
+
+    subjects: np.ndarray
+    sessions: np.ndarray
+    regions: np.ndarray
+    values: np.ndarray
+
+
+def read_derivative_values(path: str) -> pd.DataFrame:
+    """
+    Reads the values of a derivative file. Runs inside worker processes, so
+    it must not touch the database.
+
+    Parameters
+    ----------
+    path : str
+        Derivative file path
+
+    Returns
+    -------
+    pd.DataFrame
+        *region*, *metric* and *value* columns, or *None* if the file cannot
+        be read
+    """
+    try:
+        return read_long_format(path)
+    except DERIVATIVE_READ_ERRORS:
+        return None
+
+
+def get_region_ids(regions: Iterable[tuple[str, str]]) -> dict[tuple, int]:
+    """
+    Returns the primary keys of regions, creating missing ones.
+
+    Parameters
+    ----------
+    regions : Iterable[tuple[str, str]]
+        Atlas and name of each region
+
+    Returns
+    -------
+    dict[tuple, int]
+        Primary key by atlas and name
+    """
+    regions = set(regions)
+    Region.objects.bulk_create(
+        [Region(atlas=atlas, name=name) for atlas, name in regions],
+        ignore_conflicts=True,
+    )
+    rows = Region.objects.filter(
+        atlas__in={atlas for atlas, _ in regions},
+        name__in={name for _, name in regions},
+    ).values_list("atlas", "name", "pk")
+    return {(atlas, name): pk for atlas, name, pk in rows}
+
+
+def get_metric_ids(metrics: Iterable[str]) -> dict[str, int]:
+    """
+    Returns the primary keys of metrics, creating missing ones.
+
+    Parameters
+    ----------
+    metrics : Iterable[str]
+        Metric names
+
+    Returns
+    -------
+    dict[str, int]
+        Primary key by name
+    """
+    metrics = set(metrics)
+    Metric.objects.bulk_create(
+        [Metric(name=name) for name in metrics], ignore_conflicts=True
+    )
+    return dict(Metric.objects.filter(name__in=metrics).values_list("name", "pk"))
+
+
+def write_derivative_values(
+    values: dict[str, pd.DataFrame], batch_size: int = WRITE_BATCH_SIZE
+) -> int:
+    """
+    Replaces the stored values of derivatives, using a fixed number of
+    queries per batch of rows. Derivatives whose file could not be read are
+    left without values.
+
+    Parameters
+    ----------
+    values : dict[str, pd.DataFrame]
+        Outputs of :func:`read_derivative_values` by derivative path
+    batch_size : int, optional
+        Number of rows written per query, by default 5000
+
+    Returns
+    -------
+    int
+        Number of written values
+    """
+    derivatives = list(
+        TensorDerivative.objects.filter(path__in=values).values_list(
+            "path", "pk", "atlas"
+        )
+    )
+    tables = [
+        values[path].assign(derivative=pk, atlas=atlas or "")
+        for path, pk, atlas in derivatives
+        if values[path] is not None
+    ]
+    rows = []
+    if tables:
+        table = pd.concat(tables, ignore_index=True)
+        region_ids = get_region_ids(zip(table["atlas"], table["region"]))
+        metric_ids = get_metric_ids(table["metric"])
+        rows = [
+            DerivativeValue(
+                derivative_id=derivative,
+                region_id=region_ids[atlas, region],
+                metric_id=metric_ids[metric],
+                value=None if np.isnan(value) else value,
+            )
+            for derivative, atlas, region, metric, value in zip(
+                table["derivative"],
+                table["atlas"],
+                table["region"],
+                table["metric"],
+                table["value"],
+            )
+        ]
+    with transaction.atomic():
+        DerivativeValue.objects.filter(
+            derivative_id__in=[pk for _, pk, _ in derivatives]
+        ).delete()
+        DerivativeValue.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def index_derivative_values(
+    derivatives: QuerySet,
+    max_workers: int = None,
+    batch_size: int = DERIVATIVE_BATCH_SIZE,
+) -> int:
+    """
+    Reads the values of derivatives in a process pool and stores them,
+    replacing previously stored values.
+
+    Parameters
+    ----------
+    derivatives : QuerySet
+        :class:`TensorDerivative` rows
+    max_workers : int, optional
+        Number of reading processes, by default the number of CPUs
+    batch_size : int, optional
+        Number of derivatives written at once, by default 500
+
+    Returns
+    -------
+    int
+        Number of written values
+    """
+    paths = iter(list(derivatives.values_list("path", flat=True)))
+    max_workers = max_workers or os.cpu_count()
+    count = 0
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        while batch := list(islice(paths, batch_size)):
+            chunksize = max(1, len(batch) // (max_workers * 4))
+            tables = executor.map(read_derivative_values, batch, chunksize=chunksize)
+            count += write_derivative_values(dict(zip(batch, tables)))
+    return count
+
+
+def get_regional_values(
+    metric: str,
+    atlas: str,
+    regions: Iterable[str] = None,
+    software_used: str = None,
+    label: str = None,
+    acquisition: str = None,
+) -> RegionalValues:
+    """
+    Returns the values of a metric in the regions of an atlas across all
+    derivatives, with a single indexed query.
+
+    Parameters
+    ----------
+    metric : str
+        Metric name
+    atlas : str
+        Parcellation atlas
+    regions : Iterable[str], optional
+        Region names, by default all
+    software_used : str, optional
+        Tensor estimator, by default any
+    label : str, optional
+        Derivative label, by default any
+    acquisition : str, optional
+        Acquisition label, by default any
+
+    Returns
+    -------
+    RegionalValues
+        Subject, session, region and value of each stored value
+    """
+    values = DerivativeValue.objects.filter(metric__name=metric, region__atlas=atlas)
+    if regions is not None:
+        values = values.filter(region__name__in=list(regions))
+    for field, value in (
+        ("software_used", software_used),
+        ("label", label),
+        ("acquisition", acquisition),
+    ):
+        if value is not None:
+            values = values.filter(**{f"derivative__{field}": value})
+    rows = list(
+        values.order_by("derivative__subject", "derivative__session", "region__name")
+        .values_list(
+            "derivative__subject", "derivative__session", "region__name", "value"
+        )
+        .iterator()
+    )
+    if not rows:
+        return RegionalValues(*(np.array([], dtype=object),) * 3, np.array([]))
+    subjects, sessions, names, numbers = zip(*rows)
+    return RegionalValues(
+        subjects=np.array(subjects, dtype=object),
+        sessions=np.array(sessions, dtype=object),
+        regions=np.array(names, dtype=object),
+        values=np.array(numbers, dtype=float),
+    )
@@ -0,0 +1,263 @@
+"""
+A cached source layer for the external subject tables (CRF, pylabber).
+
+Each table is parsed only when its source file changes. The parsed frame is
+indexed by its key column, written to a columnar sidecar file and shared
+through the Django cache (Redis in production), so that other processes can
+load it without parsing the source again. Within a process, the loaded frame
+is held by the process-wide file cache.
+"""
+import hashlib
+import os
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+
+from neurohub.base_models.file_cache import get_file_cache
+from neurohub.base_models.utils import read_pylabber_table, read_subject_table
+
+#: Cache key template of parsed external tables.
+EXTERNAL_TABLE_CACHE_KEY: str = "external-table:{name}:{version}"
+
+#: Cache key template of the latest cached version of an external table.
+EXTERNAL_TABLE_VERSION_KEY: str = "external-table:{name}"
+
+
+def prepare_crf_table(table: pd.DataFrame) -> pd.DataFrame:
+    """
+    Fills missing questionnaire IDs of the CRF table.
+
+    Parameters
+    ----------
+    table : pd.DataFrame
+        Parsed CRF table
+
+    Returns
+    -------
+    pd.DataFrame
+        Prepared CRF table
+    """
+    return table.assign(Questionnaire=table["Questionnaire"].fillna(""))
+
+
+class ExternalTable:
+    """
+    An external table read from the file given by a setting and indexed by
+    one of its columns.
+
+    Parameters
+    ----------
+    name : str
+        Table name, used in cache keys and sidecar file names
+    path_setting : str
+        Name of the setting holding the source file path
+    reader : Callable[[], pd.DataFrame]
+        Function parsing the source file
+    index : str
+        Column by which subjects are looked up
+    prepare : Callable[[pd.DataFrame], pd.DataFrame], optional
+        Function applied to the parsed table before indexing
+    """
+
+    def __init__(
+        self,
+        name: str,
+        path_setting: str,
+        reader: Callable[[], pd.DataFrame],
+        index: str,
+        prepare: Callable[[pd.DataFrame], pd.DataFrame] = None,
+    ):
+        self.name = name
+        self.path_setting = path_setting
+        self.reader = reader
+        self.index = index
+        self.prepare = prepare
+
+    @property
+    def path(self) -> Path:
+        """
+        Returns
+        -------
+        Path
+            Source file path
+        """
+        return Path(getattr(settings, self.path_setting))
+
+    def get_version(self) -> str:
+        """
+        Returns a string identifying the current version of the source file.
+
+        Returns
+        -------
+        str
+            Source file version
+        """
+        stat = os.stat(self.path)
+        resolved = str(self.path.resolve()).encode()
+        digest = hashlib.sha1(resolved).hexdigest()[:12]
+        return f"{digest}-{stat.st_mtime_ns}-{stat.st_size}"
+
+    def get_sidecar_path(self, version: str, suffix: str = ".parquet") -> Path:
+        """
+        Returns the path of the columnar copy of a version of the table.
+
+        Parameters
+        ----------
+        version : str
+            Source file version
+        suffix : str, optional
+            File extension, by default ".parquet"
+
+        Returns
+        -------
+        Path
+            Sidecar file path
+        """
+        directory = Path(settings.EXTERNAL_TABLE_CACHE_DIR)
+        return directory / f"{self.name}-{version}{suffix}"
+
+    def parse(self) -> pd.DataFrame:
+        """
+        Parses the source file and indexes the result.
+
+        Returns
+        -------
+        pd.DataFrame
+            Table indexed (and sorted) by the index column, without rows
+            missing an index value
+        """
+        table = self.reader()
+        if self.prepare is not None:
+            table = self.prepare(table)
+        table = table[table[self.index].notna()]
+        return table.set_index(self.index, drop=False).sort_index(kind="stable")
+
+    def write_sidecar(self, table: pd.DataFrame, version: str) -> None:
+        """
+        Writes a version of the table to a Parquet file, replacing the files
+        of previous versions. Tables whose mixed-type columns cannot be
+        stored in Parquet are pickled instead.
+
+        Parameters
+        ----------
+        table : pd.DataFrame
+            Indexed table
+        version : str
+            Source file version
+        """
+        path = self.get_sidecar_path(version)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        for previous in path.parent.glob(f"{self.name}-*"):
+            previous.unlink(missing_ok=True)
+        temporary_path = path.with_name(f".{path.name}.{os.getpid()}")
+        try:
+            table.to_parquet(temporary_path)
+        except (ValueError, TypeError):
+            path = self.get_sidecar_path(version, suffix=".pickle")
+            table.to_pickle(temporary_path)
+        os.replace(temporary_path, path)
+
+    def read_sidecar(self, version: str) -> pd.DataFrame:
+        """
+        Reads a version of the table from its sidecar file.
+
+        Parameters
+        ----------
+        version : str
+            Source file version
+
+        Returns
+        -------
+        pd.DataFrame
+            Indexed table, or *None* if no sidecar file exists
+        """
+        path = self.get_sidecar_path(version)
+        if path.exists():
+            return pd.read_parquet(path)
+        path = self.get_sidecar_path(version, suffix=".pickle")
+        if path.exists():
+            return pd.read_pickle(path)
+
+    def load(self, version: str) -> pd.DataFrame:
+        """
+        Loads a version of the table from the shared cache, its sidecar file
+        or (if neither holds it) the source file. Caching a new version
+        removes the previously cached one.
+
+        Parameters
+        ----------
+        version : str
+            Source file version
+
+        Returns
+        -------
+        pd.DataFrame
+            Indexed table
+        """
+        key = EXTERNAL_TABLE_CACHE_KEY.format(name=self.name, version=version)
+        table = cache.get(key)
+        if table is None:
+            table = self.read_sidecar(version)
+            if table is None:
+                table = self.parse()
+                self.write_sidecar(table, version)
+            version_key = EXTERNAL_TABLE_VERSION_KEY.format(name=self.name)
+            previous = cache.get(version_key)
+            if previous is not None and previous != version:
+                cache.delete(
+                    EXTERNAL_TABLE_CACHE_KEY.format(name=self.name, version=previous)
+                )
+            cache.set_many({key: table, version_key: version}, timeout=None)
+        return table
+
+    def get_frame(self) -> pd.DataFrame:
+        """
+        Returns the indexed table of the current version of the source file.
+        The returned frame is shared, so it must not be modified in place.
+
+        Returns
+        -------
+        pd.DataFrame
+            Indexed table
+        """
+        version = self.get_version()
+        return get_file_cache().get_or_load(
+            f"external-table:{self.name}", self.path, lambda _: self.load(version)
+        )
+
+    def lookup(self, value: Any) -> pd.DataFrame:
+        """
+        Returns the rows whose index column equals *value*, using a binary
+        search over the sorted index.
+
+        Parameters
+        ----------
+        value : Any
+            Index value
+
+        Returns
+        -------
+        pd.DataFrame
+            Matching rows
+        """
+        table = self.get_frame()
+        if value is None or pd.isna(value):
+            return table.iloc[:0]
+        try:
+            start = table.index.searchsorted(value, side="left")
+            stop = table.index.searchsorted(value, side="right")
+        except TypeError:
+            return table.iloc[:0]
+        return table.iloc[start:stop]
+
+
+CRF_TABLE = ExternalTable(
+    "crf", "CRF_TABLE_PATH", read_subject_table, index="ID", prepare=prepare_crf_table
+)
+PYLABBER_TABLE = ExternalTable(
+    "pylabber", "PYLABBER_TABLE_PATH", read_pylabber_table, index="ID"
+)
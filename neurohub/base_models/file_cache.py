@@ -0,0 +1,212 @@
+"""
+A process-wide cache of objects loaded from files (images, JSON sidecars,
+derivative tables), shared by all model instances referring to the same file.
+"""
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import nibabel as nib
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+#: Estimated footprint of an image whose voxel data is not held in memory.
+IMAGE_PROXY_BYTES: int = 64 * 1024
+
+#: Estimated footprint of an image reading from a file object it holds open
+#: (e.g. an indexed gzip file with its imported seek index). It also bounds
+#: the number of file objects kept alive by the cache. Removed entries are
+#: never closed, since callers may still be reading from them; their file
+#: objects are closed once the last reference is dropped.
+OPEN_IMAGE_BYTES: int = 8 * 1024**2
+
+
+def get_open_file_objects(value: Any) -> list:
+    """
+    Returns the file objects held open by a cached value.
+
+    Parameters
+    ----------
+    value : Any
+        Cached value
+
+    Returns
+    -------
+    list
+        Open file objects
+    """
+    if not isinstance(value, nib.spatialimages.SpatialImage):
+        return []
+    return [
+        holder.fileobj
+        for holder in value.file_map.values()
+        if holder.fileobj is not None and not getattr(holder.fileobj, "closed", True)
+    ]
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estimates the memory footprint of a cached value.
+
+    Parameters
+    ----------
+    value : Any
+        Cached value
+
+    Returns
+    -------
+    int
+        Estimated size in bytes
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        memory_usage = value.memory_usage(deep=True)
+        return int(memory_usage.sum() if hasattr(memory_usage, "sum") else memory_usage)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, nib.spatialimages.SpatialImage):
+        if value.in_memory:
+            return int(np.prod(value.shape)) * value.get_data_dtype().itemsize
+        if get_open_file_objects(value):
+            return OPEN_IMAGE_BYTES
+        return IMAGE_PROXY_BYTES
+    if isinstance(value, (dict, list)):
+        return len(json.dumps(value, default=str))
+    return sys.getsizeof(value)
+
+
+class FileCache:
+    """
+    A least-recently-used cache of objects loaded from files, keyed by
+    (path, modification time, size) and bounded by the estimated memory
+    footprint of its entries.
+
+    Parameters
+    ----------
+    max_bytes : int
+        Maximal total estimated size of the cached objects
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._current_keys: dict = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get_or_load(
+        self,
+        namespace: str,
+        path: str,
+        loader: Callable[[str], Any],
+    ) -> Any:
+        """
+        Returns the cached object loaded from the current version of *path*,
+        loading it if it is not cached. Cached objects are shared, so callers
+        must not modify them in place.
+
+        Parameters
+        ----------
+        namespace : str
+            Kind of object (e.g. "image"), so different loaders of the same
+            file do not collide
+        path : str
+            File path
+        loader : Callable[[str], Any]
+            Function loading the object from the file
+
+        Returns
+        -------
+        Any
+            Loaded object
+        """
+        path = str(Path(path).resolve())
+        stat = os.stat(path)
+        key = (namespace, path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+        value = loader(path)
+        size = estimate_size(value)
+        with self._lock:
+            stale_key = self._current_keys.get((namespace, path))
+            if stale_key is not None and stale_key != key:
+                self._remove(stale_key)
+            if key not in self._entries:
+                self._entries[key] = (value, size)
+                self._current_keys[(namespace, path)] = key
+                self._size += size
+            else:
+                # Another thread loaded the same version first.
+                value = self._entries[key][0]
+            self._evict()
+        return value
+
+    def _remove(self, key: tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry[1]
+            self._current_keys.pop(key[:2], None)
+
+    def _evict(self) -> None:
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        Removes all cached objects and resets the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._current_keys.clear()
+            self._size = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def get_stats(self) -> dict:
+        """
+        Returns
+        -------
+        dict
+            Hit, miss and eviction counters, number of entries and their
+            total estimated size
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._size,
+            }
+
+
+_file_cache: FileCache = None
+
+
+def get_file_cache() -> FileCache:
+    """
+    Returns the process-wide file cache, sized according to the
+    *FILE_CACHE_MAX_BYTES* setting.
+
+    Returns
+    -------
+    FileCache
+        Process-wide file cache
+    """
+    global _file_cache
+    if _file_cache is None:
+        _file_cache = FileCache(settings.FILE_CACHE_MAX_BYTES)
+    return _file_cache
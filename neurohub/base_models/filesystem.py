@@ -0,0 +1,233 @@
+"""
+Helpers for walking the filesystem with as few metadata calls as possible.
+"""
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Iterator
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import NamedTuple
+
+#: Maximal number of directory listings held by :class:`DirectoryCache`.
+DIRECTORY_CACHE_MAX_ENTRIES: int = 10000
+
+
+class FileStat(NamedTuple):
+    """
+    The subset of :func:`os.stat` results used to tell whether a file changed.
+    """
+
+    size: int
+    mtime_ns: int
+    inode: int
+
+    @classmethod
+    def from_stat_result(cls, stat: os.stat_result) -> "FileStat":
+        return cls(size=stat.st_size, mtime_ns=stat.st_mtime_ns, inode=stat.st_ino)
+
+
+def matches_pattern(name: str, pattern: str | tuple[str, ...]) -> bool:
+    """
+    Whether a file name matches a glob pattern or any of several patterns.
+
+    Parameters
+    ----------
+    name : str
+        File name
+    pattern : str | tuple[str, ...]
+        Glob pattern(s)
+
+    Returns
+    -------
+    bool
+        Whether the name matches
+    """
+    if isinstance(pattern, str):
+        return fnmatch(name, pattern)
+    return any(fnmatch(name, single) for single in pattern)
+
+
+def iter_matching_entries(
+    base_dir: Path, pattern: str | tuple[str, ...]
+) -> Iterator[os.DirEntry]:
+    """
+    Walks *base_dir* once using :func:`os.scandir` and yields the entries of
+    files whose name matches *pattern*.
+
+    Parameters
+    ----------
+    base_dir : Path
+        Base directory
+    pattern : str | tuple[str, ...]
+        Glob pattern(s) matched against file names
+
+    Yields
+    ------
+    os.DirEntry
+        Matching file entries
+    """
+    stack = [str(base_dir)]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except (FileNotFoundError, PermissionError):
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif matches_pattern(entry.name, pattern):
+                    yield entry
+
+
+def scan_directory(base_dir: Path, pattern: str | tuple[str, ...]) -> Iterator[str]:
+    """
+    Yields the paths of files under *base_dir* whose name matches *pattern*.
+
+    See Also
+    --------
+    * :func:`iter_matching_entries`
+
+    Parameters
+    ----------
+    base_dir : Path
+        Base directory
+    pattern : str | tuple[str, ...]
+        Glob pattern(s) matched against file names
+
+    Yields
+    ------
+    str
+        Matching file paths
+    """
+    for entry in iter_matching_entries(base_dir, pattern):
+        yield entry.path
+
+
+def snapshot_directory(
+    base_dir: Path, pattern: str | tuple[str, ...]
+) -> dict[str, FileStat]:
+    """
+    Returns the size, modification time and inode of every file under
+    *base_dir* whose name matches *pattern*.
+
+    Parameters
+    ----------
+    base_dir : Path
+        Base directory
+    pattern : str | tuple[str, ...]
+        Glob pattern(s) matched against file names
+
+    Returns
+    -------
+    dict[str, FileStat]
+        File stats by path
+    """
+    snapshot = {}
+    for entry in iter_matching_entries(base_dir, pattern):
+        try:
+            snapshot[entry.path] = FileStat.from_stat_result(entry.stat())
+        except FileNotFoundError:
+            continue
+    return snapshot
+
+
+class DirectoryCache:
+    """
+    A least-recently-used cache of directory listings. Each directory is
+    listed with a single :func:`os.scandir` call, and the listing is reused
+    for as long as the directory's modification time does not change, so
+    sibling file lookups cost one :func:`os.stat` of the directory instead
+    of one call per candidate file.
+
+    Parameters
+    ----------
+    max_entries : int, optional
+        Maximal number of cached listings, by default 10000
+    """
+
+    def __init__(self, max_entries: int = DIRECTORY_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._listings: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def list_files(self, directory: Path) -> frozenset[str]:
+        """
+        Returns the names of the files in *directory*.
+
+        Parameters
+        ----------
+        directory : Path
+            Directory path
+
+        Returns
+        -------
+        frozenset[str]
+            File names, empty if the directory does not exist
+        """
+        directory = str(directory)
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            return frozenset()
+        with self._lock:
+            cached = self._listings.get(directory)
+            if cached is not None and cached[0] == mtime_ns:
+                self._listings.move_to_end(directory)
+                return cached[1]
+        try:
+            with os.scandir(directory) as entries:
+                names = frozenset(entry.name for entry in entries if entry.is_file())
+        except OSError:
+            return frozenset()
+        with self._lock:
+            self._listings[directory] = (mtime_ns, names)
+            self._listings.move_to_end(directory)
+            while len(self._listings) > self.max_entries:
+                self._listings.popitem(last=False)
+        return names
+
+    def is_file(self, path: Path) -> bool:
+        """
+        Whether *path* is an existing file, answered from its directory's
+        listing.
+
+        Parameters
+        ----------
+        path : Path
+            File path
+
+        Returns
+        -------
+        bool
+            Whether the file exists
+        """
+        path = Path(path)
+        return path.name in self.list_files(path.parent)
+
+    def clear(self) -> None:
+        """
+        Removes all cached listings.
+        """
+        with self._lock:
+            self._listings.clear()
+
+
+_directory_cache: DirectoryCache = None
+
+
+def get_directory_cache() -> DirectoryCache:
+    """
+    Returns the process-wide directory listing cache.
+
+    Returns
+    -------
+    DirectoryCache
+        Process-wide directory listing cache
+    """
+    global _directory_cache
+    if _directory_cache is None:
+        _directory_cache = DirectoryCache()
+    return _directory_cache
@@ -0,0 +1,205 @@
+"""
+Definition of the :class:`GradientTable` class.
+"""
+from pathlib import Path
+
+import numpy as np
+
+#: b-values up to this value are considered non diffusion-weighted (b0).
+DEFAULT_B0_THRESHOLD: int = 10
+
+#: b-values within this distance of each other are considered the same shell.
+DEFAULT_SHELL_TOLERANCE: int = 50
+
+#: Allowed deviation of diffusion-weighted b-vectors from unit norm.
+DEFAULT_NORM_TOLERANCE: float = 1e-2
+
+
+class GradientTable:
+    """
+    The diffusion weighting scheme of a DWI_ scan, backed by NumPy arrays.
+
+    .. _DWI: https://en.wikipedia.org/wiki/Diffusion_MRI
+
+    Parameters
+    ----------
+    bvals : np.ndarray
+        b-value of each volume, shaped (N,)
+    bvecs : np.ndarray
+        b-vector of each volume, shaped (N, 3)
+    b0_threshold : int, optional
+        Largest b-value considered non diffusion-weighted, by default 10
+    shell_tolerance : int, optional
+        Largest distance between b-values of the same shell, by default 50
+    """
+
+    def __init__(
+        self,
+        bvals: np.ndarray,
+        bvecs: np.ndarray,
+        b0_threshold: int = DEFAULT_B0_THRESHOLD,
+        shell_tolerance: int = DEFAULT_SHELL_TOLERANCE,
+    ):
+        self.bvals = np.asarray(bvals, dtype=float).ravel()
+        self.bvecs = np.asarray(bvecs, dtype=float).reshape(-1, 3)
+        self.b0_threshold = b0_threshold
+        self.shell_tolerance = shell_tolerance
+
+    def __len__(self) -> int:
+        return len(self.bvals)
+
+    @classmethod
+    def from_files(cls, bval_file: Path, bvec_file: Path, **kwargs) -> "GradientTable":
+        """
+        Reads FSL format *.bval* and *.bvec* files, as created by dcm2niix_.
+
+        .. _dcm2niix: https://github.com/rordenlab/dcm2niix
+
+        Parameters
+        ----------
+        bval_file : Path
+            FSL format b-value file, a single row of N values
+        bvec_file : Path
+            FSL format b-vector file, three rows of N values (N rows of three
+            values are also accepted, unless N is 3)
+
+        Returns
+        -------
+        GradientTable
+            Gradient table
+        """
+        bvals = np.loadtxt(bval_file, ndmin=1)
+        bvecs = np.loadtxt(bvec_file, ndmin=2)
+        if bvecs.shape[0] == 3:
+            bvecs = bvecs.T
+        elif bvecs.shape[1] != 3:
+            raise ValueError(f"Invalid b-vector table shape: {bvecs.shape}.")
+        return cls(bvals, bvecs, **kwargs)
+
+    @property
+    def b0_mask(self) -> np.ndarray:
+        """
+        Returns
+        -------
+        np.ndarray
+            Whether each volume is non diffusion-weighted
+        """
+        return self.bvals <= self.b0_threshold
+
+    @property
+    def b0_indices(self) -> np.ndarray:
+        """
+        Returns
+        -------
+        np.ndarray
+            Indices of the non diffusion-weighted volumes
+        """
+        return np.flatnonzero(self.b0_mask)
+
+    @property
+    def shell_labels(self) -> np.ndarray:
+        """
+        Assigns each volume to a shell by clustering sorted b-values, starting
+        a new shell wherever consecutive values differ by more than the shell
+        tolerance. Non diffusion-weighted volumes are assigned to shell 0.
+
+        Returns
+        -------
+        np.ndarray
+            Shell index of each volume, shells ordered by b-value
+        """
+        labels = np.zeros(len(self), dtype=int)
+        weighted = np.flatnonzero(~self.b0_mask)
+        if weighted.size:
+            order = weighted[np.argsort(self.bvals[weighted], kind="stable")]
+            jumps = np.diff(self.bvals[order]) > self.shell_tolerance
+            labels[order] = np.concatenate(([1], 1 + np.cumsum(jumps)))
+        return labels
+
+    @property
+    def shells(self) -> np.ndarray:
+        """
+        Returns
+        -------
+        np.ndarray
+            Mean b-value of each diffusion-weighted shell, rounded and sorted
+        """
+        labels = self.shell_labels
+        n_shells = labels.max()
+        if not n_shells:
+            return np.array([], dtype=int)
+        sums = np.bincount(labels, weights=self.bvals)[1:]
+        counts = np.bincount(labels)[1:]
+        return np.rint(sums / counts).astype(int)
+
+    def get_directions_per_shell(self) -> dict[int, int]:
+        """
+        Returns
+        -------
+        dict[int, int]
+            Number of distinct gradient directions by shell b-value
+        """
+        labels = self.shell_labels
+        directions = {}
+        for index, shell in enumerate(self.shells, start=1):
+            vectors = np.round(self.bvecs[labels == index], decimals=4)
+            directions[int(shell)] = len(np.unique(vectors, axis=0))
+        return directions
+
+    def get_norms(self) -> np.ndarray:
+        """
+        Returns
+        -------
+        np.ndarray
+            Euclidean norm of each b-vector
+        """
+        return np.linalg.norm(self.bvecs, axis=1)
+
+    def get_non_unit_indices(
+        self, tolerance: float = DEFAULT_NORM_TOLERANCE
+    ) -> np.ndarray:
+        """
+        Parameters
+        ----------
+        tolerance : float, optional
+            Allowed deviation from unit norm, by default 0.01
+
+        Returns
+        -------
+        np.ndarray
+            Indices of diffusion-weighted volumes whose b-vector is not of
+            unit norm
+        """
+        deviation = np.abs(self.get_norms() - 1) > tolerance
+        return np.flatnonzero(deviation & ~self.b0_mask)
+
+    def validate(self, n_volumes: int = None) -> list[str]:
+        """
+        Checks the gradient table for common problems.
+
+        Parameters
+        ----------
+        n_volumes : int, optional
+            Number of volumes in the associated image, if known
+
+        Returns
+        -------
+        list[str]
+            Problem descriptions, empty if the table is valid
+        """
+        problems = []
+        if len(self.bvals) != len(self.bvecs):
+            problems.append(
+                f"{len(self.bvals)} b-values but {len(self.bvecs)} b-vectors."
+            )
+            return problems
+        if n_volumes is not None and n_volumes != len(self):
+            problems.append(f"{len(self)} gradients but {n_volumes} volumes.")
+        if not self.b0_indices.size:
+            problems.append("No b0 volumes.")
+        if (self.bvals < 0).any():
+            problems.append("Negative b-values.")
+        non_unit = self.get_non_unit_indices()
+        if non_unit.size:
+            problems.append(f"Non-unit b-vectors at volumes {non_unit.tolist()}.")
+        return problems
@@ -0,0 +1,291 @@
+"""
+Memory-mapped and random access to NIfTI voxel data.
+
+Uncompressed files are memory-mapped directly. Compressed files are
+decompressed once into a local scratch directory, bounded in size and evicted
+in least-recently-used order, and the decompressed copy is memory-mapped
+instead. Since all processes share the scratch directory, they also share the
+mapped pages through the operating system's page cache.
+
+Compressed files may also be given a persisted gzip seek index, built with
+:func:`build_gzip_index`, allowing reads from the middle of the file without
+decompressing everything before it.
+"""
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import indexed_gzip
+import nibabel as nib
+from django.conf import settings
+
+from neurohub.base_models.file_cache import get_file_cache
+
+#: Size of the chunks copied while decompressing.
+DECOMPRESSION_CHUNK_SIZE: int = 16 * 1024**2
+
+#: Distance (in uncompressed bytes) between gzip seek points. Each point
+#: stores a 32 KiB window, so this trades index size for the amount of data
+#: decompressed per random read.
+GZIP_INDEX_SPACING: int = 4 * 1024**2
+
+
+def get_file_key(path: Path, stat: os.stat_result) -> str:
+    """
+    Returns a key identifying a specific version of a file, derived from its
+    path, modification time and size.
+
+    Parameters
+    ----------
+    path : Path
+        File path
+    stat : os.stat_result
+        File stats
+
+    Returns
+    -------
+    str
+        File version key
+    """
+    identity = f"{Path(path).resolve()}:{stat.st_mtime_ns}:{stat.st_size}"
+    return hashlib.sha1(identity.encode()).hexdigest()
+
+
+class ScratchCache:
+    """
+    A byte-bounded, least-recently-used cache of decompressed copies of
+    *.nii.gz* files, keyed by source path, modification time and size.
+
+    Parameters
+    ----------
+    directory : Path
+        Scratch directory
+    max_bytes : int
+        Maximal total size of the cached copies
+    """
+
+    SUFFIX: str = ".nii"
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def get(self, path: Path) -> Path:
+        """
+        Returns the path of a decompressed copy of *path*, decompressing it if
+        no up-to-date copy is cached.
+
+        Parameters
+        ----------
+        path : Path
+            *.nii.gz* file path
+
+        Returns
+        -------
+        Path
+            Decompressed copy path
+        """
+        stat = os.stat(path)
+        target = self.directory / (get_file_key(path, stat) + self.SUFFIX)
+        try:
+            # Touching marks the copy as recently used.
+            os.utime(target)
+            return target
+        except FileNotFoundError:
+            pass
+        self.directory.mkdir(parents=True, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with gzip.open(path, "rb") as source, os.fdopen(descriptor, "wb") as copy:
+                shutil.copyfileobj(source, copy, DECOMPRESSION_CHUNK_SIZE)
+            # Renaming is atomic, so concurrent readers never see partial
+            # copies.
+            os.replace(temporary, target)
+        except BaseException:
+            Path(temporary).unlink(missing_ok=True)
+            raise
+        self.evict(keep=target)
+        return target
+
+    def evict(self, keep: Path = None) -> None:
+        """
+        Removes least recently used copies until the cache fits within
+        :attr:`max_bytes`. Removing a copy that is in use is safe, since
+        images returned by :func:`load_image` hold an open handle to it.
+
+        Parameters
+        ----------
+        keep : Path, optional
+            A copy never to remove
+        """
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(self.SUFFIX):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if keep is not None and path == str(keep):
+                continue
+            Path(path).unlink(missing_ok=True)
+            total -= size
+
+
+def get_scratch_cache() -> ScratchCache:
+    """
+    Returns the scratch cache configured in the project's settings.
+
+    Returns
+    -------
+    ScratchCache
+        Configured scratch cache
+    """
+    return ScratchCache(settings.NIFTI_SCRATCH_DIR, settings.NIFTI_SCRATCH_MAX_BYTES)
+
+
+def load_image(path: str, scratch_cache: ScratchCache = None) -> nib.Nifti1Image:
+    """
+    Loads a NIfTI image with memory-mapped voxel data. Compressed files are
+    read through a decompressed copy from the scratch cache.
+
+    Parameters
+    ----------
+    path : str
+        Path of the *.nii* or *.nii.gz* file
+    scratch_cache : ScratchCache, optional
+        Cache of decompressed copies, by default the configured one
+
+    Returns
+    -------
+    nib.Nifti1Image
+        Image backed by a read-only memory map
+    """
+    if str(path).endswith(".gz"):
+        scratch_cache = scratch_cache or get_scratch_cache()
+        path = scratch_cache.get(path)
+    # Loading by name would reopen the file on every read, which fails once
+    # the scratch copy is evicted. Memory maps are created from this handle
+    # instead, which is closed once the image is garbage collected.
+    fileobj = open(path, "rb")
+    try:
+        return nib.Nifti1Image.from_stream(fileobj)
+    except BaseException:
+        fileobj.close()
+        raise
+
+
+def get_gzip_index_path(path: str) -> Path:
+    """
+    Returns the path of the gzip seek index of the current version of a
+    *.nii.gz* file. Indices of older versions are never returned, since the
+    path depends on the file's modification time and size.
+
+    Parameters
+    ----------
+    path : str
+        *.nii.gz* file path
+
+    Returns
+    -------
+    Path
+        Gzip seek index path
+    """
+    key = get_file_key(path, os.stat(path))
+    return Path(settings.NIFTI_GZIP_INDEX_DIR) / key[:2] / f"{key}.gzidx"
+
+
+def build_gzip_index(path: str, spacing: int = GZIP_INDEX_SPACING) -> Path:
+    """
+    Builds and persists a gzip seek index for a *.nii.gz* file, unless one
+    exists already. This costs a single decompression pass.
+
+    Parameters
+    ----------
+    path : str
+        *.nii.gz* file path
+    spacing : int, optional
+        Distance between seek points, larger than the 32 KiB window, by
+        default 4 MiB
+
+    Returns
+    -------
+    Path
+        Gzip seek index path
+    """
+    index_path = get_gzip_index_path(path)
+    if index_path.exists():
+        return index_path
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=index_path.parent, suffix=".tmp")
+    os.close(descriptor)
+    try:
+        with indexed_gzip.IndexedGzipFile(str(path), spacing=spacing) as fileobj:
+            fileobj.build_full_index()
+            fileobj.export_index(temporary)
+        os.replace(temporary, index_path)
+    except BaseException:
+        Path(temporary).unlink(missing_ok=True)
+        raise
+    return index_path
+
+
+def load_indexed_image(path: str) -> nib.Nifti1Image:
+    """
+    Loads a *.nii.gz* file through its persisted gzip seek index, so that
+    slicing its voxel data only decompresses the requested region (plus at
+    most one seek point spacing).
+
+    Parameters
+    ----------
+    path : str
+        *.nii.gz* file path
+
+    Returns
+    -------
+    nib.Nifti1Image
+        Image reading from an indexed gzip file, or *None* if no index was
+        built for the current version of the file
+    """
+    index_path = get_gzip_index_path(path)
+    if not index_path.exists():
+        return None
+    fileobj = indexed_gzip.IndexedGzipFile(str(path))
+    try:
+        fileobj.import_index(str(index_path))
+        return nib.Nifti1Image.from_stream(fileobj)
+    except BaseException:
+        fileobj.close()
+        raise
+
+
+def get_indexed_image(path: str) -> nib.Nifti1Image:
+    """
+    Returns the image of a *.nii.gz* file read through its gzip seek index
+    (see :func:`load_indexed_image`). Opened images are shared through the
+    process-wide file cache, so repeated reads neither reopen the file nor
+    import its index again. Evicted images stay readable by callers holding
+    them.
+
+    Parameters
+    ----------
+    path : str
+        *.nii.gz* file path
+
+    Returns
+    -------
+    nib.Nifti1Image
+        Image reading from an indexed gzip file, or *None* if no index was
+        built for the current version of the file
+    """
+    if not get_gzip_index_path(path).exists():
+        return None
+    return get_file_cache().get_or_load("indexed-image", path, load_indexed_image)
@@ -0,0 +1,35 @@
+"""
+Definition of the :class:`Command` class for the ``build_previews``
+management command.
+"""
+from django.core.management.base import BaseCommand
+
+from neurohub.base_models.models import NIfTI
+from neurohub.base_models.previews import update_previews
+
+
+class Command(BaseCommand):
+    """
+    Builds thumbnails and preview pyramids of registered
+    :class:`~neurohub.base_models.models.nifti.NIfTI` images whose previews
+    are missing or outdated.
+    """
+
+    help = "Builds thumbnails and preview pyramids of registered NIfTI images."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--suffix",
+            action="append",
+            help="Only process images with this BIDS suffix (e.g. T1w).",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=None, help="Number of processes."
+        )
+
+    def handle(self, *args, **options):
+        niftis = NIfTI.objects.all()
+        if options["suffix"]:
+            niftis = niftis.filter(suffix__in=options["suffix"])
+        count = update_previews(niftis, max_workers=options["workers"])
+        self.stdout.write(self.style.SUCCESS(f"Processed {count} NIfTI files."))
@@ -0,0 +1,51 @@
+"""
+Definition of the :class:`Command` class for the ``compute_checksums``
+management command.
+"""
+from django.core.management.base import BaseCommand
+
+from neurohub.base_models.checksums import (
+    DEFAULT_CHUNK_SIZE,
+    find_duplicates,
+    update_checksums,
+)
+from neurohub.base_models.models import NIfTI
+
+
+class Command(BaseCommand):
+    """
+    Computes content hashes of registered
+    :class:`~neurohub.base_models.models.nifti.NIfTI` images and their
+    associated files, and optionally reports duplicates.
+    """
+
+    help = "Computes content hashes of registered NIfTI images."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help="Number of bytes read at once.",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=None, help="Number of threads."
+        )
+        parser.add_argument(
+            "--duplicates",
+            action="store_true",
+            help="Report images with identical contents.",
+        )
+
+    def handle(self, *args, **options):
+        count = update_checksums(
+            NIfTI.objects.all(),
+            chunk_size=options["chunk_size"],
+            max_workers=options["workers"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Hashed {count} NIfTI files."))
+        if options["duplicates"]:
+            for content_hash, paths in find_duplicates().items():
+                self.stdout.write(f"{content_hash}:")
+                for path in paths:
+                    self.stdout.write(f"  {path}")
@@ -0,0 +1,53 @@
+"""
+Definition of the :class:`Command` class for the
+``compute_volume_statistics`` management command.
+"""
+from django.core.management.base import BaseCommand
+
+from neurohub.base_models.models import NIfTI
+from neurohub.base_models.volume_statistics import (
+    DEFAULT_BINS,
+    DEFAULT_CHUNK_VOLUMES,
+    update_volume_statistics,
+)
+
+
+class Command(BaseCommand):
+    """
+    Computes per-volume statistics of registered
+    :class:`~neurohub.base_models.models.nifti.NIfTI` images whose statistics
+    are missing or outdated.
+    """
+
+    help = "Computes per-volume statistics of registered NIfTI images."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--suffix",
+            action="append",
+            help="Only process images with this BIDS suffix (e.g. dwi).",
+        )
+        parser.add_argument(
+            "--bins", type=int, default=DEFAULT_BINS, help="Histogram bins."
+        )
+        parser.add_argument(
+            "--chunk-volumes",
+            type=int,
+            default=DEFAULT_CHUNK_VOLUMES,
+            help="Number of volumes read at once.",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=None, help="Number of processes."
+        )
+
+    def handle(self, *args, **options):
+        niftis = NIfTI.objects.all()
+        if options["suffix"]:
+            niftis = niftis.filter(suffix__in=options["suffix"])
+        count = update_volume_statistics(
+            niftis,
+            bins=options["bins"],
+            chunk_volumes=options["chunk_volumes"],
+            max_workers=options["workers"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Processed {count} NIfTI files."))
@@ -0,0 +1,39 @@
+"""
+Definition of the :class:`Command` class for the ``convert_derivatives``
+management command.
+"""
+from django.core.management.base import BaseCommand
+
+from neurohub.base_models.derivative_store import convert_derivatives
+from neurohub.base_models.models import TensorDerivative
+
+
+class Command(BaseCommand):
+    """
+    Writes the tables of
+    :class:`~neurohub.base_models.models.tensor_derivative.TensorDerivative`
+    pickles to the Parquet derivative store.
+    """
+
+    help = "Converts tensor derivative pickles to the Parquet derivative store."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Number of converting processes.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Convert every derivative, even if its stored copy is current.",
+        )
+
+    def handle(self, *args, **options):
+        count = convert_derivatives(
+            TensorDerivative.objects.all(),
+            max_workers=options["workers"],
+            force=options["force"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Converted {count} derivatives."))
@@ -0,0 +1,53 @@
+"""
+Definition of the :class:`Command` class for the ``index_derivative_values``
+management command.
+"""
+from django.core.management.base import BaseCommand
+
+from neurohub.base_models.derivative_values import (
+    DERIVATIVE_BATCH_SIZE,
+    index_derivative_values,
+)
+from neurohub.base_models.models import TensorDerivative
+
+
+class Command(BaseCommand):
+    """
+    Stores the values of
+    :class:`~neurohub.base_models.models.tensor_derivative.TensorDerivative`
+    tables as
+    :class:`~neurohub.base_models.models.derivative_value.DerivativeValue`
+    rows.
+    """
+
+    help = "Stores the values of tensor derivatives in the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DERIVATIVE_BATCH_SIZE,
+            help="Number of derivatives written per batch.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Number of reading processes.",
+        )
+        parser.add_argument(
+            "--missing",
+            action="store_true",
+            help="Only index derivatives without stored values.",
+        )
+
+    def handle(self, *args, **options):
+        derivatives = TensorDerivative.objects.all()
+        if options["missing"]:
+            derivatives = derivatives.filter(regional_values__isnull=True)
+        count = index_derivative_values(
+            derivatives,
+            max_workers=options["workers"],
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Stored {count} derivative values."))
@@ -0,0 +1,38 @@
+"""
+Definition of the :class:`Command` class for the ``refresh_questionnaires``
+management command.
+"""
+from django.core.management.base import BaseCommand
+
+from neurohub.base_models.questionnaires import refresh_questionnaire_responses
+
+
+class Command(BaseCommand):
+    """
+    Synchronizes the stored
+    :class:`~neurohub.base_models.models.questionnaire_response.QuestionnaireResponse`
+    rows with the questionnaire workbook.
+    """
+
+    help = "Stores new and modified responses of the questionnaire workbook."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path",
+            help="Questionnaire workbook, by default the QUESTIONNAIRE_PATH setting.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Parse the workbook even if it did not change.",
+        )
+
+    def handle(self, *args, **options):
+        result = refresh_questionnaire_responses(
+            path=options["path"], force=options["force"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {result.written} and deleted {result.deleted} responses."
+            )
+        )
@@ -0,0 +1,65 @@
+"""
+Definition of the :class:`Command` class for the ``register_niftis``
+management command.
+"""
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from neurohub.scripts.update_database import (
+    DEFAULT_BATCH_SIZE,
+    register_nifti_files,
+)
+
+
+class Command(BaseCommand):
+    """
+    Registers every *.nii* and *.nii.gz* file in a BIDS dataset as a
+    :class:`~neurohub.base_models.models.nifti.NIfTI` instance, along with
+    its JSON sidecar.
+    """
+
+    help = "Registers every NIfTI file in a BIDS dataset."
+
+    def add_arguments(self, parser):
+        parser.add_argument("bids_dir", type=Path, help="BIDS dataset root.")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Number of files written per batch.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Number of header reading processes.",
+        )
+        parser.add_argument(
+            "--gzip-index",
+            action="store_true",
+            help="Build gzip seek indices for compressed 4D files.",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Process every file, even if it did not change.",
+        )
+
+    def handle(self, *args, **options):
+        bids_dir = options["bids_dir"]
+        if not bids_dir.is_dir():
+            raise CommandError(f"{bids_dir} is not a directory.")
+        diff = register_nifti_files(
+            bids_dir,
+            batch_size=options["batch_size"],
+            max_workers=options["workers"],
+            full=options["full"],
+            gzip_index=options["gzip_index"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Registered {len(diff.added)} new, {len(diff.changed)} changed "
+                f"and removed {len(diff.removed)} NIfTI files."
+            )
+        )
@@ -0,0 +1,32 @@
+"""
+Definition of the :class:`Command` class for the ``sync_subjects``
+management command.
+"""
+from django.core.management.base import BaseCommand
+
+from neurohub.base_models.subject_sync import DEFAULT_BATCH_SIZE, sync_subjects
+
+
+class Command(BaseCommand):
+    """
+    Creates and updates :class:`~neurohub.base_models.models.subject.Subject`
+    rows from the external pylabber and CRF tables.
+    """
+
+    help = "Synchronizes subjects with the pylabber and CRF tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Number of rows written per query.",
+        )
+
+    def handle(self, *args, **options):
+        result = sync_subjects(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {result.created} and updated {result.updated} subjects."
+            )
+        )
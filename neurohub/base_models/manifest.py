@@ -0,0 +1,234 @@
+"""
+Batched resolution of the files and derivatives of scanning sessions.
+
+Manifests of any number of sessions are built from a fixed number of queries
+and one directory listing per modality folder, and are cached per session
+until the session's rows or directories change.
+"""
+import os
+from collections.abc import Iterable
+from pathlib import Path
+
+from django.core.cache import cache
+from django.db.models import Count, Max, QuerySet
+from django.db.models.functions import Coalesce
+
+from neurohub.base_models.filesystem import get_directory_cache
+from neurohub.base_models.models.nifti import NIfTI
+from neurohub.base_models.models.tensor_derivative import TensorDerivative
+
+#: Cache key template of session manifests.
+MANIFEST_CACHE_KEY: str = "session-manifest:{pk}"
+
+#: :class:`NIfTI` fields included in manifests.
+MANIFEST_NIFTI_FIELDS = ("id", "path", "datatype", "suffix", "is_raw")
+
+#: :class:`TensorDerivative` fields included in manifests.
+MANIFEST_DERIVATIVE_FIELDS = (
+    "id",
+    "path",
+    "nifti_parent_id",
+    "software_used",
+    "acquisition",
+    "atlas",
+    "label",
+)
+
+
+def query_session_derivatives(session_ids: list[int]) -> QuerySet:
+    """
+    Returns the derivatives of sessions, whether they are associated with the
+    session directly or through their parent NIfTI, annotated with the
+    session's primary key as *session_key*.
+
+    Parameters
+    ----------
+    session_ids : list[int]
+        Session primary keys
+
+    Returns
+    -------
+    QuerySet
+        Derivatives of the sessions
+    """
+    return TensorDerivative.objects.annotate(
+        session_key=Coalesce("session_parent_id", "nifti_parent__session_id")
+    ).filter(session_key__in=session_ids)
+
+
+def query_signatures(session_ids: list[int]) -> dict[int, tuple]:
+    """
+    Returns a value for each session that changes whenever one of its NIfTI
+    or derivative rows is added, modified or removed.
+
+    Parameters
+    ----------
+    session_ids : list[int]
+        Session primary keys
+
+    Returns
+    -------
+    dict[int, tuple]
+        Row signature by session primary key
+    """
+    signatures = {pk: [0, None, 0, None] for pk in session_ids}
+    niftis = (
+        NIfTI.objects.filter(session_id__in=session_ids)
+        .values("session_id")
+        .annotate(count=Count("id"), latest=Max("modified"))
+        .order_by()
+    )
+    for row in niftis:
+        signatures[row["session_id"]][:2] = row["count"], row["latest"]
+    derivatives = (
+        query_session_derivatives(session_ids)
+        .values("session_key")
+        .annotate(count=Count("id"), latest=Max("modified"))
+        .order_by()
+    )
+    for row in derivatives:
+        signatures[row["session_key"]][2:] = row["count"], row["latest"]
+    return {pk: tuple(signature) for pk, signature in signatures.items()}
+
+
+def get_directory_mtimes(directories: Iterable[str]) -> dict[str, int]:
+    """
+    Returns the modification time of each directory.
+
+    Parameters
+    ----------
+    directories : Iterable[str]
+        Directory paths
+
+    Returns
+    -------
+    dict[str, int]
+        Modification time in nanoseconds (or *None* if missing) by directory
+    """
+    mtimes = {}
+    for directory in set(directories):
+        try:
+            mtimes[directory] = os.stat(directory).st_mtime_ns
+        except OSError:
+            mtimes[directory] = None
+    return mtimes
+
+
+def build_manifests(session_ids: list[int]) -> dict[int, dict]:
+    """
+    Builds the manifests of sessions with one query per model and one
+    directory listing per modality folder.
+
+    Parameters
+    ----------
+    session_ids : list[int]
+        Session primary keys
+
+    Returns
+    -------
+    dict[int, dict]
+        Manifest by session primary key
+    """
+    manifests = {
+        pk: {"session": pk, "niftis": [], "derivatives": [], "directories": {}}
+        for pk in session_ids
+    }
+    niftis = NIfTI.objects.filter(session_id__in=session_ids).values(
+        "session_id", *MANIFEST_NIFTI_FIELDS
+    )
+    directory_cache = get_directory_cache()
+    listings = {}
+    for nifti in niftis:
+        manifest = manifests[nifti.pop("session_id")]
+        directory = str(Path(nifti["path"]).parent)
+        if directory not in listings:
+            listings[directory] = directory_cache.list_files(directory)
+        files = NIfTI(path=nifti["path"]).get_file_paths(listing=listings[directory])
+        nifti["files"] = [str(path) for path in files]
+        manifest["niftis"].append(nifti)
+        manifest["directories"][directory] = None
+    derivatives = query_session_derivatives(session_ids).values(
+        "session_key", *MANIFEST_DERIVATIVE_FIELDS
+    )
+    for derivative in derivatives:
+        manifests[derivative.pop("session_key")]["derivatives"].append(derivative)
+    mtimes = get_directory_mtimes(listings)
+    for manifest in manifests.values():
+        manifest["directories"] = {
+            directory: mtimes[directory] for directory in manifest["directories"]
+        }
+    return manifests
+
+
+def get_session_manifests(sessions: Iterable) -> dict[int, dict]:
+    """
+    Returns the NIfTI files (with their associated sidecar files) and tensor
+    derivatives of each session. Manifests are cached and only rebuilt for
+    sessions whose rows changed or whose directories were modified since.
+
+    Parameters
+    ----------
+    sessions : Iterable
+        :class:`~neurohub.base_models.models.session.Session` instances or
+        primary keys
+
+    Returns
+    -------
+    dict[int, dict]
+        Manifest by session primary key, holding the session's primary key,
+        its NIfTI rows (with the paths of their associated files), its
+        derivative rows and the modification times of its directories
+    """
+    session_ids = [getattr(session, "pk", session) for session in sessions]
+    if not session_ids:
+        return {}
+    signatures = query_signatures(session_ids)
+    keys = {pk: MANIFEST_CACHE_KEY.format(pk=pk) for pk in session_ids}
+    cached = cache.get_many(keys.values())
+    candidates = {}
+    for pk in session_ids:
+        entry = cached.get(keys[pk])
+        if entry is not None and entry["signature"] == signatures[pk]:
+            candidates[pk] = entry["manifest"]
+    mtimes = get_directory_mtimes(
+        directory
+        for manifest in candidates.values()
+        for directory in manifest["directories"]
+    )
+    manifests = {
+        pk: manifest
+        for pk, manifest in candidates.items()
+        if all(
+            mtimes[directory] == mtime
+            for directory, mtime in manifest["directories"].items()
+        )
+    }
+    stale = [pk for pk in session_ids if pk not in manifests]
+    if stale:
+        built = build_manifests(stale)
+        cache.set_many(
+            {
+                keys[pk]: {"signature": signatures[pk], "manifest": manifest}
+                for pk, manifest in built.items()
+            },
+            timeout=None,
+        )
+        manifests.update(built)
+    return {pk: manifests[pk] for pk in session_ids}
+
+
+def get_manifest_file_paths(manifest: dict) -> list[Path]:
+    """
+    Returns the paths of all NIfTI and associated files of a manifest.
+
+    Parameters
+    ----------
+    manifest : dict
+        Session manifest, see :func:`get_session_manifests`
+
+    Returns
+    -------
+    list[Path]
+        File paths
+    """
+    return [Path(path) for nifti in manifest["niftis"] for path in nifti["files"]]
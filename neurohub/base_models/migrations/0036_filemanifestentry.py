@@ -0,0 +1,47 @@
+# Generated by Django 4.1.6 on 2026-10-18 07:24
+
+from django.db import migrations, models
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("base_models", "0035_condition_sessions_group_sessions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FileManifestEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created",
+                    django_extensions.db.fields.CreationDateTimeField(
+                        auto_now_add=True, verbose_name="created"
+                    ),
+                ),
+                (
+                    "modified",
+                    django_extensions.db.fields.ModificationDateTimeField(
+                        auto_now=True, verbose_name="modified"
+                    ),
+                ),
+                ("kind", models.CharField(db_index=True, max_length=64)),
+                ("path", models.CharField(max_length=1000, unique=True)),
+                ("size", models.BigIntegerField()),
+                ("mtime_ns", models.BigIntegerField()),
+                ("inode", models.BigIntegerField()),
+            ],
+            options={
+                "verbose_name_plural": "file manifest entries",
+            },
+        ),
+    ]
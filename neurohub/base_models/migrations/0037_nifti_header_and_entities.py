@@ -0,0 +1,110 @@
+# Generated by Django 4.1.6 on 2026-10-18 07:26
+
+import datetime
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("base_models", "0036_filemanifestentry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="nifti",
+            name="acquisition",
+            field=models.CharField(
+                blank=True, db_index=True, max_length=100, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="nifti",
+            name="affine",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=django.contrib.postgres.fields.ArrayField(
+                    base_field=models.FloatField(), size=4
+                ),
+                null=True,
+                size=4,
+            ),
+        ),
+        migrations.AddField(
+            model_name="nifti",
+            name="ceagent",
+            field=models.CharField(
+                blank=True, db_index=True, max_length=100, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="nifti",
+            name="datatype",
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name="nifti",
+            name="direction",
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name="nifti",
+            name="dtype",
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name="nifti",
+            name="entities",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="nifti",
+            name="shape",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.PositiveIntegerField(),
+                db_index=True,
+                null=True,
+                size=None,
+            ),
+        ),
+        migrations.AddField(
+            model_name="nifti",
+            name="suffix",
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name="nifti",
+            name="task",
+            field=models.CharField(
+                blank=True, db_index=True, max_length=100, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="nifti",
+            name="voxel_sizes",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.FloatField(), db_index=True, null=True, size=None
+            ),
+        ),
+        migrations.AlterField(
+            model_name="subject",
+            name="date_of_birth",
+            field=models.DateField(
+                blank=True,
+                null=True,
+                validators=[
+                    django.core.validators.MaxValueValidator(
+                        datetime.date(2026, 10, 18)
+                    )
+                ],
+                verbose_name="Date of Birth",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="nifti",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["entities"], name="base_models_entitie_07e251_gin"
+            ),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.1.6 on 2026-10-18 07:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("base_models", "0037_nifti_header_and_entities"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="nifti",
+            name="file_mtime_ns",
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name="nifti",
+            name="file_size",
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name="nifti",
+            name="qform_code",
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name="nifti",
+            name="sform_code",
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 4.1.6 on 2026-10-18 07:28
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("base_models", "0038_nifti_cached_header"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="nifti",
+            name="echo_time",
+            field=models.FloatField(db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="nifti",
+            name="effective_echo_spacing",
+            field=models.FloatField(db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="nifti",
+            name="institution_name",
+            field=models.CharField(
+                blank=True, db_index=True, max_length=255, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="nifti",
+            name="manufacturer",
+            field=models.CharField(
+                blank=True, db_index=True, max_length=255, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="nifti",
+            name="phase_encoding_direction",
+            field=models.CharField(blank=True, db_index=True, max_length=8, null=True),
+        ),
+        migrations.AddField(
+            model_name="nifti",
+            name="repetition_time",
+            field=models.FloatField(db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="nifti",
+            name="sidecar",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="nifti",
+            name="sidecar_mtime_ns",
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name="nifti",
+            name="total_readout_time",
+            field=models.FloatField(db_index=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="nifti",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["sidecar"], name="base_models_sidecar_d9a7bc_gin"
+            ),
+        ),
+    ]
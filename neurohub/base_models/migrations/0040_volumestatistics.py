@@ -0,0 +1,72 @@
+# Generated by Django 4.1.6 on 2026-10-18 07:33
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("base_models", "0039_nifti_sidecar"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VolumeStatistics",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created",
+                    django_extensions.db.fields.CreationDateTimeField(
+                        auto_now_add=True, verbose_name="created"
+                    ),
+                ),
+                (
+                    "modified",
+                    django_extensions.db.fields.ModificationDateTimeField(
+                        auto_now=True, verbose_name="modified"
+                    ),
+                ),
+                ("volume", models.PositiveIntegerField()),
+                ("mean", models.FloatField()),
+                ("std", models.FloatField()),
+                ("min", models.FloatField()),
+                ("max", models.FloatField()),
+                ("nonzero_count", models.BigIntegerField()),
+                (
+                    "histogram",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.BigIntegerField(), size=None
+                    ),
+                ),
+                ("source_mtime_ns", models.BigIntegerField()),
+                (
+                    "nifti",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="volume_statistics_set",
+                        to="base_models.nifti",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "volume statistics",
+                "ordering": ("nifti", "volume"),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="volumestatistics",
+            constraint=models.UniqueConstraint(
+                fields=("nifti", "volume"), name="unique_nifti_volume_statistics"
+            ),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.1.6 on 2026-10-18 07:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("base_models", "0040_volumestatistics"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NIfTIPreview",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created",
+                    django_extensions.db.fields.CreationDateTimeField(
+                        auto_now_add=True, verbose_name="created"
+                    ),
+                ),
+                (
+                    "modified",
+                    django_extensions.db.fields.ModificationDateTimeField(
+                        auto_now=True, verbose_name="modified"
+                    ),
+                ),
+                ("source_mtime_ns", models.BigIntegerField()),
+                ("directory", models.CharField(max_length=255)),
+                ("level_shapes", models.JSONField(default=list)),
+                ("sagittal", models.ImageField(blank=True, upload_to="previews")),
+                ("coronal", models.ImageField(blank=True, upload_to="previews")),
+                ("axial", models.ImageField(blank=True, upload_to="previews")),
+                (
+                    "nifti",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="preview",
+                        to="base_models.nifti",
+                    ),
+                ),
+            ],
+            options={
+                "get_latest_by": "modified",
+                "abstract": False,
+            },
+        ),
+    ]
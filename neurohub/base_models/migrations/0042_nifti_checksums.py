@@ -0,0 +1,62 @@
+# Generated by Django 4.1.6 on 2026-10-18 07:36
+
+from django.db import migrations, models
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("base_models", "0041_niftipreview"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProcessedInput",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created",
+                    django_extensions.db.fields.CreationDateTimeField(
+                        auto_now_add=True, verbose_name="created"
+                    ),
+                ),
+                (
+                    "modified",
+                    django_extensions.db.fields.ModificationDateTimeField(
+                        auto_now=True, verbose_name="modified"
+                    ),
+                ),
+                ("stage", models.CharField(max_length=64)),
+                ("input_hash", models.CharField(max_length=64)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="nifti",
+            name="content_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name="nifti",
+            name="content_hash_mtime_ns",
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name="nifti",
+            name="file_hashes",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddConstraint(
+            model_name="processedinput",
+            constraint=models.UniqueConstraint(
+                fields=("stage", "input_hash"), name="unique_stage_input_hash"
+            ),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.1.6 on 2026-10-18 07:39
+
+from django.db import migrations, models
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("base_models", "0042_nifti_checksums"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WeatherReading",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created",
+                    django_extensions.db.fields.CreationDateTimeField(
+                        auto_now_add=True, verbose_name="created"
+                    ),
+                ),
+                (
+                    "modified",
+                    django_extensions.db.fields.ModificationDateTimeField(
+                        auto_now=True, verbose_name="modified"
+                    ),
+                ),
+                ("time", models.DateTimeField(unique=True)),
+                ("temp", models.FloatField(null=True)),
+                ("dwpt", models.FloatField(null=True)),
+                ("rhum", models.FloatField(null=True)),
+                ("prcp", models.FloatField(null=True)),
+                ("snow", models.FloatField(null=True)),
+                ("wdir", models.FloatField(null=True)),
+                ("wspd", models.FloatField(null=True)),
+                ("wpgt", models.FloatField(null=True)),
+                ("pres", models.FloatField(null=True)),
+                ("tsun", models.FloatField(null=True)),
+                ("coco", models.FloatField(null=True)),
+            ],
+            options={
+                "ordering": ("time",),
+            },
+        ),
+    ]
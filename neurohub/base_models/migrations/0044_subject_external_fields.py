@@ -0,0 +1,27 @@
+# Generated by Django 4.1.6 on 2026-10-18 07:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("base_models", "0043_weatherreading"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="subject",
+            name="dominant_hand",
+            field=models.CharField(blank=True, max_length=16, null=True),
+        ),
+        migrations.AddField(
+            model_name="subject",
+            name="questionnaire_id",
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name="subject",
+            name="sex",
+            field=models.CharField(blank=True, max_length=16, null=True),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.1.6 on 2026-10-18 07:47
+
+import django_extensions.db.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("base_models", "0044_subject_external_fields"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="QuestionnaireResponse",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created",
+                    django_extensions.db.fields.CreationDateTimeField(
+                        auto_now_add=True, verbose_name="created"
+                    ),
+                ),
+                (
+                    "modified",
+                    django_extensions.db.fields.ModificationDateTimeField(
+                        auto_now=True, verbose_name="modified"
+                    ),
+                ),
+                ("subject_id", models.CharField(db_index=True, max_length=64)),
+                ("timestamp", models.DateTimeField(db_index=True)),
+                ("answers", models.JSONField(default=list)),
+                ("answers_hash", models.CharField(max_length=64)),
+            ],
+            options={
+                "ordering": ("subject_id", "timestamp"),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="questionnaireresponse",
+            constraint=models.UniqueConstraint(
+                fields=("subject_id", "timestamp"), name="unique_questionnaire_response"
+            ),
+        ),
+    ]
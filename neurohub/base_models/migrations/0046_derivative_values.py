@@ -0,0 +1,91 @@
+# Generated by Django 4.1.6 on 2026-10-18 07:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("base_models", "0045_questionnaire_response"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DerivativeValue",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("value", models.FloatField(null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Metric",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("name", models.CharField(max_length=255, unique=True)),
+            ],
+            options={
+                "ordering": ("name",),
+            },
+        ),
+        migrations.CreateModel(
+            name="Region",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("atlas", models.CharField(blank=True, default="", max_length=100)),
+                ("name", models.CharField(max_length=255)),
+            ],
+            options={
+                "ordering": ("atlas", "name"),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="region",
+            constraint=models.UniqueConstraint(
+                fields=("atlas", "name"), name="unique_region"
+            ),
+        ),
+        migrations.AddField(
+            model_name="derivativevalue",
+            name="derivative",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="regional_values",
+                to="base_models.tensorderivative",
+            ),
+        ),
+        migrations.AddField(
+            model_name="derivativevalue",
+            name="metric",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, to="base_models.metric"
+            ),
+        ),
+        migrations.AddField(
+            model_name="derivativevalue",
+            name="region",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, to="base_models.region"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="derivativevalue",
+            index=models.Index(
+                fields=["metric", "region"], name="base_models_metric__3ae9a7_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="derivativevalue",
+            constraint=models.UniqueConstraint(
+                fields=("derivative", "region", "metric"),
+                name="unique_derivative_value",
+            ),
+        ),
+    ]
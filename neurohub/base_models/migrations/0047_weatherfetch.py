@@ -0,0 +1,43 @@
+# Generated by Django 4.1.6 on 2026-10-18 08:26
+
+from django.db import migrations, models
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("base_models", "0046_derivative_values"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WeatherFetch",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created",
+                    django_extensions.db.fields.CreationDateTimeField(
+                        auto_now_add=True, verbose_name="created"
+                    ),
+                ),
+                (
+                    "modified",
+                    django_extensions.db.fields.ModificationDateTimeField(
+                        auto_now=True, verbose_name="modified"
+                    ),
+                ),
+                ("date", models.DateField(unique=True)),
+            ],
+            options={
+                "ordering": ("date",),
+            },
+        ),
+    ]
@@ -1,9 +1,35 @@
 from neurohub.base_models.models.condition import Condition  # noqa: F401
+from neurohub.base_models.models.derivative_value import (  # noqa: F401
+    DerivativeValue,
+)
+from neurohub.base_models.models.file_manifest import (  # noqa: F401
+    FileManifestEntry,
+)
 from neurohub.base_models.models.group import Group  # noqa: F401
+from neurohub.base_models.models.metric import Metric  # noqa: F401
 from neurohub.base_models.models.nifti import NIfTI  # noqa: F401
+from neurohub.base_models.models.nifti_preview import (  # noqa: F401
+    NIfTIPreview,
+)
+from neurohub.base_models.models.processed_input import (  # noqa: F401
+    ProcessedInput,
+)
+from neurohub.base_models.models.questionnaire_response import (  # noqa: F401
+    QuestionnaireResponse,
+)
+from neurohub.base_models.models.region import Region  # noqa: F401
 from neurohub.base_models.models.session import Session  # noqa: F401
 from neurohub.base_models.models.study import Study  # noqa: F401
 from neurohub.base_models.models.subject import Subject  # noqa: F401
 from neurohub.base_models.models.tensor_derivative import (  # noqa: F401
     TensorDerivative,
 )
+from neurohub.base_models.models.volume_statistics import (  # noqa: F401
+    VolumeStatistics,
+)
+from neurohub.base_models.models.weather_fetch import (  # noqa: F401
+    WeatherFetch,
+)
+from neurohub.base_models.models.weather_reading import (  # noqa: F401
+    WeatherReading,
+)
@@ -0,0 +1,47 @@
+"""
+Definition of the :class:`DerivativeValue` model.
+"""
+from django.db import models
+
+
+class DerivativeValue(models.Model):
+    """
+    A single value of a tensor derivative's table, stored so that regional
+    values can be queried across subjects without reading derivative files.
+    """
+
+    #: Derivative the value was read from.
+    derivative = models.ForeignKey(
+        "base_models.TensorDerivative",
+        on_delete=models.CASCADE,
+        related_name="regional_values",
+    )
+
+    #: Region (table row) of the value.
+    region = models.ForeignKey("base_models.Region", on_delete=models.CASCADE)
+
+    #: Metric (table column) of the value.
+    metric = models.ForeignKey("base_models.Metric", on_delete=models.CASCADE)
+
+    #: The value itself.
+    value = models.FloatField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["derivative", "region", "metric"],
+                name="unique_derivative_value",
+            )
+        ]
+        indexes = [models.Index(fields=["metric", "region"])]
+
+    def __str__(self) -> str:
+        """
+        Returns the string representation of this instance.
+
+        Returns
+        -------
+        str
+            String representation
+        """
+        return f"{self.derivative_id} {self.region_id} {self.metric_id}: {self.value}"
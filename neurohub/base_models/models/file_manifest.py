@@ -0,0 +1,160 @@
+"""
+Definition of the :class:`FileManifestEntry` model.
+"""
+from pathlib import Path
+from typing import NamedTuple
+
+from django.db import models
+from django_extensions.db.models import TimeStampedModel
+
+from neurohub.base_models.filesystem import FileStat
+
+
+class ManifestDiff(NamedTuple):
+    """
+    Paths that were added, changed or removed since the last ingestion.
+    """
+
+    added: list[str]
+    changed: list[str]
+    removed: list[str]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+
+class FileManifestEntry(TimeStampedModel):
+    """
+    Records the filesystem state of a file at the time it was last ingested,
+    so that re-runs only need to process files that actually changed.
+    """
+
+    #: Ingestion this file belongs to (e.g. "tensor_derivative").
+    kind = models.CharField(max_length=64, db_index=True)
+
+    #: Absolute path of the ingested file.
+    path = models.CharField(max_length=1000, unique=True)
+
+    #: File size in bytes.
+    size = models.BigIntegerField()
+
+    #: Modification time in nanoseconds.
+    mtime_ns = models.BigIntegerField()
+
+    #: Inode number.
+    inode = models.BigIntegerField()
+
+    class Meta:
+        verbose_name_plural = "file manifest entries"
+
+    def __str__(self) -> str:
+        """
+        Returns the string representation of this instance.
+
+        Returns
+        -------
+        str
+            String representation
+        """
+        return self.path
+
+    @property
+    def stat(self) -> FileStat:
+        """
+        Returns the recorded file stats.
+
+        Returns
+        -------
+        FileStat
+            Recorded file stats
+        """
+        return FileStat(self.size, self.mtime_ns, self.inode)
+
+    @classmethod
+    def query_recorded(cls, kind: str, base_dir: Path) -> dict[str, FileStat]:
+        """
+        Returns the recorded stats of every *kind* file under *base_dir*.
+
+        Parameters
+        ----------
+        kind : str
+            Ingestion kind
+        base_dir : Path
+            Base directory
+
+        Returns
+        -------
+        dict[str, FileStat]
+            Recorded file stats by path
+        """
+        rows = cls.objects.filter(
+            kind=kind, path__startswith=str(Path(base_dir)).rstrip("/") + "/"
+        ).values_list("path", "size", "mtime_ns", "inode")
+        return {path: FileStat(*stat) for path, *stat in rows}
+
+    @classmethod
+    def diff(
+        cls, kind: str, base_dir: Path, snapshot: dict[str, FileStat]
+    ) -> ManifestDiff:
+        """
+        Compares a directory snapshot with the recorded manifest.
+
+        Parameters
+        ----------
+        kind : str
+            Ingestion kind
+        base_dir : Path
+            Base directory the snapshot was taken of
+        snapshot : dict[str, FileStat]
+            Current file stats, see
+            :func:`~neurohub.base_models.filesystem.snapshot_directory`
+
+        Returns
+        -------
+        ManifestDiff
+            Added, changed and removed paths
+        """
+        recorded = cls.query_recorded(kind, base_dir)
+        added, changed = [], []
+        for path, stat in snapshot.items():
+            previous = recorded.get(path)
+            if previous is None:
+                added.append(path)
+            elif previous != stat:
+                changed.append(path)
+        removed = [path for path in recorded if path not in snapshot]
+        return ManifestDiff(added=added, changed=changed, removed=removed)
+
+    @classmethod
+    def record(cls, kind: str, snapshot: dict[str, FileStat]) -> None:
+        """
+        Inserts or updates the manifest entries of the given files.
+
+        Parameters
+        ----------
+        kind : str
+            Ingestion kind
+        snapshot : dict[str, FileStat]
+            File stats by path
+        """
+        cls.objects.bulk_create(
+            [
+                cls(kind=kind, path=path, **stat._asdict())
+                for path, stat in snapshot.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["path"],
+            update_fields=["kind", "size", "mtime_ns", "inode", "modified"],
+        )
+
+    @classmethod
+    def forget(cls, paths: list[str]) -> None:
+        """
+        Removes the manifest entries of the given files.
+
+        Parameters
+        ----------
+        paths : list[str]
+            File paths
+        """
+        cls.objects.filter(path__in=paths).delete()
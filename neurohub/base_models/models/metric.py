@@ -0,0 +1,31 @@
+"""
+Definition of the :class:`Metric` model.
+"""
+from django.db import models
+
+
+class Metric(models.Model):
+    """
+    A metric of derivative tables (e.g. "FA_mean"), referred to by
+    :class:`~neurohub.base_models.models.derivative_value.DerivativeValue`
+    rows so that metric names are stored once.
+    """
+
+    id = models.AutoField(primary_key=True)
+
+    #: Metric name, as found in derivative table columns.
+    name = models.CharField(max_length=255, unique=True)
+
+    class Meta:
+        ordering = ("name",)
+
+    def __str__(self) -> str:
+        """
+        Returns the string representation of this instance.
+
+        Returns
+        -------
+        str
+            String representation
+        """
+        return self.name
@@ -2,15 +2,191 @@
 Definition of the :class:`NIfTI` model.
 """
 import json
+import math
+import os
 from collections.abc import Iterable
 from pathlib import Path
+from typing import Any
 
 import nibabel as nib
-from bids.layout import parse_file_entities
+import numpy as np
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django_extensions.db.models import TimeStampedModel
 
-# from neurohub.base_models
+from neurohub.base_models.bids_entities import parse_entities
+from neurohub.base_models.file_cache import get_file_cache
+from neurohub.base_models.filesystem import get_directory_cache
+from neurohub.base_models.gradient_table import GradientTable
+from neurohub.base_models.image_access import get_indexed_image, load_image
+
+#: BIDS entities stored in dedicated indexed columns.
+INDEXED_BIDS_ENTITIES = (
+    "datatype",
+    "suffix",
+    "acquisition",
+    "direction",
+    "task",
+    "ceagent",
+)
+
+#: Fields filled by :func:`read_header`.
+HEADER_FIELDS = (
+    "shape",
+    "voxel_sizes",
+    "dtype",
+    "affine",
+    "qform_code",
+    "sform_code",
+    "file_size",
+    "file_mtime_ns",
+)
+
+#: Sidecar keys stored in dedicated indexed columns, by column name.
+INDEXED_SIDECAR_KEYS = {
+    "phase_encoding_direction": "PhaseEncodingDirection",
+    "institution_name": "InstitutionName",
+    "manufacturer": "Manufacturer",
+    "total_readout_time": "TotalReadoutTime",
+    "effective_echo_spacing": "EffectiveEchoSpacing",
+    "repetition_time": "RepetitionTime",
+    "echo_time": "EchoTime",
+}
+
+#: Fields filled by :func:`read_sidecar`.
+SIDECAR_FIELDS = ("sidecar", "sidecar_mtime_ns", *INDEXED_SIDECAR_KEYS)
+
+#: Errors raised when a file's header cannot be read.
+HEADER_READ_ERRORS = (nib.filebasedimages.ImageFileError, OSError, EOFError)
+
+
+def read_header(path: str) -> dict:
+    """
+    Reads the header-derived :class:`NIfTI` field values of a file. Only the
+    header is read, the voxel data is never loaded.
+
+    Parameters
+    ----------
+    path : str
+        Path of the *.nii* or *.nii.gz* file
+
+    Returns
+    -------
+    dict
+        Header-derived field values
+    """
+    stat = os.stat(path)
+    header = nib.load(str(path)).header
+    return {
+        "shape": [int(size) for size in header.get_data_shape()],
+        "voxel_sizes": [float(zoom) for zoom in header.get_zooms()],
+        "dtype": str(header.get_data_dtype()),
+        "affine": header.get_best_affine().tolist(),
+        "qform_code": int(header["qform_code"]),
+        "sform_code": int(header["sform_code"]),
+        "file_size": stat.st_size,
+        "file_mtime_ns": stat.st_mtime_ns,
+    }
+
+
+def get_sidecar_path(path: str) -> Path:
+    """
+    Returns the path of the JSON sidecar of a *.nii* file.
+
+    Parameters
+    ----------
+    path : str
+        Path of the *.nii* or *.nii.gz* file
+
+    Returns
+    -------
+    Path
+        JSON sidecar path
+    """
+    path = Path(path)
+    return path.parent / (path.name.split(".")[0] + ".json")
+
+
+def load_json(path: str) -> dict:
+    """
+    Loads a JSON file.
+
+    Parameters
+    ----------
+    path : str
+        JSON file path
+
+    Returns
+    -------
+    dict
+        JSON data
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+def coerce_sidecar_value(column: str, value: Any) -> Any:
+    """
+    Converts a sidecar value to the type of the :class:`NIfTI` column it is
+    stored in.
+
+    Parameters
+    ----------
+    column : str
+        Column name, see :data:`INDEXED_SIDECAR_KEYS`
+    value : Any
+        Sidecar value
+
+    Returns
+    -------
+    Any
+        Converted value, or *None* if it cannot be stored in the column
+    """
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        return None
+    field = NIfTI._meta.get_field(column)
+    if isinstance(field, models.FloatField):
+        try:
+            value = float(value)
+        except ValueError:
+            return None
+        return value if math.isfinite(value) else None
+    value = str(value)
+    return value if len(value) <= field.max_length else None
+
+
+def read_sidecar(json_path: str) -> dict:
+    """
+    Reads the sidecar-derived :class:`NIfTI` field values from a JSON
+    sidecar. A missing, unreadable or malformed sidecar results in empty
+    values, and values that do not fit their column are stored as *None*.
+
+    Parameters
+    ----------
+    json_path : str
+        JSON sidecar path
+
+    Returns
+    -------
+    dict
+        Sidecar-derived field values
+    """
+    mtime_ns = None
+    try:
+        mtime_ns = os.stat(json_path).st_mtime_ns
+        with open(json_path) as f:
+            sidecar = json.load(f)
+    except FileNotFoundError:
+        mtime_ns, sidecar = None, {}
+    except (OSError, ValueError):
+        sidecar = {}
+    if not isinstance(sidecar, dict):
+        sidecar = {}
+    fields = {"sidecar": sidecar, "sidecar_mtime_ns": mtime_ns}
+    for column, key in INDEXED_SIDECAR_KEYS.items():
+        fields[column] = coerce_sidecar_value(column, sidecar.get(key))
+    return fields
 
 
 class NIfTI(TimeStampedModel):
@@ -40,10 +216,66 @@ class NIfTI(TimeStampedModel):
     #: some raw format to NIfTI or of a manipulation of the data.
     is_raw = models.BooleanField(default=False)
 
+    #: Image dimensions, as read from the header.
+    shape = ArrayField(models.PositiveIntegerField(), null=True, db_index=True)
+    #: Voxel sizes (and repetition time for 4D images), as read from the
+    #: header.
+    voxel_sizes = ArrayField(models.FloatField(), null=True, db_index=True)
+    #: Voxel data type, as read from the header.
+    dtype = models.CharField(max_length=32, blank=True, null=True, db_index=True)
+    #: Voxel to world coordinates transformation, as read from the header.
+    affine = ArrayField(ArrayField(models.FloatField(), size=4), size=4, null=True)
+    #: Codes describing the coordinate systems of the qform and sform.
+    qform_code = models.PositiveSmallIntegerField(null=True)
+    sform_code = models.PositiveSmallIntegerField(null=True)
+    #: Size of the file in bytes when the header fields were last read.
+    file_size = models.BigIntegerField(null=True)
+    #: Modification time of the file (in nanoseconds) when the header fields
+    #: were last read.
+    file_mtime_ns = models.BigIntegerField(null=True)
+
+    #: BIDS entities extracted from the file name.
+    entities = models.JSONField(blank=True, default=dict)
+    datatype = models.CharField(max_length=32, blank=True, null=True, db_index=True)
+    suffix = models.CharField(max_length=32, blank=True, null=True, db_index=True)
+    acquisition = models.CharField(max_length=100, blank=True, null=True, db_index=True)
+    direction = models.CharField(max_length=32, blank=True, null=True, db_index=True)
+    task = models.CharField(max_length=100, blank=True, null=True, db_index=True)
+    ceagent = models.CharField(max_length=100, blank=True, null=True, db_index=True)
+
+    #: Contents of the "BIDS sidecar" JSON file.
+    sidecar = models.JSONField(blank=True, default=dict)
+    #: Modification time of the JSON file (in nanoseconds) when the sidecar
+    #: fields were last read, or *None* if they never were.
+    sidecar_mtime_ns = models.BigIntegerField(null=True)
+    phase_encoding_direction = models.CharField(
+        max_length=8, blank=True, null=True, db_index=True
+    )
+    institution_name = models.CharField(
+        max_length=255, blank=True, null=True, db_index=True
+    )
+    manufacturer = models.CharField(
+        max_length=255, blank=True, null=True, db_index=True
+    )
+    total_readout_time = models.FloatField(null=True, db_index=True)
+    effective_echo_spacing = models.FloatField(null=True, db_index=True)
+    repetition_time = models.FloatField(null=True, db_index=True)
+    echo_time = models.FloatField(null=True, db_index=True)
+
+    #: Digest of the contents of the image and its associated files, shared
+    #: by duplicate exports of the same acquisition.
+    content_hash = models.CharField(max_length=64, blank=True, null=True, db_index=True)
+    #: Content digest of each associated file, by file name.
+    file_hashes = models.JSONField(blank=True, default=dict)
+    #: Latest modification time of the associated files (in nanoseconds) when
+    #: they were last hashed.
+    content_hash_mtime_ns = models.BigIntegerField(null=True)
+
     APPENDIX_FILES: Iterable[str] = {".json", ".bval", ".bvec"}
     B0_THRESHOLD: int = 10
 
     _instance: nib.nifti1.Nifti1Image = None
+    _gradient_table: GradientTable = None
 
     # Used to cache JSON data to prevent multiple reads.
     _json_data = None
@@ -51,17 +283,190 @@ class NIfTI(TimeStampedModel):
     class Meta:
         verbose_name = "NIfTI"
         ordering = ("-id",)
+        indexes = [GinIndex(fields=["entities"]), GinIndex(fields=["sidecar"])]
+
+    def save(self, *args, **kwargs):
+        """
+        Refreshes the header and sidecar fields if their files changed since
+        they were last read, then saves the instance.
+        """
+        refreshed = []
+        if self.header_is_stale():
+            try:
+                self.update_header_fields()
+            except HEADER_READ_ERRORS:
+                pass
+            else:
+                refreshed += HEADER_FIELDS
+        if self.sidecar_is_stale():
+            self.update_sidecar_fields()
+            refreshed += SIDECAR_FIELDS
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and refreshed:
+            kwargs["update_fields"] = {*update_fields, *refreshed}
+        super().save(*args, **kwargs)
+
+    def header_is_stale(self) -> bool:
+        """
+        Whether the file was modified since the header fields were last read.
+
+        Returns
+        -------
+        bool
+            Header fields staleness
+        """
+        if not self.path:
+            return False
+        try:
+            mtime_ns = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return False
+        return mtime_ns != self.file_mtime_ns
+
+    def get_current_content_hash(self) -> str:
+        """
+        Returns the content hash, unless the image was modified since it was
+        last hashed.
+
+        Returns
+        -------
+        str
+            Content hash, or *None* if missing or outdated
+        """
+        if self.content_hash_mtime_ns is None or self.file_mtime_ns is None:
+            return None
+        if self.content_hash_mtime_ns < self.file_mtime_ns:
+            return None
+        return self.content_hash
+
+    def sidecar_is_stale(self) -> bool:
+        """
+        Whether the JSON sidecar was created, modified or removed since the
+        sidecar fields were last read.
+
+        Returns
+        -------
+        bool
+            Sidecar fields staleness
+        """
+        if not self.path:
+            return False
+        try:
+            mtime_ns = os.stat(self.json_file).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        return mtime_ns != self.sidecar_mtime_ns
+
+    def update_sidecar_fields(self) -> None:
+        """
+        Reads the JSON sidecar and stores its contents in this instance's
+        fields.
+
+        See Also
+        --------
+        * :func:`read_sidecar`
+        """
+        for field, value in read_sidecar(self.json_file).items():
+            setattr(self, field, value)
+        self._json_data = None
+
+    def update_header_fields(self) -> None:
+        """
+        Reads the file's header and stores the derived values in this
+        instance's fields.
+
+        See Also
+        --------
+        * :func:`read_header`
+        """
+        for field, value in read_header(self.path).items():
+            setattr(self, field, value)
+
+    def update_bids_entities(self) -> None:
+        """
+        Parses the file name's BIDS entities and stores them in this
+        instance's fields.
+        """
+        self.entities = self.get_bids_entities()
+        for entity in INDEXED_BIDS_ENTITIES:
+            setattr(self, entity, self.entities.get(entity))
 
     def get_instance(self) -> nib.nifti1.Nifti1Image:
         """
         Returns
         -------
         nib.nifti1.Nifti1Image
-            NiBabel_ instance of the NIfTI file.
+            NiBabel_ instance of the NIfTI file, with memory-mapped voxel data
+            (see :func:`~neurohub.base_models.image_access.load_image`),
+            shared through the process-wide
+            :class:`~neurohub.base_models.file_cache.FileCache`.
 
         .. _NiBabel: https://nipy.org/nibabel/
         """
-        return nib.load(str(self.path))
+        return get_file_cache().get_or_load("image", self.path, load_image)
+
+    def get_dataobj(self) -> nib.arrayproxy.ArrayProxy:
+        """
+        Returns a lazy proxy of the voxel data which only reads the regions it
+        is sliced with. Compressed files are read through their gzip seek
+        index when one was built, avoiding decompression of everything before
+        the requested region.
+
+        See Also
+        --------
+        * :func:`~neurohub.base_models.image_access.build_gzip_index`
+
+        Returns
+        -------
+        nib.arrayproxy.ArrayProxy
+            Voxel data proxy
+        """
+        if self.is_compressed:
+            image = get_indexed_image(self.path)
+            if image is not None:
+                return image.dataobj
+        return self.instance.dataobj
+
+    def read_volume(self, index: int) -> np.ndarray:
+        """
+        Reads a single volume of a 4D image.
+
+        Parameters
+        ----------
+        index : int
+            Volume index
+
+        Returns
+        -------
+        np.ndarray
+            3D voxel data
+        """
+        return np.asanyarray(self.get_dataobj()[..., index])
+
+    def read_slice(self, axis: int, index: int, volume: int = None) -> np.ndarray:
+        """
+        Reads a single 2D slice of the image.
+
+        Parameters
+        ----------
+        axis : int
+            Spatial axis orthogonal to the slice (0, 1 or 2)
+        index : int
+            Slice index along *axis*
+        volume : int, optional
+            Volume index of 4D images, by default 0
+
+        Returns
+        -------
+        np.ndarray
+            2D voxel data
+        """
+        dataobj = self.get_dataobj()
+        slicer = [slice(None)] * len(dataobj.shape)
+        slicer[axis] = index
+        if len(dataobj.shape) > 3:
+            slicer[3] = volume or 0
+        return np.asanyarray(dataobj[tuple(slicer)])
 
     def get_b_value(self) -> list[int]:
         """
@@ -92,12 +497,9 @@ class NIfTI(TimeStampedModel):
         List[int]
             b-value for each diffusion direction.
         """
-        file_name = self.b_value_file
-        if file_name:
-            with open(file_name) as file_object:
-                content = file_object.read()
-            content = content.splitlines()[0].split(" ")
-            return [int(value) for value in content if value != ""]
+        gradient_table = self.gradient_table
+        if gradient_table is not None:
+            return gradient_table.bvals.astype(int).tolist()
 
     def get_b_vector(self) -> list[list[float]]:
         """
@@ -128,14 +530,48 @@ class NIfTI(TimeStampedModel):
         List[List[float]]
             b-value for each diffusion direction
         """
-        file_name = self.b_vector_file
-        if file_name:
-            with open(file_name) as file_object:
-                content = file_object.read()
-            return [
-                [float(value) for value in vector.rstrip().split(" ")]
-                for vector in content.rstrip().split("\n")
-            ]
+        gradient_table = self.gradient_table
+        if gradient_table is not None:
+            return gradient_table.bvecs.T.tolist()
+
+    def get_gradient_table(self) -> GradientTable:
+        """
+        Reads the FSL format *.bval* and *.bvec* files created alongside DWI_
+        scans by dcm2niix_.
+
+        .. _dcm2niix: https://github.com/rordenlab/dcm2niix
+        .. _DWI: https://en.wikipedia.org/wiki/Diffusion_MRI
+
+        See Also
+        --------
+        * :attr:`gradient_table`
+
+        Returns
+        -------
+        GradientTable
+            Gradient table, or *None* if either file doesn't exist
+        """
+        bval_file, bvec_file = self.b_value_file, self.b_vector_file
+        if bval_file and bvec_file:
+            return GradientTable.from_files(
+                bval_file, bvec_file, b0_threshold=self.B0_THRESHOLD
+            )
+
+    def validate_gradient_table(self) -> list[str]:
+        """
+        Checks the gradient table for common problems, including a mismatch
+        with the number of volumes stored in the header fields.
+
+        Returns
+        -------
+        list[str]
+            Problem descriptions, empty if the table is valid
+        """
+        gradient_table = self.gradient_table
+        if gradient_table is None:
+            return ["Missing b-value or b-vector file."]
+        n_volumes = self.shape[3] if self.shape and len(self.shape) > 3 else None
+        return gradient_table.validate(n_volumes=n_volumes)
 
     def read_json(self) -> dict:
         """
@@ -162,9 +598,8 @@ class NIfTI(TimeStampedModel):
             BIDS sidecar information stored in a JSON file, or *{}* if the file
             doesn't exist
         """
-        if self.json_file.is_file():
-            with open(self.json_file) as f:
-                return json.load(f)
+        if get_directory_cache().is_file(self.json_file):
+            return get_file_cache().get_or_load("sidecar", self.json_file, load_json)
         return {}
 
     def get_total_readout_time(self) -> float:
@@ -227,24 +662,49 @@ class NIfTI(TimeStampedModel):
         """
         return self.json_data.get("InstitutionName")
 
-    def get_file_paths(self) -> list[Path]:
+    def get_file_paths(self, listing: frozenset[str] = None) -> list[Path]:
         """
         Returns the list of files that are associated with the current file.
 
+        Parameters
+        ----------
+        listing : frozenset[str], optional
+            Names of the files in this file's directory, by default read from
+            the process-wide :class:`~neurohub.base_models.filesystem.DirectoryCache`
+
         Returns
         -------
         List[Path]
             List of associated files
         """
         nii_path = Path(self.path)
+        if listing is None:
+            listing = get_directory_cache().list_files(nii_path.parent)
         files = [nii_path]
-        base_path = nii_path.parent / nii_path.name.split(".")[0]
         for appendix in self.APPENDIX_FILES:
-            appendix_path = base_path.with_suffix(appendix)
-            if appendix_path.exists():
+            appendix_path = self.get_sibling_path(appendix)
+            if appendix_path.name in listing:
                 files.append(appendix_path)
         return files
 
+    def get_sibling_path(self, suffix: str) -> Path:
+        """
+        Returns the path of a file sharing this file's name with a different
+        extension.
+
+        Parameters
+        ----------
+        suffix : str
+            Extension of the sibling file (e.g. ".bval")
+
+        Returns
+        -------
+        Path
+            Sibling file path
+        """
+        nii_path = Path(self.path)
+        return nii_path.parent / (nii_path.name.split(".")[0] + suffix)
+
     def get_bids_entities(self) -> dict:
         """
         Returns the BIDS entities extracted from the file name.
@@ -254,18 +714,35 @@ class NIfTI(TimeStampedModel):
         dict
             BIDS entities
         """
-        return parse_file_entities(self.path)
+        return parse_entities(self.path)
 
-    def get_resolution(self) -> list[float]:
+    def get_resolution(self) -> tuple[int]:
         """
-        Returns the resolution of the image.
+        Returns the resolution of the image. Served from the stored header
+        fields, the file is only read if they were never filled.
 
         Returns
         -------
-        List[float]
+        tuple[int]
             Resolution of the image
         """
-        return self.instance.shape
+        if self.shape is None:
+            self.update_header_fields()
+        return tuple(self.shape)
+
+    def get_voxel_sizes(self) -> tuple[float]:
+        """
+        Returns the voxel sizes of the image. Served from the stored header
+        fields, the file is only read if they were never filled.
+
+        Returns
+        -------
+        tuple[float]
+            Voxel sizes of the image
+        """
+        if self.voxel_sizes is None:
+            self.update_header_fields()
+        return tuple(self.voxel_sizes)
 
     @property
     def json_file(self) -> Path:
@@ -276,14 +753,14 @@ class NIfTI(TimeStampedModel):
         Path
             Corresponding json file
         """
-        base_name = Path(self.path).name.split(".")[0]
-        return (Path(self.path).parent / base_name).with_suffix(".json")
+        return get_sidecar_path(self.path)
 
     @property
     def json_data(self) -> dict:
         """
-        Reads BIDS sidecar information and caches within a local variable to
-        prevent multiple reads.
+        Returns BIDS sidecar information. Served from the stored sidecar
+        fields when they were filled, otherwise read from disk and cached
+        within a local variable to prevent multiple reads.
 
         See Also
         --------
@@ -294,6 +771,8 @@ class NIfTI(TimeStampedModel):
         dict
             "BIDS sidecar" JSON data
         """
+        if self.sidecar_mtime_ns is not None:
+            return self.sidecar
         if self._json_data is None:
             self._json_data = self.read_json()
         return self._json_data
@@ -308,9 +787,8 @@ class NIfTI(TimeStampedModel):
         Path
             FSL format b-value file path
         """
-        p = Path(self.path)
-        bval_file = p.parent / Path(p.stem).with_suffix(".bval")
-        if bval_file.is_file():
+        bval_file = self.get_sibling_path(".bval")
+        if get_directory_cache().is_file(bval_file):
             return bval_file
 
     @property
@@ -323,9 +801,8 @@ class NIfTI(TimeStampedModel):
         Path
             FSL format b-vector file path
         """
-        p = Path(self.path)
-        bvec_file = p.parent / Path(p.stem).with_suffix(".bvec")
-        if bvec_file.is_file():
+        bvec_file = self.get_sibling_path(".bvec")
+        if get_directory_cache().is_file(bvec_file):
             return bvec_file
 
     @property
@@ -364,6 +841,25 @@ class NIfTI(TimeStampedModel):
         """
         return self.get_b_vector()
 
+    @property
+    def gradient_table(self) -> GradientTable:
+        """
+        Returns the gradient table of DWI scans, parsed once and cached within
+        a local variable.
+
+        See Also
+        --------
+        * :meth:`get_gradient_table`
+
+        Returns
+        -------
+        GradientTable
+            Gradient table
+        """
+        if self._gradient_table is None:
+            self._gradient_table = self.get_gradient_table()
+        return self._gradient_table
+
     @property
     def is_compressed(self) -> bool:
         """
@@ -407,6 +903,18 @@ class NIfTI(TimeStampedModel):
         """
         return self.get_resolution()
 
+    @property
+    def voxel_size(self) -> tuple[float]:
+        """
+        Returns the voxel sizes of the image.
+
+        Returns
+        -------
+        tuple[float]
+            Voxel sizes of the image
+        """
+        return self.get_voxel_sizes()
+
     @property
     def institution(self) -> str:
         """
@@ -0,0 +1,74 @@
+"""
+Definition of the :class:`NIfTIPreview` model.
+"""
+from django.db import models
+from django_extensions.db.models import TimeStampedModel
+
+#: Anatomical axes of the orthogonal slices, by array axis.
+PREVIEW_AXES = ("sagittal", "coronal", "axial")
+
+
+class NIfTIPreview(TimeStampedModel):
+    """
+    Precomputed web previews of a
+    :class:`~neurohub.base_models.models.nifti.NIfTI` image: orthogonal
+    mid-slice thumbnails and a multi-resolution pyramid of the (first)
+    volume, normalized to 8-bit and stored in the media storage.
+    """
+
+    #: The image previewed.
+    nifti = models.OneToOneField(
+        "base_models.NIfTI", on_delete=models.CASCADE, related_name="preview"
+    )
+
+    #: Modification time of the image file (in nanoseconds) the previews were
+    #: built from.
+    source_mtime_ns = models.BigIntegerField()
+
+    #: Storage directory of this version of the previews.
+    directory = models.CharField(max_length=255)
+
+    #: Shape of each pyramid level, from full resolution to the coarsest.
+    level_shapes = models.JSONField(default=list)
+
+    #: Mid-slice thumbnails.
+    sagittal = models.ImageField(upload_to="previews", blank=True)
+    coronal = models.ImageField(upload_to="previews", blank=True)
+    axial = models.ImageField(upload_to="previews", blank=True)
+
+    def __str__(self) -> str:
+        """
+        Returns the string representation of this instance.
+
+        Returns
+        -------
+        str
+            String representation
+        """
+        return f"Previews of NIfTI #{self.nifti_id}"
+
+    def get_level_name(self, level: int) -> str:
+        """
+        Returns the storage name of a pyramid level.
+
+        Parameters
+        ----------
+        level : int
+            Pyramid level, 0 being full resolution
+
+        Returns
+        -------
+        str
+            Storage name of the level's array
+        """
+        return f"{self.directory}/level-{level}.npy"
+
+    @property
+    def n_levels(self) -> int:
+        """
+        Returns
+        -------
+        int
+            Number of pyramid levels
+        """
+        return len(self.level_shapes)
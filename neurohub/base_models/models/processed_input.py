@@ -0,0 +1,105 @@
+"""
+Definition of the :class:`ProcessedInput` model.
+"""
+from collections.abc import Iterable
+
+from django.db import models
+from django.db.models import Exists, OuterRef, QuerySet
+from django_extensions.db.models import TimeStampedModel
+
+
+class ProcessedInput(TimeStampedModel):
+    """
+    Records that a pipeline stage has processed an input with a given content
+    hash, so that duplicate copies of the same data are not processed again.
+    """
+
+    #: Pipeline stage (e.g. "volume_statistics").
+    stage = models.CharField(max_length=64)
+
+    #: Content hash of the processed input, see
+    #: :attr:`~neurohub.base_models.models.nifti.NIfTI.content_hash`.
+    input_hash = models.CharField(max_length=64)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["stage", "input_hash"], name="unique_stage_input_hash"
+            )
+        ]
+
+    def __str__(self) -> str:
+        """
+        Returns the string representation of this instance.
+
+        Returns
+        -------
+        str
+            String representation
+        """
+        return f"{self.stage}: {self.input_hash}"
+
+    @classmethod
+    def is_processed(cls, stage: str, input_hash: str) -> bool:
+        """
+        Whether *stage* has already processed an input with this hash.
+
+        Parameters
+        ----------
+        stage : str
+            Pipeline stage
+        input_hash : str
+            Content hash
+
+        Returns
+        -------
+        bool
+            Whether the input was processed
+        """
+        return cls.objects.filter(stage=stage, input_hash=input_hash).exists()
+
+    @classmethod
+    def filter_unprocessed(
+        cls, stage: str, queryset: QuerySet, hash_field: str = "content_hash"
+    ) -> QuerySet:
+        """
+        Excludes the rows whose content hash *stage* has already processed.
+        Rows that were not hashed yet are kept.
+
+        Parameters
+        ----------
+        stage : str
+            Pipeline stage
+        queryset : QuerySet
+            Inputs to filter
+        hash_field : str, optional
+            Name of the content hash field, by default "content_hash"
+
+        Returns
+        -------
+        QuerySet
+            Unprocessed inputs
+        """
+        processed = cls.objects.filter(stage=stage, input_hash=OuterRef(hash_field))
+        return queryset.filter(~Exists(processed))
+
+    @classmethod
+    def mark_processed(cls, stage: str, input_hashes: Iterable[str]) -> None:
+        """
+        Records that *stage* processed inputs with the given hashes.
+
+        Parameters
+        ----------
+        stage : str
+            Pipeline stage
+        input_hashes : Iterable[str]
+            Content hashes, *None* values are ignored
+        """
+        cls.objects.bulk_create(
+            [
+                cls(stage=stage, input_hash=input_hash)
+                for input_hash in set(input_hashes)
+                if input_hash
+            ],
+            ignore_conflicts=True,
+        )
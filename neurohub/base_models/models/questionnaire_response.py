@@ -0,0 +1,46 @@
+"""
+Definition of the :class:`QuestionnaireResponse` model.
+"""
+from django.db import models
+from django_extensions.db.models import TimeStampedModel
+
+
+class QuestionnaireResponse(TimeStampedModel):
+    """
+    A single response read from the questionnaire workbook (see the
+    *QUESTIONNAIRE_PATH* setting), stored so that subjects' responses can be
+    queried without parsing the workbook.
+    """
+
+    #: Questionnaire subject ID, see
+    #: :attr:`~neurohub.base_models.models.subject.Subject.questionnaire_id`.
+    subject_id = models.CharField(max_length=64, db_index=True)
+
+    #: Submission time of the response.
+    timestamp = models.DateTimeField(db_index=True)
+
+    #: Column name and value pairs of the response's row, in workbook order.
+    answers = models.JSONField(default=list)
+
+    #: Hash of :attr:`answers`, used to detect changed responses.
+    answers_hash = models.CharField(max_length=64)
+
+    class Meta:
+        ordering = ("subject_id", "timestamp")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["subject_id", "timestamp"],
+                name="unique_questionnaire_response",
+            )
+        ]
+
+    def __str__(self) -> str:
+        """
+        Returns the string representation of this instance.
+
+        Returns
+        -------
+        str
+            String representation
+        """
+        return f"{self.subject_id} ({self.timestamp})"
@@ -0,0 +1,37 @@
+"""
+Definition of the :class:`Region` model.
+"""
+from django.db import models
+
+
+class Region(models.Model):
+    """
+    A region of a parcellation atlas, referred to by
+    :class:`~neurohub.base_models.models.derivative_value.DerivativeValue`
+    rows so that region names are stored once.
+    """
+
+    id = models.AutoField(primary_key=True)
+
+    #: Parcellation atlas (empty if unknown).
+    atlas = models.CharField(max_length=100, blank=True, default="")
+
+    #: Region name, as indexed in derivative tables.
+    name = models.CharField(max_length=255)
+
+    class Meta:
+        ordering = ("atlas", "name")
+        constraints = [
+            models.UniqueConstraint(fields=["atlas", "name"], name="unique_region")
+        ]
+
+    def __str__(self) -> str:
+        """
+        Returns the string representation of this instance.
+
+        Returns
+        -------
+        str
+            String representation
+        """
+        return f"{self.atlas}: {self.name}" if self.atlas else self.name
@@ -5,11 +5,22 @@ from datetime import datetime
 from pathlib import Path
 
 from django.db import models
+from django.db.models import Q
 from django.db.models.query import QuerySet
 from django_extensions.db.models import TimeStampedModel
-from meteostat import Hourly, Point
+from meteostat import Point
 
+from neurohub.base_models.manifest import (
+    get_manifest_file_paths,
+    get_session_manifests,
+)
 from neurohub.base_models.models.tensor_derivative import TensorDerivative
+from neurohub.base_models.weather import (
+    WEATHER_LOCATION,
+    fill_weather_table,
+    get_nearest_indices,
+    get_weather_table,
+)
 
 SECONDS_IN_YEAR: int = 60 * 60 * 24 * 365
 CLAIMED_SESSION_STRING: str = "Subject #{subject_id} MRI session from {date}"
@@ -44,7 +55,7 @@ class Session(TimeStampedModel):
     SESSION_TIME_FORMAT: str = "%H%M"
 
     #: Location of the scanning session.
-    LOCATION = {"lon": 34.8, "lat": 32.0833}  # Tel Aviv
+    LOCATION = WEATHER_LOCATION
     POINT = Point(**LOCATION)
 
     def __init__(self, *args, **kwargs):
@@ -61,10 +72,9 @@ class Session(TimeStampedModel):
             String representation
         """
         date = self.time.date()
-        if hasattr(self, "subject"):
-            return CLAIMED_SESSION_STRING.format(
-                subject_id=self.subject.pylabber_id, date=date
-            )
+        if self.subject_id is not None:
+            # The subject's primary key is its pylabber ID, so no query is needed.
+            return CLAIMED_SESSION_STRING.format(subject_id=self.subject_id, date=date)
         return UNCLAIMED_SESSION_STRING.format(date=date)
 
     def infer_time(self) -> None:
@@ -80,16 +90,18 @@ class Session(TimeStampedModel):
         """
         Returns a list of *.nii* files (and by default also JSON sidecars)
         included in this session.
+
+        See Also
+        --------
+        * :func:`~neurohub.base_models.manifest.get_session_manifests`
+
         Returns
         -------
         List[Path]
             *.nii* files
         """
-        paths = []
-        for nifti in self.nifti_set.all():
-            nii_paths = nifti.get_file_paths()
-            paths += nii_paths
-        return paths
+        manifest = get_session_manifests([self])[self.pk]
+        return get_manifest_file_paths(manifest)
 
     def list_derivatives(self) -> QuerySet:
         """
@@ -100,24 +112,51 @@ class Session(TimeStampedModel):
         List[TensorDerivative]
             Tensor derivatives
         """
-        return TensorDerivative.objects.filter(parent__in=self.nifti_set.all())
+        return TensorDerivative.objects.filter(
+            Q(session_parent=self) | Q(nifti_parent__session=self)
+        )
+
+    def validate_gradient_tables(self) -> dict:
+        """
+        Checks the gradient tables of all DWI scans in this session.
+
+        See Also
+        --------
+        * :meth:`~neurohub.base_models.models.nifti.NIfTI.validate_gradient_table`
+
+        Returns
+        -------
+        dict
+            Problem descriptions by DWI :class:`NIfTI` instance
+        """
+        return {
+            nifti: nifti.validate_gradient_table()
+            for nifti in self.nifti_set.filter(suffix="dwi")
+        }
 
     def get_weather_data(self) -> dict:
         """
-        Returns the weather data for the session location.
+        Returns the weather data for the session location, read from the
+        local weather table (which is filled for the session's day if needed).
+
+        See Also
+        --------
+        * :func:`~neurohub.base_models.weather.get_sessions_weather`
+
         Returns
         -------
         pd.DataFrame
-            `Hourly weather data`_
+            `Hourly weather data`_ of the nearest reading
             .. _Hourly weather data: https://dev.meteostat.net/api/point/hourly.html
         """
         day_start = self.time.replace(hour=0, minute=0, second=0)
         day_end = self.time.replace(hour=23, minute=59, second=59)
-        weather_during_day = Hourly(self.POINT, day_start, day_end).fetch()
-        closest_reading = weather_during_day.index[
-            weather_during_day.index.searchsorted(self.time)
-        ]
-        return weather_during_day.loc[[closest_reading]]
+        fill_weather_table(day_start, day_end)
+        weather_during_day = get_weather_table(day_start, day_end)
+        if weather_during_day.empty:
+            return weather_during_day
+        closest_reading = get_nearest_indices(weather_during_day.index, [self.time])
+        return weather_during_day.iloc[closest_reading]
 
     @property
     def derivatives_set(self) -> QuerySet:
@@ -3,13 +3,38 @@ Definition of the :class:`Study` model.
 """
 import pandas as pd
 from django.db import models
+from django.db.models import Q, QuerySet
 from django_extensions.db.models import TimeStampedModel, TitleDescriptionModel
 
+from neurohub.base_models.derivative_tables import aggregate_derivatives
 from neurohub.base_models.models.session import Session
 from neurohub.base_models.models.subject import Subject
+from neurohub.base_models.models.tensor_derivative import TensorDerivative
+from neurohub.base_models.questionnaires import get_latest_responses
 
 STUDY_IMAGE_UPLOAD_DESTINATION: str = "images/studies"
 
+#: Columns of subjects tables stored with categorical dtypes.
+STUDY_CATEGORICAL_COLUMNS = ("study", "group", "condition")
+
+
+def to_categorical(table: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts the study, group and condition columns of a subjects table
+    to categorical dtypes, which store each title once.
+
+    Parameters
+    ----------
+    table : pd.DataFrame
+        Subjects table
+
+    Returns
+    -------
+    pd.DataFrame
+        Subjects table with categorical columns
+    """
+    return table.astype({column: "category" for column in STUDY_CATEGORICAL_COLUMNS})
+
 
 class Study(TitleDescriptionModel, TimeStampedModel):
     """
@@ -58,50 +83,147 @@ class Study(TitleDescriptionModel, TimeStampedModel):
             condition__in=self.conditions.all(), group__in=self.groups.all()
         )
 
-    def generate_subjects_table(self):
+    def query_associated_derivatives(
+        self,
+        software_used: str,
+        atlas: str,
+        label: str,
+        acquisition: str = None,
+    ) -> QuerySet:
+        """
+        Returns the tensor derivatives of the associated sessions produced by
+        *software_used* for the given atlas, label and (optionally)
+        acquisition.
+
+        Parameters
+        ----------
+        software_used : str
+            Tensor estimator
+        atlas : str
+            Parcellation atlas
+        label : str
+            Derivative label
+        acquisition : str, optional
+            Acquisition label, by default any
+
+        Returns
+        -------
+        QuerySet
+            Matching derivatives
+        """
+        sessions = self.query_associated_sessions()
+        derivatives = TensorDerivative.objects.filter(
+            Q(session_parent__in=sessions) | Q(nifti_parent__session__in=sessions),
+            software_used=software_used,
+            atlas=atlas,
+            label=label,
+        )
+        if acquisition is not None:
+            derivatives = derivatives.filter(acquisition=acquisition)
+        return derivatives.distinct()
+
+    def generate_derivatives_table(
+        self,
+        software_used: str,
+        atlas: str,
+        label: str,
+        acquisition: str = None,
+        max_workers: int = None,
+    ) -> pd.DataFrame:
+        """
+        Returns the matching tensor derivatives of the associated sessions
+        stacked into a single long-format table, see
+        :func:`~neurohub.base_models.derivative_tables.aggregate_derivatives`.
+
+        Parameters
+        ----------
+        software_used : str
+            Tensor estimator
+        atlas : str
+            Parcellation atlas
+        label : str
+            Derivative label
+        acquisition : str, optional
+            Acquisition label, by default any
+        max_workers : int, optional
+            Number of loading processes, by default the number of CPUs
+
+        Returns
+        -------
+        pandas.DataFrame
+            Values keyed by subject, session, region and metric
+        """
+        derivatives = self.query_associated_derivatives(
+            software_used, atlas, label, acquisition=acquisition
+        )
+        return aggregate_derivatives(derivatives, max_workers=max_workers)
+
+    def query_subject_memberships(self, *fields: str) -> list[tuple]:
+        """
+        Returns the associated subjects with their study group and condition
+        (the first by title if a subject has several) in a single query,
+        following the default subject ordering.
+
+        Parameters
+        ----------
+        *fields : str
+            Additional subject fields to return
+
+        Returns
+        -------
+        list[tuple]
+            Primary key, group title, condition title and *fields* of each
+            associated subject
+        """
+        return list(
+            self.query_associated_subjects()
+            # DISTINCT ON requires its expressions to lead the ordering, so the
+            # descending primary key restores Subject.Meta.ordering.
+            .order_by("-pk", "group__title", "condition__title")
+            .distinct("pk")
+            .values_list("pk", "group__title", "condition__title", *fields)
+        )
+
+    def generate_subjects_table(self) -> pd.DataFrame:
         """
         Returns
         -------
         pandas.DataFrame
             DataFrame of associated subjects
         """
-        subjects = self.query_associated_subjects()
-        return pd.DataFrame(
-            [
-                {
-                    "id": subject.pk,
-                    "study": self.title,
-                    "group": [
-                        g for g in subject.group_set.all() if g in self.groups.all()
-                    ][0],
-                    "condition": [
-                        c
-                        for c in subject.condition_set.all()
-                        if c in self.conditions.all()
-                    ][0],
-                }
-                for subject in subjects
-            ]
+        table = pd.DataFrame.from_records(
+            self.query_subject_memberships(), columns=["id", "group", "condition"]
         )
+        table.insert(1, "study", self.title)
+        return to_categorical(table)
 
-    def generate_full_subjects_table(self):
+    def generate_full_subjects_table(self) -> pd.DataFrame:
         """
+        Returns the latest questionnaire response of each associated subject
+        with its study group and condition. The questionnaire responses are
+        read once and joined to the subjects in a single merge.
+
         Returns
         -------
         pandas.DataFrame
             DataFrame of associated subjects
         """
-        subjects = self.query_associated_subjects()
-        df = pd.DataFrame()
-        for subject in subjects:
-            questionnaire_data = subject.get_questionnaire_data().copy()
-            questionnaire_data["pylabber_id"] = subject.pk
-            questionnaire_data["study"] = self.title
-            questionnaire_data["group"] = [
-                g for g in subject.group_set.all() if g in self.groups.all()
-            ][0]
-            questionnaire_data["condition"] = [
-                c for c in subject.condition_set.all() if c in self.conditions.all()
-            ][0]
-            df = pd.concat([df, questionnaire_data], axis=0)
-        return df.reset_index(drop=True)
+        subjects = pd.DataFrame.from_records(
+            self.query_subject_memberships("questionnaire_id"),
+            columns=["pylabber_id", "group", "condition", "questionnaire_id"],
+        )
+        subjects.insert(1, "study", self.title)
+        subjects = subjects[subjects["questionnaire_id"].notna()]
+        responses = get_latest_responses(subjects["questionnaire_id"])
+        if responses.empty:
+            columns = ["pylabber_id", *STUDY_CATEGORICAL_COLUMNS]
+            return to_categorical(pd.DataFrame(columns=columns))
+        responses["questionnaire_id"] = responses["Subject ID"].astype(str)
+        subjects["questionnaire_id"] = subjects["questionnaire_id"].astype(str)
+        table = subjects.merge(responses, on="questionnaire_id", how="inner")
+        columns = [
+            *responses.columns.drop("questionnaire_id"),
+            "pylabber_id",
+            *STUDY_CATEGORICAL_COLUMNS,
+        ]
+        return to_categorical(table[columns])
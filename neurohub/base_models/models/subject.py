@@ -6,13 +6,12 @@ from datetime import date
 from typing import Any
 
 import pandas as pd
-from django.conf import settings
 from django.core.validators import MaxValueValidator
 from django.db import models
 from django_extensions.db.models import TimeStampedModel
-from questionnaire_reader import QuestionnaireReader
 
-from neurohub.base_models.utils import read_pylabber_table, read_subject_table
+from neurohub.base_models.external_tables import CRF_TABLE, PYLABBER_TABLE
+from neurohub.base_models.questionnaires import get_latest_responses
 
 
 class Subject(TimeStampedModel):
@@ -52,6 +51,17 @@ class Subject(TimeStampedModel):
         validators=[MaxValueValidator(date.today())],
     )
 
+    #: Subject's sex, as recorded in pylabber.
+    sex = models.CharField(max_length=16, blank=True, null=True)
+
+    #: Subject's dominant hand, as recorded in pylabber.
+    dominant_hand = models.CharField(max_length=16, blank=True, null=True)
+
+    #: ID of the subject's questionnaire responses, as recorded in the CRF.
+    questionnaire_id = models.CharField(
+        max_length=64, blank=True, null=True, db_index=True
+    )
+
     #: Custom attributes dictionary.
     custom_attributes = models.JSONField(blank=True, default=dict)
 
@@ -92,29 +102,32 @@ class Subject(TimeStampedModel):
         Temporary method to use an external table to retrieve subject
         personal information.
 
+        See Also
+        --------
+        * :data:`~neurohub.base_models.external_tables.CRF_TABLE`
+
         Returns
         -------
         pd.Series
             Subject personal information
         """
-        subject_table = read_subject_table()
-        subject_table["Questionnaire"].fillna("", inplace=True)
-        this_subject = subject_table["ID"] == self.id_number
-        return subject_table[this_subject].drop_duplicates(subset="ID", keep="last")
+        return CRF_TABLE.lookup(self.id_number).iloc[-1:]
 
     def get_pylabber_information(self) -> pd.Series:
         """
         Temporary method to use an external table to retrieve subject
         personal information.
 
+        See Also
+        --------
+        * :data:`~neurohub.base_models.external_tables.PYLABBER_TABLE`
+
         Returns
         -------
         pd.Series
             Subject personal information
         """
-        subject_table = read_pylabber_table()
-        this_subject = subject_table["ID"] == self.pylabber_id
-        return subject_table[this_subject].drop_duplicates(
+        return PYLABBER_TABLE.lookup(self.pylabber_id).drop_duplicates(
             subset="ID Number", keep="last"
         )
 
@@ -138,23 +151,16 @@ class Subject(TimeStampedModel):
             setattr(self, key, this_subject[value].squeeze())
         self.save()
 
-    def get_questionnaire_data(self):
+    def get_questionnaire_data(self) -> pd.DataFrame:
         """
         A method to link between a subject to it's questionnaire data.
 
         Returns
         -------
-        pd.Series
-            Subject and Questionnaire information.
+        pd.DataFrame
+            Subject's latest questionnaire response
         """
-        # Getting the questionnaire data from the sheets document.
-        questionnaire = QuestionnaireReader(path=settings.QUESTIONNAIRE_PATH).data
-        questionnaire["Timestamp"] = questionnaire["Timestamp"].astype(str)
-        # Getting the subject's questionnaire data.
-        this_subject = questionnaire["Subject ID"] == self.questionnaire_id
-        return questionnaire[this_subject].drop_duplicates(
-            subset=["Subject ID"], keep="last"
-        )
+        return get_latest_responses([self.questionnaire_id])
 
     @property
     def crf_information(self) -> pd.DataFrame:
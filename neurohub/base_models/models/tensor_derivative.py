@@ -1,10 +1,17 @@
 from pathlib import Path
 
 import pandas as pd
-from bids.layout import parse_file_entities
 from django.db import models
 from django_extensions.db.models import TimeStampedModel
 
+from neurohub.base_models.bids_entities import parse_entities
+from neurohub.base_models.derivative_store import (
+    get_store_path,
+    is_stored,
+    read_stored_derivative,
+)
+from neurohub.base_models.file_cache import get_file_cache
+
 TENSOR_ESTIMATORS = ["dipy", "mrtrix3", "fsl"]
 MATCHING_ENTITIES = ["subject", "session"]
 
@@ -42,6 +49,9 @@ class TensorDerivative(TimeStampedModel):
     session = models.CharField(max_length=100, null=True)
     subject = models.CharField(max_length=100, null=True)
 
+    #: BIDS entities mirrored by the fields above.
+    BIDS_ENTITY_FIELDS = ("acquisition", "atlas", "label", "session", "subject")
+
     def validate_same_bids_entities(self):
         """
         Check that the parent scan and the derivative are from the same subject.
@@ -67,17 +77,34 @@ class TensorDerivative(TimeStampedModel):
             return False
         return True
 
+    def get_store_path(self) -> Path:
+        """
+        Return the path of this derivative's copy in the derivative store, or
+        *None* if it cannot be stored.
+        """
+        if self.software_used is None or self.atlas is None:
+            return None
+        return get_store_path(self.path, self.software_used, self.atlas)
+
     def get_dataframe(self):
         """
-        Return the dataframe stored in the pickle file.
+        Return the dataframe stored in the pickle file, read from the
+        derivative store if it holds a current copy. Loaded dataframes are
+        shared through the process-wide file cache, so they must not be
+        modified in place.
         """
-        return pd.read_pickle(self.path)
+        store_path = self.get_store_path()
+        if store_path is not None and is_stored(self.path, store_path):
+            return get_file_cache().get_or_load(
+                "stored-dataframe", store_path, read_stored_derivative
+            )
+        return get_file_cache().get_or_load("dataframe", self.path, pd.read_pickle)
 
     def get_bids_entities(self):
         """
         Return the BIDS entities of the parent scan.
         """
-        return parse_file_entities(self.path)
+        return parse_entities(self.path)
 
     def set_bids_entities_as_properties(self):
         """
@@ -0,0 +1,69 @@
+"""
+Definition of the :class:`VolumeStatistics` model.
+"""
+from django.contrib.postgres.fields import ArrayField
+from django.db import models
+from django_extensions.db.models import TimeStampedModel
+
+
+class VolumeStatistics(TimeStampedModel):
+    """
+    Summary statistics of a single volume of a
+    :class:`~neurohub.base_models.models.nifti.NIfTI` image, precomputed so
+    that they never need to be calculated on request.
+    """
+
+    #: The image these statistics describe.
+    nifti = models.ForeignKey(
+        "base_models.NIfTI",
+        on_delete=models.CASCADE,
+        related_name="volume_statistics_set",
+    )
+    #: Index of the volume within the image (0 for 3D images).
+    volume = models.PositiveIntegerField()
+
+    mean = models.FloatField()
+    std = models.FloatField()
+    min = models.FloatField()
+    max = models.FloatField()
+    #: Number of voxels with a non-zero value.
+    nonzero_count = models.BigIntegerField()
+    #: Histogram counts of equal-width bins spanning [min, max].
+    histogram = ArrayField(models.BigIntegerField())
+
+    #: Modification time of the image file (in nanoseconds) the statistics
+    #: were computed from.
+    source_mtime_ns = models.BigIntegerField()
+
+    class Meta:
+        verbose_name_plural = "volume statistics"
+        ordering = ("nifti", "volume")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["nifti", "volume"], name="unique_nifti_volume_statistics"
+            )
+        ]
+
+    def __str__(self) -> str:
+        """
+        Returns the string representation of this instance.
+
+        Returns
+        -------
+        str
+            String representation
+        """
+        return f"Volume #{self.volume} statistics of NIfTI #{self.nifti_id}"
+
+    @property
+    def histogram_edges(self) -> list[float]:
+        """
+        Returns the edges of the histogram bins.
+
+        Returns
+        -------
+        list[float]
+            Bin edges
+        """
+        width = (self.max - self.min) / len(self.histogram)
+        return [self.min + width * index for index in range(len(self.histogram) + 1)]
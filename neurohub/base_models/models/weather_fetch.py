@@ -0,0 +1,30 @@
+"""
+Definition of the :class:`WeatherFetch` model.
+"""
+from django.db import models
+from django_extensions.db.models import TimeStampedModel
+
+
+class WeatherFetch(TimeStampedModel):
+    """
+    Records a day whose weather readings were fetched after they were final,
+    so that it is never requested again, even if the fetcher returned no or
+    only some of its hourly readings.
+    """
+
+    #: Fetched day.
+    date = models.DateField(unique=True)
+
+    class Meta:
+        ordering = ("date",)
+
+    def __str__(self) -> str:
+        """
+        Returns the string representation of this instance.
+
+        Returns
+        -------
+        str
+            String representation
+        """
+        return str(self.date)
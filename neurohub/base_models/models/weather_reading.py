@@ -0,0 +1,70 @@
+"""
+Definition of the :class:`WeatherReading` model.
+"""
+from django.db import models
+from django_extensions.db.models import TimeStampedModel
+
+#: Hourly weather variables, as named by meteostat_.
+#:
+#: .. _meteostat: https://dev.meteostat.net/python/hourly.html#data-structure
+WEATHER_COLUMNS = (
+    "temp",
+    "dwpt",
+    "rhum",
+    "prcp",
+    "snow",
+    "wdir",
+    "wspd",
+    "wpgt",
+    "pres",
+    "tsun",
+    "coco",
+)
+
+
+class WeatherReading(TimeStampedModel):
+    """
+    An hourly weather reading at the location of the scanning sessions (see
+    :attr:`~neurohub.base_models.models.session.Session.LOCATION`), stored
+    locally so that session covariates do not require network requests.
+    """
+
+    #: Time of the reading.
+    time = models.DateTimeField(unique=True)
+
+    #: Air temperature (°C).
+    temp = models.FloatField(null=True)
+    #: Dew point (°C).
+    dwpt = models.FloatField(null=True)
+    #: Relative humidity (%).
+    rhum = models.FloatField(null=True)
+    #: One hour precipitation total (mm).
+    prcp = models.FloatField(null=True)
+    #: Snow depth (mm).
+    snow = models.FloatField(null=True)
+    #: Average wind direction (degrees).
+    wdir = models.FloatField(null=True)
+    #: Average wind speed (km/h).
+    wspd = models.FloatField(null=True)
+    #: Peak wind gust (km/h).
+    wpgt = models.FloatField(null=True)
+    #: Average sea-level air pressure (hPa).
+    pres = models.FloatField(null=True)
+    #: One hour sunshine total (minutes).
+    tsun = models.FloatField(null=True)
+    #: Weather condition code.
+    coco = models.FloatField(null=True)
+
+    class Meta:
+        ordering = ("time",)
+
+    def __str__(self) -> str:
+        """
+        Returns the string representation of this instance.
+
+        Returns
+        -------
+        str
+            String representation
+        """
+        return f"Weather at {self.time}"
@@ -0,0 +1,449 @@
+"""
+Precomputation of web previews: orthogonal mid-slice thumbnails and a
+multi-resolution pyramid from which pan/zoom tiles are served without
+touching the original (compressed) image.
+"""
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Exists, F, OuterRef, QuerySet
+from PIL import Image
+
+from neurohub.base_models.checksums import group_by_content
+from neurohub.base_models.models import NIfTI, NIfTIPreview, ProcessedInput
+from neurohub.base_models.models.nifti_preview import PREVIEW_AXES
+from neurohub.base_models.volume_statistics import (
+    IMAGE_READ_ERRORS,
+    open_image,
+    read_voxels,
+)
+
+#: Pyramid levels are halved until their largest dimension is below this.
+MIN_LEVEL_SIZE: int = 32
+
+#: Side length of served tiles, in pixels.
+TILE_SIZE: int = 256
+
+#: Intensity percentiles mapped to black and white.
+WINDOW_PERCENTILES = (0.5, 99.5)
+
+#: :class:`ProcessedInput` stage of preview building.
+STAGE: str = "previews"
+
+
+def normalize(volume: np.ndarray) -> np.ndarray:
+    """
+    Windows a volume's intensities by percentiles of its finite voxels and
+    scales them to 8-bit. NaN voxels are shown black and infinite ones are
+    clipped to the window.
+
+    Parameters
+    ----------
+    volume : np.ndarray
+        3D voxel data
+
+    Returns
+    -------
+    np.ndarray
+        Normalized uint8 voxel data
+    """
+    volume = np.asarray(volume, dtype=np.float32)
+    finite = volume[np.isfinite(volume)]
+    if not finite.size:
+        return np.zeros(volume.shape, dtype=np.uint8)
+    low, high = np.percentile(finite, WINDOW_PERCENTILES)
+    if high <= low:
+        return np.zeros(volume.shape, dtype=np.uint8)
+    volume = np.nan_to_num(volume, nan=low, posinf=high, neginf=low)
+    scaled = (np.clip(volume, low, high) - low) * (255 / (high - low))
+    return scaled.astype(np.uint8)
+
+
+def downsample(volume: np.ndarray) -> np.ndarray:
+    """
+    Halves each dimension of a volume by averaging 2x2x2 blocks.
+
+    Parameters
+    ----------
+    volume : np.ndarray
+        uint8 voxel data
+
+    Returns
+    -------
+    np.ndarray
+        Downsampled uint8 voxel data
+
+    Raises
+    ------
+    ValueError
+        If the volume is not 3D
+    """
+    if volume.ndim != 3:
+        raise ValueError(f"Expected a 3D volume, got shape {volume.shape}.")
+    padded = np.pad(volume, [(0, size % 2) for size in volume.shape], mode="edge")
+    x, y, z = (size // 2 for size in padded.shape)
+    blocks = padded.reshape(x, 2, y, 2, z, 2).astype(np.uint16)
+    return (blocks.sum(axis=(1, 3, 5)) // 8).astype(np.uint8)
+
+
+def build_pyramid(volume: np.ndarray) -> list[np.ndarray]:
+    """
+    Builds a multi-resolution pyramid of a normalized volume.
+
+    Parameters
+    ----------
+    volume : np.ndarray
+        uint8 voxel data
+
+    Returns
+    -------
+    list[np.ndarray]
+        Pyramid levels, from full resolution to the coarsest
+    """
+    levels = [volume]
+    while max(levels[-1].shape) >= 2 * MIN_LEVEL_SIZE:
+        levels.append(downsample(levels[-1]))
+    return levels
+
+
+def take_slice(volume: np.ndarray, axis: int, index: int) -> np.ndarray:
+    """
+    Extracts a 2D slice, oriented for display (superior/anterior up).
+
+    Parameters
+    ----------
+    volume : np.ndarray
+        3D voxel data
+    axis : int
+        Array axis orthogonal to the slice
+    index : int
+        Slice index along *axis*
+
+    Returns
+    -------
+    np.ndarray
+        2D slice
+    """
+    return np.rot90(np.take(volume, index, axis=axis))
+
+
+def encode_png(array: np.ndarray) -> bytes:
+    """
+    Encodes a 2D uint8 array as a grayscale PNG.
+
+    Parameters
+    ----------
+    array : np.ndarray
+        2D uint8 array
+
+    Returns
+    -------
+    bytes
+        PNG file contents
+    """
+    buffer = io.BytesIO()
+    Image.fromarray(np.ascontiguousarray(array), mode="L").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def read_first_volume(path: str) -> np.ndarray:
+    """
+    Reads the first 3D volume of an image, indexing the first element of every
+    dimension beyond the third (e.g. of 4D series or 5D X,Y,Z,1,N images).
+
+    Parameters
+    ----------
+    path : str
+        Image file path
+
+    Returns
+    -------
+    np.ndarray
+        3D voxel data, or *None* if the image has less than three dimensions
+    """
+    dataobj = open_image(path).dataobj
+    n_dims = len(dataobj.shape)
+    if n_dims < 3:
+        return None
+    return read_voxels(dataobj, (slice(None),) * 3 + (0,) * (n_dims - 3))
+
+
+def compute_preview(path: str) -> dict:
+    """
+    Computes the pyramid and thumbnails of an image's first volume. Runs
+    inside worker processes, so it must not touch the database.
+
+    Parameters
+    ----------
+    path : str
+        Image file path
+
+    Returns
+    -------
+    dict
+        Source modification time, pyramid levels and thumbnails (PNG bytes by
+        axis name), or *None* if the image cannot be read or is not at least
+        3D
+    """
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+        volume = read_first_volume(path)
+    except IMAGE_READ_ERRORS:
+        return None
+    if volume is None:
+        return None
+    levels = build_pyramid(normalize(volume))
+    thumbnails = {
+        name: encode_png(take_slice(levels[0], axis, levels[0].shape[axis] // 2))
+        for axis, name in enumerate(PREVIEW_AXES)
+    }
+    return {"source_mtime_ns": mtime_ns, "levels": levels, "thumbnails": thumbnails}
+
+
+def delete_preview_files(preview: NIfTIPreview) -> None:
+    """
+    Removes a preview's files from the media storage.
+
+    Parameters
+    ----------
+    preview : NIfTIPreview
+        Preview to remove the files of
+    """
+    for level in range(preview.n_levels):
+        default_storage.delete(preview.get_level_name(level))
+    for name in PREVIEW_AXES:
+        thumbnail = getattr(preview, name)
+        if thumbnail:
+            thumbnail.delete(save=False)
+
+
+def save_preview(nifti: NIfTI, computed: dict) -> NIfTIPreview:
+    """
+    Stores computed previews, replacing those of older versions of the file.
+
+    Parameters
+    ----------
+    nifti : NIfTI
+        Previewed image
+    computed : dict
+        Output of :func:`compute_preview`
+
+    Returns
+    -------
+    NIfTIPreview
+        Stored previews
+    """
+    preview = NIfTIPreview.objects.filter(nifti=nifti).first()
+    if preview is not None:
+        delete_preview_files(preview)
+    else:
+        preview = NIfTIPreview(nifti=nifti)
+    preview.source_mtime_ns = computed["source_mtime_ns"]
+    preview.directory = f"previews/{nifti.pk}/{preview.source_mtime_ns}"
+    preview.level_shapes = [list(level.shape) for level in computed["levels"]]
+    for level, array in enumerate(computed["levels"]):
+        buffer = io.BytesIO()
+        np.save(buffer, array)
+        name = preview.get_level_name(level)
+        # Storages save under a new name if the file exists, while levels are
+        # always read from this one.
+        default_storage.delete(name)
+        default_storage.save(name, ContentFile(buffer.getvalue()))
+    for name, png in computed["thumbnails"].items():
+        getattr(preview, name).save(
+            f"{nifti.pk}-{preview.source_mtime_ns}-{name}.png",
+            ContentFile(png),
+            save=False,
+        )
+    preview.save()
+    return preview
+
+
+def query_stale_niftis(niftis: QuerySet = None) -> QuerySet:
+    """
+    Returns the images whose previews are missing or were built from an
+    older version of the file.
+
+    Parameters
+    ----------
+    niftis : QuerySet, optional
+        Images to check, by default all images with header data
+
+    Returns
+    -------
+    QuerySet
+        Images requiring (re)building
+    """
+    if niftis is None:
+        niftis = NIfTI.objects.all()
+    up_to_date = NIfTIPreview.objects.filter(
+        nifti=OuterRef("pk"), source_mtime_ns=OuterRef("file_mtime_ns")
+    )
+    return niftis.filter(~Exists(up_to_date), shape__isnull=False)
+
+
+def read_processed_preview(content_hash: str, exclude: list[NIfTI]) -> dict:
+    """
+    Returns the up to date previews of another image with the same contents,
+    if their building was recorded as a :class:`ProcessedInput`.
+
+    Parameters
+    ----------
+    content_hash : str
+        Content hash of the images to process
+    exclude : list[NIfTI]
+        Images to process, which may not be used as the source
+
+    Returns
+    -------
+    dict
+        Pyramid levels and thumbnails, as returned by
+        :func:`compute_preview`, or *None* if none are stored
+    """
+    if content_hash is None or not ProcessedInput.is_processed(STAGE, content_hash):
+        return None
+    source = (
+        NIfTIPreview.objects.filter(
+            nifti__content_hash=content_hash,
+            nifti__content_hash_mtime_ns__gte=F("nifti__file_mtime_ns"),
+            source_mtime_ns=F("nifti__file_mtime_ns"),
+        )
+        .exclude(nifti__in=[nifti.pk for nifti in exclude])
+        .first()
+    )
+    if source is None:
+        return None
+    thumbnails = {}
+    for name in PREVIEW_AXES:
+        with getattr(source, name).open("rb") as f:
+            thumbnails[name] = f.read()
+    return {
+        "source_mtime_ns": source.source_mtime_ns,
+        "levels": [
+            np.array(load_level(source, level)) for level in range(source.n_levels)
+        ],
+        "thumbnails": thumbnails,
+    }
+
+
+def update_previews(niftis: QuerySet = None, max_workers: int = None) -> int:
+    """
+    Builds the previews of images in a process pool, skipping images whose
+    previews are up to date and images that cannot be previewed. Duplicate
+    copies of the same contents (see
+    :func:`~neurohub.base_models.checksums.group_by_content`) are read once,
+    and copies of already processed contents reuse the stored previews.
+
+    Parameters
+    ----------
+    niftis : QuerySet, optional
+        Images to process, by default all images
+    max_workers : int, optional
+        Number of processes, by default the number of CPUs
+
+    Returns
+    -------
+    int
+        Number of processed images
+    """
+    niftis = list(query_stale_niftis(niftis))
+    if not niftis:
+        return 0
+    count = 0
+    pending = []
+    for content_hash, group in group_by_content(niftis):
+        computed = read_processed_preview(content_hash, group)
+        if computed is None:
+            pending.append((content_hash, group))
+            continue
+        for nifti in group:
+            save_preview(nifti, {**computed, "source_mtime_ns": nifti.file_mtime_ns})
+        count += len(group)
+    if not pending:
+        return count
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(compute_preview, [group[0].path for _, group in pending])
+        for (content_hash, group), computed in zip(pending, results):
+            if computed is None:
+                continue
+            save_preview(group[0], computed)
+            for nifti in group[1:]:
+                save_preview(
+                    nifti, {**computed, "source_mtime_ns": nifti.file_mtime_ns}
+                )
+            ProcessedInput.mark_processed(STAGE, [content_hash])
+            count += len(group)
+    return count
+
+
+def load_level(preview: NIfTIPreview, level: int) -> np.ndarray:
+    """
+    Loads a pyramid level, memory-mapping it when the media storage is local.
+
+    Parameters
+    ----------
+    preview : NIfTIPreview
+        Stored previews
+    level : int
+        Pyramid level
+
+    Returns
+    -------
+    np.ndarray
+        uint8 voxel data
+    """
+    name = preview.get_level_name(level)
+    try:
+        return np.load(default_storage.path(name), mmap_mode="r")
+    except NotImplementedError:
+        with default_storage.open(name) as f:
+            return np.load(io.BytesIO(f.read()))
+
+
+def render_tile(
+    preview: NIfTIPreview, level: int, axis: int, index: int, row: int, col: int
+) -> bytes:
+    """
+    Renders a tile of a slice from a pyramid level.
+
+    Parameters
+    ----------
+    preview : NIfTIPreview
+        Stored previews
+    level : int
+        Pyramid level, 0 being full resolution
+    axis : int
+        Array axis orthogonal to the slice
+    index : int
+        Slice index along *axis*, in the level's resolution
+    row : int
+        Tile row
+    col : int
+        Tile column
+
+    Returns
+    -------
+    bytes
+        PNG file contents
+
+    Raises
+    ------
+    IndexError
+        If the level, slice or tile is out of range
+    """
+    if not 0 <= level < preview.n_levels or axis not in range(3):
+        raise IndexError("Invalid level or axis.")
+    shape = preview.level_shapes[level]
+    if not 0 <= index < shape[axis]:
+        raise IndexError("Invalid slice index.")
+    image = take_slice(load_level(preview, level), axis, index)
+    rows = slice(row * TILE_SIZE, (row + 1) * TILE_SIZE)
+    cols = slice(col * TILE_SIZE, (col + 1) * TILE_SIZE)
+    tile = image[rows, cols]
+    if row < 0 or col < 0 or not tile.size:
+        raise IndexError("Invalid tile.")
+    return encode_png(tile)
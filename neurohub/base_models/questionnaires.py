@@ -0,0 +1,217 @@
+"""
+Materialization of the questionnaire workbook into
+:class:`~neurohub.base_models.models.questionnaire_response.QuestionnaireResponse`
+rows.
+
+The workbook is only parsed when its file changed since the last refresh, and
+only new or modified responses are written. Subjects' responses are then read
+with indexed queries instead of parsing the workbook for each subject.
+"""
+import hashlib
+import json
+import os
+from collections.abc import Iterable
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from questionnaire_reader import QuestionnaireReader
+
+from neurohub.base_models.filesystem import FileStat
+from neurohub.base_models.models.file_manifest import FileManifestEntry
+from neurohub.base_models.models.questionnaire_response import (
+    QuestionnaireResponse,
+)
+
+#: :class:`FileManifestEntry` kind of the questionnaire workbook.
+QUESTIONNAIRE_KIND: str = "questionnaire"
+
+#: Workbook column holding the questionnaire subject ID.
+SUBJECT_ID_COLUMN: str = "Subject ID"
+
+#: Workbook column holding the submission time.
+TIMESTAMP_COLUMN: str = "Timestamp"
+
+#: Number of rows written per query.
+WRITE_BATCH_SIZE: int = 1000
+
+
+class RefreshResult(NamedTuple):
+    """
+    Numbers of responses written and deleted by a refresh.
+    """
+
+    written: int
+    deleted: int
+
+
+def to_json_value(value: Any) -> Any:
+    """
+    Converts a workbook cell value to a JSON serializable value.
+
+    Parameters
+    ----------
+    value : Any
+        Cell value
+
+    Returns
+    -------
+    Any
+        JSON serializable value, *None* for missing values
+    """
+    if isinstance(value, (list, tuple, dict)):
+        return str(value)
+    if pd.isna(value):
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, (datetime, date, pd.Timestamp)):
+        return str(value)
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def read_questionnaire_responses(path: Path) -> pd.DataFrame:
+    """
+    Parses the questionnaire workbook into one row per response.
+
+    Parameters
+    ----------
+    path : Path
+        Workbook path
+
+    Returns
+    -------
+    pd.DataFrame
+        *subject_id*, *timestamp*, *answers* and *answers_hash* columns, with
+        the last row of responses sharing a subject ID and timestamp
+    """
+    data = QuestionnaireReader(path=path).data
+    timestamps = pd.to_datetime(data[TIMESTAMP_COLUMN], errors="coerce")
+    subject_ids = data[SUBJECT_ID_COLUMN].map(str, na_action="ignore")
+    valid = (timestamps.notna() & subject_ids.notna()).values
+    columns = [str(column) for column in data.columns]
+    answers = [
+        [[column, to_json_value(value)] for column, value in zip(columns, row)]
+        for row in data[valid].itertuples(index=False, name=None)
+    ]
+    responses = pd.DataFrame(
+        {
+            "subject_id": subject_ids[valid].values,
+            "timestamp": [value.to_pydatetime() for value in timestamps[valid]],
+            "answers": answers,
+            "answers_hash": [
+                hashlib.sha256(json.dumps(pairs).encode()).hexdigest()
+                for pairs in answers
+            ],
+        }
+    )
+    return responses.drop_duplicates(subset=["subject_id", "timestamp"], keep="last")
+
+
+def refresh_questionnaire_responses(
+    path: Path = None, force: bool = False
+) -> RefreshResult:
+    """
+    Synchronizes the stored responses with the questionnaire workbook if it
+    changed since the last refresh. Only new or modified responses are
+    written, and responses removed from the workbook are deleted.
+
+    Parameters
+    ----------
+    path : Path, optional
+        Workbook path, by default the *QUESTIONNAIRE_PATH* setting
+    force : bool, optional
+        Whether to parse the workbook even if it did not change, by default
+        False
+
+    Returns
+    -------
+    RefreshResult
+        Numbers of written and deleted responses
+    """
+    path = Path(path or settings.QUESTIONNAIRE_PATH).resolve()
+    try:
+        stat = FileStat.from_stat_result(os.stat(path))
+    except FileNotFoundError:
+        return RefreshResult(written=0, deleted=0)
+    recorded = FileManifestEntry.objects.filter(
+        kind=QUESTIONNAIRE_KIND, path=str(path)
+    ).first()
+    if not force and recorded is not None and recorded.stat == stat:
+        return RefreshResult(written=0, deleted=0)
+    responses = read_questionnaire_responses(path)
+    stored = {
+        (subject_id, timestamp): (pk, answers_hash)
+        for pk, subject_id, timestamp, answers_hash in (
+            QuestionnaireResponse.objects.values_list(
+                "pk", "subject_id", "timestamp", "answers_hash"
+            )
+        )
+    }
+    keys = set(zip(responses["subject_id"], responses["timestamp"]))
+    removed = [pk for key, (pk, _) in stored.items() if key not in keys]
+    changed = [
+        QuestionnaireResponse(**response)
+        for response in responses.to_dict("records")
+        if stored.get((response["subject_id"], response["timestamp"]), (None, None))[1]
+        != response["answers_hash"]
+    ]
+    with transaction.atomic():
+        QuestionnaireResponse.objects.bulk_create(
+            changed,
+            update_conflicts=True,
+            unique_fields=["subject_id", "timestamp"],
+            update_fields=["answers", "answers_hash", "modified"],
+            batch_size=WRITE_BATCH_SIZE,
+        )
+        QuestionnaireResponse.objects.filter(pk__in=removed).delete()
+        FileManifestEntry.record(QUESTIONNAIRE_KIND, {str(path): stat})
+    return RefreshResult(written=len(changed), deleted=len(removed))
+
+
+def get_latest_responses(
+    subject_ids: Iterable[str], refresh: bool = True
+) -> pd.DataFrame:
+    """
+    Returns the latest questionnaire response of each of *subject_ids* with a
+    single indexed query.
+
+    Parameters
+    ----------
+    subject_ids : Iterable[str]
+        Questionnaire subject IDs
+    refresh : bool, optional
+        Whether to refresh the stored responses first (which is cheap if the
+        workbook did not change), by default True
+
+    Returns
+    -------
+    pd.DataFrame
+        The workbook's columns, one row per subject that responded, in the
+        order of *subject_ids*
+    """
+    subject_ids = [
+        str(subject_id) for subject_id in subject_ids if not pd.isna(subject_id)
+    ]
+    if refresh:
+        refresh_questionnaire_responses()
+    rows = (
+        QuestionnaireResponse.objects.filter(subject_id__in=subject_ids)
+        .order_by("subject_id", "-timestamp")
+        .distinct("subject_id")
+        .values_list("subject_id", "answers")
+    )
+    answers = dict(rows)
+    return pd.DataFrame.from_records(
+        [
+            dict(answers[subject_id])
+            for subject_id in dict.fromkeys(subject_ids)
+            if subject_id in answers
+        ]
+    )
@@ -0,0 +1,27 @@
+"""
+Signal handlers keeping files derived from model rows in sync with them.
+"""
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from neurohub.base_models.models import TensorDerivative
+
+
+@receiver(post_delete, sender=TensorDerivative)
+def delete_stored_derivative(
+    sender: type[TensorDerivative], instance: TensorDerivative, **kwargs
+) -> None:
+    """
+    Removes a deleted derivative's copy from the derivative store, so that
+    store reads never return the rows of removed or moved files.
+
+    Parameters
+    ----------
+    sender : type[TensorDerivative]
+        Model class
+    instance : TensorDerivative
+        Deleted derivative
+    """
+    store_path = instance.get_store_path()
+    if store_path is not None:
+        store_path.unlink(missing_ok=True)
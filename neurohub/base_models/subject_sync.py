@@ -0,0 +1,159 @@
+"""
+Bulk synchronization of :class:`~neurohub.base_models.models.subject.Subject`
+rows with the external pylabber and CRF tables.
+
+Each table is read once and merged against all subjects in pandas. Rows whose
+hash differs from the stored one are written with batched bulk queries, so a
+sync costs a handful of queries regardless of the number of subjects.
+"""
+from typing import NamedTuple
+
+import pandas as pd
+from django.utils import timezone
+
+from neurohub.base_models.external_tables import CRF_TABLE, PYLABBER_TABLE
+from neurohub.base_models.models import Subject
+from neurohub.base_models.utils import normalize_id_number
+
+#: Number of rows written per query.
+DEFAULT_BATCH_SIZE: int = 1000
+
+#: :class:`Subject` fields synchronized from the external tables.
+SYNCED_FIELDS = (*Subject.PYLABBER_COLUMNS_MAPPER, *Subject.CRF_COLUMNS_MAPPER)
+
+
+class SyncResult(NamedTuple):
+    """
+    Numbers of subjects created and updated by a sync.
+    """
+
+    created: int
+    updated: int
+
+
+def read_pylabber_subjects() -> pd.DataFrame:
+    """
+    Returns the pylabber table's subject information, one row per subject.
+
+    Returns
+    -------
+    pd.DataFrame
+        :class:`Subject` field values indexed by pylabber ID
+    """
+    table = PYLABBER_TABLE.get_frame().drop_duplicates(subset="ID", keep="last")
+    columns = {
+        column: field for field, column in Subject.PYLABBER_COLUMNS_MAPPER.items()
+    }
+    subjects = table.rename(columns=columns)[list(columns.values())]
+    subjects.index = table["ID"].astype(int).rename("pylabber_id")
+    subjects["id_number"] = subjects["id_number"].map(normalize_id_number)
+    return subjects
+
+
+def read_crf_subjects() -> pd.DataFrame:
+    """
+    Returns the CRF table's subject information, one row per ID number.
+
+    Returns
+    -------
+    pd.DataFrame
+        :class:`Subject` field values indexed by ID number
+    """
+    table = CRF_TABLE.get_frame()
+    table = table[~table.index.duplicated(keep="last")]
+    columns = {column: field for field, column in Subject.CRF_COLUMNS_MAPPER.items()}
+    return table.rename(columns=columns)[list(columns.values())]
+
+
+def normalize_fields(subjects: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts field values to the types they are stored as, with *None* for
+    missing values, so that stored and external rows hash alike.
+
+    Parameters
+    ----------
+    subjects : pd.DataFrame
+        :class:`Subject` field values
+
+    Returns
+    -------
+    pd.DataFrame
+        Normalized field values
+    """
+    subjects = subjects.reindex(columns=SYNCED_FIELDS).copy()
+    for field in SYNCED_FIELDS:
+        values = subjects[field]
+        if field == "date_of_birth":
+            values = pd.to_datetime(values, errors="coerce").dt.date
+        else:
+            values = values.map(str, na_action="ignore")
+            values = values.where(values != "", None)
+        subjects[field] = values.astype(object).where(values.notna(), None)
+    return subjects
+
+
+def hash_rows(subjects: pd.DataFrame) -> pd.Series:
+    """
+    Hashes the synchronized fields of each row.
+
+    Parameters
+    ----------
+    subjects : pd.DataFrame
+        Normalized :class:`Subject` field values
+
+    Returns
+    -------
+    pd.Series
+        Row hashes
+    """
+    return pd.util.hash_pandas_object(subjects.astype(str), index=False)
+
+
+def sync_subjects(batch_size: int = DEFAULT_BATCH_SIZE) -> SyncResult:
+    """
+    Creates subjects listed in the pylabber table and updates the fields of
+    existing subjects that differ from the pylabber and CRF tables.
+
+    Parameters
+    ----------
+    batch_size : int, optional
+        Number of rows written per query, by default 1000
+
+    Returns
+    -------
+    SyncResult
+        Numbers of created and updated subjects
+    """
+    stored = pd.DataFrame.from_records(
+        Subject.objects.values_list("pylabber_id", *SYNCED_FIELDS),
+        columns=["pylabber_id", *SYNCED_FIELDS],
+    ).set_index("pylabber_id")
+    stored = normalize_fields(stored)
+    pylabber = normalize_fields(read_pylabber_subjects())
+    for field in Subject.CRF_COLUMNS_MAPPER:
+        pylabber[field] = stored[field].reindex(pylabber.index)
+    desired = pd.concat([stored[~stored.index.isin(pylabber.index)], pylabber])
+    crf = read_crf_subjects()
+    in_crf = desired["id_number"].isin(crf.index)
+    for field in Subject.CRF_COLUMNS_MAPPER:
+        matched = desired["id_number"].map(crf[field])
+        desired[field] = matched.where(in_crf, desired[field])
+    desired = normalize_fields(desired)
+
+    is_new = ~desired.index.isin(stored.index)
+    existing = desired[~is_new]
+    changed = hash_rows(existing).values != hash_rows(stored.loc[existing.index]).values
+    now = timezone.now()
+    created = [
+        Subject(pylabber_id=pk, created=now, modified=now, **fields)
+        for pk, fields in desired[is_new].to_dict("index").items()
+    ]
+    updated = [
+        Subject(pylabber_id=pk, modified=now, **fields)
+        for pk, fields in existing[changed].to_dict("index").items()
+    ]
+    Subject.objects.bulk_create(created, batch_size=batch_size)
+    Subject.objects.bulk_update(
+        updated, [*SYNCED_FIELDS, "modified"], batch_size=batch_size
+    )
+    return SyncResult(created=len(created), updated=len(updated))
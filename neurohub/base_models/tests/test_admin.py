@@ -0,0 +1,89 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from neurohub.base_models import admin as base_models_admin
+from neurohub.base_models.admin import EstimatedCountPaginator
+from neurohub.base_models.models import (
+    Condition,
+    Group,
+    NIfTI,
+    Session,
+    Study,
+    Subject,
+    TensorDerivative,
+)
+
+CHANGELISTS = [
+    "subject",
+    "session",
+    "nifti",
+    "tensorderivative",
+    "study",
+    "group",
+    "condition",
+]
+
+
+def create_rows(start: int, stop: int) -> None:
+    for index in range(start, stop):
+        subject = Subject.objects.create(pylabber_id=index)
+        session = Session.objects.create(
+            bids_dir=f"ses-2022021{index % 10}{1000 + index}", subject=subject
+        )
+        nifti = NIfTI.objects.create(path=f"/data/sub-{index}_T1w.nii", session=session)
+        TensorDerivative.objects.create(
+            path=f"/data/sub-{index}_dseg.pickle",
+            nifti_parent=nifti,
+            session_parent=session,
+        )
+        group = Group.objects.create(title=f"group-{index}")
+        group.subjects.add(subject)
+        group.sessions.add(session)
+        condition = Condition.objects.create(title=f"condition-{index}")
+        condition.subjects.add(subject)
+        study = Study.objects.create(title=f"study-{index}")
+        study.groups.add(group)
+        study.conditions.add(condition)
+
+
+def count_changelist_queries(client, model_name: str) -> int:
+    url = reverse(f"admin:base_models_{model_name}_changelist")
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(context.captured_queries)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("model_name", CHANGELISTS)
+def test_changelist_queries_do_not_grow_with_rows(admin_client, model_name):
+    create_rows(0, 2)
+    few = count_changelist_queries(admin_client, model_name)
+    create_rows(2, 30)
+    assert count_changelist_queries(admin_client, model_name) == few
+
+
+@pytest.mark.django_db
+def test_session_counts(admin_client):
+    create_rows(0, 1)
+    session = Session.objects.get()
+    NIfTI.objects.create(path="/data/other.nii", session=session)
+    response = admin_client.get(reverse("admin:base_models_session_changelist"))
+    row = response.context["cl"].result_list[0]
+    assert (row.nifti_count, row.derivative_count) == (2, 1)
+
+
+@pytest.mark.django_db
+def test_estimated_count_paginator(monkeypatch):
+    create_rows(0, 5)
+    with connection.cursor() as cursor:
+        cursor.execute(f"ANALYZE {NIfTI._meta.db_table}")
+    monkeypatch.setattr(base_models_admin, "EXACT_COUNT_THRESHOLD", 0)
+    assert EstimatedCountPaginator(NIfTI.objects.all(), 2).count == 5
+    NIfTI.objects.create(path="/data/new.nii")
+    # Unfiltered querysets use the (now outdated) estimate.
+    assert EstimatedCountPaginator(NIfTI.objects.all(), 2).count == 5
+    filtered = NIfTI.objects.filter(path__startswith="/data/")
+    assert EstimatedCountPaginator(filtered, 2).count == 6
@@ -0,0 +1,42 @@
+from pathlib import Path
+
+import pytest
+from bids.layout import parse_file_entities
+
+from neurohub.base_models.bids_entities import (
+    parse_entities,
+    parse_entities_batch,
+)
+
+TEST_BIDS_DIR = Path("neurohub/base_models/tests/data/bids_dataset")
+
+EXTRA_PATHS = [
+    "/data/derivatives/dipy/sub-1/ses-2/dwi/sub-1_ses-2_acq-AP_atlas-brainnetome"
+    "_label-FA_dseg.pickle",
+    "/data/sub-01/ses-1/func/sub-01_ses-1_task-rest_run-01_echo-2_bold.nii.gz",
+    "/data/sub-1/anat/sub-1_hemi-L_space-MNI152_desc-brain_mask.nii.gz",
+    "/data/sub-1/sub-1_ses-1_scans.tsv",
+    "sub-1_T1w.nii",
+]
+
+
+@pytest.mark.parametrize(
+    "path",
+    sorted(str(path) for path in TEST_BIDS_DIR.rglob("*") if path.is_file())
+    + EXTRA_PATHS,
+)
+def test_parse_entities_matches_pybids(path):
+    assert parse_entities(path) == parse_file_entities(path)
+
+
+def test_parse_entities_batch():
+    paths = [Path(path) for path in EXTRA_PATHS[:2]]
+    first, second = parse_entities_batch(paths)
+    assert first["atlas"] == "brainnetome"
+    assert second["run"] == 1
+    assert str(second["run"]) == "01"
+
+
+def test_parse_entities_returns_copies():
+    parse_entities(EXTRA_PATHS[0])["subject"] = "2"
+    assert parse_entities(EXTRA_PATHS[0])["subject"] == "1"
@@ -0,0 +1,92 @@
+import hashlib
+import os
+
+import pytest
+
+from neurohub.base_models.checksums import (
+    find_duplicates,
+    get_file_key,
+    group_by_content,
+    hash_file,
+    update_checksums,
+)
+from neurohub.base_models.models import NIfTI, ProcessedInput
+
+
+@pytest.fixture
+def duplicate_paths(tmp_path):
+    paths = []
+    for name in ("sub-1_dwi", "sub-1_run-1_dwi"):
+        (tmp_path / f"{name}.nii.gz").write_bytes(b"voxels")
+        (tmp_path / f"{name}.bval").write_text("0 1000")
+        paths.append(tmp_path / f"{name}.nii.gz")
+    return paths
+
+
+def test_hash_file(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"x" * 1000)
+    assert hash_file(path, chunk_size=7) == hashlib.sha256(b"x" * 1000).hexdigest()
+
+
+def test_get_file_key():
+    assert get_file_key("/data/sub-1_dwi.nii.gz") == ".nii.gz"
+
+
+@pytest.mark.django_db
+def test_update_checksums(duplicate_paths):
+    first, second = (NIfTI.objects.create(path=str(path)) for path in duplicate_paths)
+    other = NIfTI.objects.create(path=str(duplicate_paths[0].with_name("x.nii")))
+    (duplicate_paths[0].with_name("x.nii")).write_bytes(b"other")
+    assert update_checksums(max_workers=2) == 3
+    first.refresh_from_db()
+    assert set(first.file_hashes) == {".nii.gz", ".bval"}
+    assert find_duplicates() == {first.content_hash: sorted(map(str, duplicate_paths))}
+    # Unchanged files are never hashed again.
+    assert update_checksums(max_workers=2) == 0
+    bval = duplicate_paths[1].with_suffix("").with_suffix(".bval")
+    bval.write_text("0 2000")
+    stat = bval.stat()
+    os.utime(bval, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert update_checksums(max_workers=2) == 1
+    second.refresh_from_db()
+    assert second.content_hash != first.content_hash
+    assert find_duplicates() == {}
+    other.refresh_from_db()
+    assert other.content_hash is not None
+
+
+@pytest.mark.django_db
+def test_processed_input(duplicate_paths):
+    for path in duplicate_paths:
+        NIfTI.objects.create(path=str(path))
+    update_checksums(max_workers=1)
+    niftis = NIfTI.objects.all()
+    content_hash = niftis.first().content_hash
+    assert not ProcessedInput.is_processed("stage", content_hash)
+    ProcessedInput.mark_processed("stage", [content_hash, content_hash, None])
+    ProcessedInput.mark_processed("stage", [content_hash])
+    assert ProcessedInput.is_processed("stage", content_hash)
+    assert not ProcessedInput.filter_unprocessed("stage", niftis).exists()
+    assert ProcessedInput.filter_unprocessed("other", niftis).count() == 2
+
+
+@pytest.mark.django_db
+def test_group_by_content(duplicate_paths):
+    first, second = (NIfTI.objects.create(path=str(path)) for path in duplicate_paths)
+    unhashed = NIfTI.objects.create(path=str(duplicate_paths[0].with_name("x.nii")))
+    update_checksums(NIfTI.objects.filter(pk__in=[first.pk, second.pk]))
+    niftis = list(NIfTI.objects.order_by("pk"))
+    for nifti in niftis:
+        nifti.file_mtime_ns = nifti.content_hash_mtime_ns or 0
+    assert group_by_content(niftis) == [
+        (niftis[0].content_hash, niftis[:2]),
+        (None, [unhashed]),
+    ]
+    # Images modified since they were hashed are grouped on their own.
+    niftis[1].file_mtime_ns = niftis[1].content_hash_mtime_ns + 1
+    assert [group for _, group in group_by_content(niftis)] == [
+        niftis[:1],
+        niftis[1:2],
+        niftis[2:],
+    ]
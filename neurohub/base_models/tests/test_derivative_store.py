@@ -0,0 +1,128 @@
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from neurohub.base_models.derivative_store import (
+    STORE_KEY_COLUMNS,
+    convert_derivative,
+    convert_derivatives,
+    get_partition_dir,
+    merge_types,
+    read_derivative_store,
+)
+from neurohub.base_models.file_cache import get_file_cache
+from neurohub.base_models.models import TensorDerivative
+
+REGIONS = pd.Index(["Frontal", "Occipital", "Temporal"], name="region_name")
+
+
+def write_derivative(path, offset: float) -> None:
+    pd.DataFrame(
+        {
+            "FA": [offset + index for index in range(len(REGIONS))],
+            "MD": [offset / 10] * len(REGIONS),
+            "hemisphere": ["L", "R", "L"],
+        },
+        index=REGIONS,
+    ).to_pickle(path)
+
+
+@pytest.fixture
+def derivatives(settings, tmp_path):
+    settings.DERIVATIVE_STORE_DIR = str(tmp_path / "store")
+    get_file_cache().clear()
+    derivatives = []
+    for subject in (1, 2, 3):
+        path = tmp_path / f"sub-{subject}_atlas-Brainnetome_dseg.pickle"
+        write_derivative(path, offset=subject)
+        derivatives.append(
+            TensorDerivative.objects.create(
+                path=str(path),
+                software_used="dipy",
+                atlas="Brainnetome",
+                label="GM",
+                subject=str(subject),
+                session=f"ses-{subject}",
+            )
+        )
+    yield derivatives
+    get_file_cache().clear()
+
+
+@pytest.mark.django_db
+def test_convert_derivatives(derivatives):
+    assert convert_derivatives(TensorDerivative.objects.all(), max_workers=1) == 3
+    partition = get_partition_dir("dipy", "Brainnetome")
+    assert len(os.listdir(partition)) == 3
+    # Current copies are not converted again.
+    assert convert_derivatives(TensorDerivative.objects.all(), max_workers=1) == 0
+
+
+@pytest.mark.django_db
+def test_read_derivative_store(derivatives):
+    convert_derivatives(TensorDerivative.objects.all(), max_workers=1)
+    table = read_derivative_store(
+        "dipy",
+        "Brainnetome",
+        subjects=["1", "3"],
+        regions=["Occipital"],
+        metrics=["FA"],
+    )
+    assert list(table.columns) == [
+        "subject",
+        "session",
+        "acquisition",
+        "label",
+        "region",
+        "FA",
+    ]
+    assert sorted(zip(table["subject"], table["FA"])) == [("1", 2.0), ("3", 4.0)]
+    assert table["acquisition"].isna().all()
+    full = read_derivative_store("dipy", "Brainnetome")
+    assert len(full) == 3 * len(REGIONS)
+    assert set(full.columns) == {*STORE_KEY_COLUMNS, "FA", "MD", "hemisphere"}
+    assert read_derivative_store("dipy", "Schaefer").empty
+
+
+def test_merge_types():
+    assert merge_types([pa.int64(), pa.null(), pa.int64()]) == pa.int64()
+    assert merge_types([pa.int64(), pa.float32()]) == pa.float64()
+    assert merge_types([pa.float64(), pa.string()]) == pa.string()
+    assert merge_types([pa.null()]) == pa.null()
+
+
+@pytest.mark.django_db
+def test_read_derivative_store_merges_schemas(derivatives):
+    # Metrics stored as integers or missing in some files are still read.
+    pd.DataFrame({"FA": [1, 2, 3]}, index=REGIONS).to_pickle(derivatives[0].path)
+    table = pd.DataFrame({"FA": [0.5] * 3, "RD": [0.1] * 3}, index=REGIONS)
+    table.to_pickle(derivatives[2].path)
+    convert_derivatives(TensorDerivative.objects.all(), max_workers=1)
+    table = read_derivative_store("dipy", "Brainnetome").set_index(
+        ["subject", "region"]
+    )
+    assert table.loc[("1", "Occipital"), "FA"] == 2.0
+    assert table.loc[("3", "Occipital"), "RD"] == 0.1
+    assert table["RD"].isna().sum() == 2 * len(REGIONS)
+    assert "region_name" not in table.columns
+
+
+@pytest.mark.django_db
+def test_get_dataframe_reads_store(derivatives):
+    derivative = derivatives[0]
+    expected = pd.read_pickle(derivative.path)
+    assert convert_derivative(
+        derivative.path, derivative.software_used, derivative.atlas
+    )
+    pd.testing.assert_frame_equal(derivative.get_dataframe(), expected)
+    # The stored copy is read while it is newer than the pickle...
+    mtime = os.stat(derivative.path).st_mtime_ns
+    write_derivative(derivative.path, offset=100)
+    os.utime(derivative.path, ns=(mtime, mtime))
+    get_file_cache().clear()
+    assert derivative.get_dataframe()["FA"].iloc[0] == 1
+    # ...and ignored once the pickle changes.
+    os.utime(derivative.path, ns=(mtime, mtime + 10**10))
+    assert derivative.get_dataframe()["FA"].iloc[0] == 100
@@ -0,0 +1,112 @@
+import os
+
+import pandas as pd
+import pytest
+
+from neurohub.base_models.derivative_tables import to_long_format
+from neurohub.base_models.models import (
+    Condition,
+    Group,
+    Session,
+    Study,
+    Subject,
+    TensorDerivative,
+)
+
+REGIONS = ["Frontal", "Occipital", "Temporal"]
+
+
+def write_derivative(path, offset: float) -> None:
+    pd.DataFrame(
+        {
+            "mean": [offset + index for index in range(len(REGIONS))],
+            "std": [offset / 10] * len(REGIONS),
+            "hemisphere": ["L", "R", "L"],
+        },
+        index=pd.Index(REGIONS, name="region"),
+    ).to_pickle(path)
+
+
+@pytest.fixture
+def study(settings, tmp_path):
+    settings.DERIVATIVE_TABLE_CACHE_DIR = str(tmp_path / "cache")
+    study = Study.objects.create(title="Sleep")
+    group = Group.objects.create(title="Control")
+    condition = Condition.objects.create(title="Baseline")
+    study.groups.add(group)
+    study.conditions.add(condition)
+    for pk in (1, 2, 3):
+        subject = Subject.objects.create(pylabber_id=pk)
+        session = Session.objects.create(subject=subject, bids_dir=f"20220213{pk:04d}")
+        if pk < 3:
+            group.sessions.add(session)
+            condition.sessions.add(session)
+        for atlas in ("Brainnetome", "Schaefer"):
+            path = tmp_path / f"sub-{pk}_atlas-{atlas}_label-FA_dseg.pickle"
+            write_derivative(path, offset=pk)
+            TensorDerivative.objects.create(
+                path=str(path),
+                session_parent=session,
+                software_used="dipy",
+                atlas=atlas,
+                label="FA",
+                subject=str(pk),
+                session=f"ses-{pk}",
+            )
+    return study
+
+
+def test_to_long_format():
+    table = pd.DataFrame(
+        {"mean": [1.0, 2.0], "name": ["a", "b"]}, index=pd.Index([10, 20])
+    )
+    long = to_long_format(table)
+    assert list(long.columns) == ["region", "metric", "value"]
+    assert list(long["region"]) == ["10", "20"]
+    assert list(long["metric"]) == ["mean", "mean"]
+    assert list(long["value"]) == [1.0, 2.0]
+
+
+@pytest.mark.django_db
+def test_generate_derivatives_table(study, settings):
+    table = study.generate_derivatives_table("dipy", "Brainnetome", "FA", max_workers=1)
+    assert list(table.columns) == ["subject", "session", "region", "metric", "value"]
+    assert len(table) == 2 * len(REGIONS) * 2
+    assert set(table["subject"]) == {"1", "2"}
+    assert set(table["metric"]) == {"mean", "std"}
+    values = table.set_index(["subject", "region", "metric"])["value"]
+    assert values["2", "Occipital", "mean"] == 3.0
+    assert isinstance(table["region"].dtype, pd.CategoricalDtype)
+    assert len(os.listdir(settings.DERIVATIVE_TABLE_CACHE_DIR)) == 1
+
+
+@pytest.mark.django_db
+def test_generate_derivatives_table_cache(study, settings, tmp_path):
+    first = study.generate_derivatives_table("dipy", "Brainnetome", "FA", max_workers=1)
+    # Cached tables are reused without reading derivative files.
+    derivative = TensorDerivative.objects.get(subject="1", atlas="Brainnetome")
+    write_derivative(derivative.path, offset=100)
+    cached = study.generate_derivatives_table("dipy", "Brainnetome", "FA")
+    pd.testing.assert_frame_equal(first, cached)
+    # Modifying a member derivative invalidates the cached table.
+    derivative.save()
+    updated = study.generate_derivatives_table(
+        "dipy", "Brainnetome", "FA", max_workers=1
+    )
+    values = updated.set_index(["subject", "region", "metric"])["value"]
+    assert values["1", "Frontal", "mean"] == 100.0
+    # The outdated aggregate of the same query is replaced.
+    assert len(os.listdir(settings.DERIVATIVE_TABLE_CACHE_DIR)) == 1
+    study.generate_derivatives_table("dipy", "Schaefer", "FA", max_workers=1)
+    assert len(os.listdir(settings.DERIVATIVE_TABLE_CACHE_DIR)) == 2
+
+
+@pytest.mark.django_db
+def test_generate_derivatives_table_unreadable(study, settings):
+    derivative = TensorDerivative.objects.get(subject="1", atlas="Brainnetome")
+    with open(derivative.path, "wb") as f:
+        f.write(b"corrupt")
+    table = study.generate_derivatives_table("dipy", "Brainnetome", "FA", max_workers=1)
+    assert set(table["subject"]) == {"2"}
+    # Incomplete aggregates are not cached.
+    assert not os.path.exists(settings.DERIVATIVE_TABLE_CACHE_DIR)
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from neurohub.base_models.derivative_values import (
+    get_regional_values,
+    index_derivative_values,
+    read_derivative_values,
+    write_derivative_values,
+)
+from neurohub.base_models.models import (
+    DerivativeValue,
+    Metric,
+    Region,
+    TensorDerivative,
+)
+
+REGIONS = ["Frontal", "Occipital", "Temporal"]
+
+
+def write_derivative(path, offset: float) -> None:
+    pd.DataFrame(
+        {
+            "FA_mean": [offset + index for index in range(len(REGIONS))],
+            "MD_mean": [np.nan, offset / 10, offset / 10],
+        },
+        index=REGIONS,
+    ).to_pickle(path)
+
+
+@pytest.fixture
+def derivatives(tmp_path):
+    derivatives = []
+    for subject in (1, 2, 3):
+        for atlas in ("Brainnetome", "Schaefer"):
+            path = tmp_path / f"sub-{subject}_atlas-{atlas}_dseg.pickle"
+            write_derivative(path, offset=subject)
+            derivatives.append(
+                TensorDerivative.objects.create(
+                    path=str(path),
+                    software_used="dipy",
+                    atlas=atlas,
+                    label="GM",
+                    subject=str(subject),
+                    session=f"ses-{subject}",
+                )
+            )
+    return derivatives
+
+
+@pytest.mark.django_db
+def test_write_derivative_values(derivatives):
+    values = {
+        derivative.path: read_derivative_values(derivative.path)
+        for derivative in derivatives
+    }
+    values["/missing.pickle"] = read_derivative_values("/missing.pickle")
+    with CaptureQueriesContext(connection) as queries:
+        count = write_derivative_values(values)
+    assert count == 6 * len(REGIONS) * 2
+    assert len(queries) <= 10
+    assert Region.objects.count() == 2 * len(REGIONS)
+    assert Metric.objects.count() == 2
+    # Writing again replaces the stored values.
+    assert write_derivative_values(values) == count
+    assert DerivativeValue.objects.count() == count
+    # Derivatives that can no longer be read lose their stored values.
+    assert write_derivative_values({derivatives[0].path: None}) == 0
+    assert not derivatives[0].regional_values.exists()
+    assert DerivativeValue.objects.count() == count - len(REGIONS) * 2
+
+
+@pytest.mark.django_db
+def test_get_regional_values(derivatives):
+    index_derivative_values(TensorDerivative.objects.all(), max_workers=1)
+    with CaptureQueriesContext(connection) as queries:
+        result = get_regional_values("FA_mean", "Brainnetome", regions=["Occipital"])
+    assert len(queries) == 1
+    assert list(result.subjects) == ["1", "2", "3"]
+    assert list(result.regions) == ["Occipital"] * 3
+    np.testing.assert_array_equal(result.values, [2.0, 3.0, 4.0])
+    missing = get_regional_values("MD_mean", "Schaefer", regions=["Frontal"])
+    assert np.isnan(missing.values).all()
+    assert len(get_regional_values("FA_mean", "Brainnetome", label="WM").values) == 0
@@ -0,0 +1,104 @@
+import os
+
+import pandas as pd
+import pytest
+from django.core.cache import cache
+
+from neurohub.base_models import external_tables
+from neurohub.base_models.external_tables import (
+    CRF_TABLE,
+    EXTERNAL_TABLE_CACHE_KEY,
+    PYLABBER_TABLE,
+)
+from neurohub.base_models.file_cache import get_file_cache
+from neurohub.base_models.models import Subject
+
+
+@pytest.fixture(autouse=True)
+def table_files(settings, tmp_path):
+    settings.EXTERNAL_TABLE_CACHE_DIR = str(tmp_path / "cache")
+    settings.PYLABBER_TABLE_PATH = str(tmp_path / "pylabber.csv")
+    settings.CRF_TABLE_PATH = str(tmp_path / "CRF.xlsx")
+    pd.DataFrame(
+        {"ID": [3, 1, 3], "ID Number": ["c", "a", "d"], "First Name": list("xyz")}
+    ).to_csv(settings.PYLABBER_TABLE_PATH, index=False)
+    pd.DataFrame(
+        {"ID": [5, 7, 5, None], "Questionnaire": ["q1", None, "q2", "q3"]}
+    ).to_excel(settings.CRF_TABLE_PATH, sheet_name="גיליון1", index=False)
+    cache.clear()
+    get_file_cache().clear()
+    yield
+    cache.clear()
+    get_file_cache().clear()
+
+
+@pytest.fixture
+def counting_reader(monkeypatch):
+    calls = []
+    reader = PYLABBER_TABLE.reader
+
+    def counting():
+        calls.append(1)
+        return reader()
+
+    monkeypatch.setattr(PYLABBER_TABLE, "reader", counting)
+    return calls
+
+
+def test_lookup():
+    assert list(PYLABBER_TABLE.lookup(3)["ID Number"]) == ["c", "d"]
+    assert PYLABBER_TABLE.lookup(2).empty
+    assert list(CRF_TABLE.lookup("000000005")["Questionnaire"]) == ["q1", "q2"]
+    assert CRF_TABLE.lookup("000000007")["Questionnaire"].item() == ""
+
+
+def test_parsed_once_per_version(settings, counting_reader):
+    PYLABBER_TABLE.get_frame()
+    version = PYLABBER_TABLE.get_version()
+    assert PYLABBER_TABLE.get_sidecar_path(version).exists()
+    # Other processes load the shared copy or the sidecar, not the source.
+    get_file_cache().clear()
+    PYLABBER_TABLE.get_frame()
+    cache.clear()
+    get_file_cache().clear()
+    assert list(PYLABBER_TABLE.get_frame()["ID"]) == [1, 3, 3]
+    assert len(counting_reader) == 1
+    stat = os.stat(settings.PYLABBER_TABLE_PATH)
+    os.utime(settings.PYLABBER_TABLE_PATH, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    PYLABBER_TABLE.get_frame()
+    assert len(counting_reader) == 2
+    assert not PYLABBER_TABLE.get_sidecar_path(version).exists()
+
+
+def test_superseded_versions_leave_the_cache(settings):
+    PYLABBER_TABLE.get_frame()
+    version = PYLABBER_TABLE.get_version()
+    key = EXTERNAL_TABLE_CACHE_KEY.format(name=PYLABBER_TABLE.name, version=version)
+    assert cache.get(key) is not None
+    stat = os.stat(settings.PYLABBER_TABLE_PATH)
+    os.utime(settings.PYLABBER_TABLE_PATH, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    PYLABBER_TABLE.get_frame()
+    assert cache.get(key) is None
+    new_version = PYLABBER_TABLE.get_version()
+    new_key = EXTERNAL_TABLE_CACHE_KEY.format(
+        name=PYLABBER_TABLE.name, version=new_version
+    )
+    assert cache.get(new_key) is not None
+
+
+def test_mixed_types_fall_back_to_pickle(monkeypatch):
+    table = external_tables.ExternalTable(
+        "mixed",
+        "PYLABBER_TABLE_PATH",
+        lambda: pd.DataFrame({"ID": [1, 2], "Value": [1, "a"]}),
+        index="ID",
+    )
+    assert list(table.lookup(2)["Value"]) == ["a"]
+    version = table.get_version()
+    assert table.get_sidecar_path(version, suffix=".pickle").exists()
+
+
+def test_subject_information():
+    subject = Subject(pylabber_id=3, id_number="000000005")
+    assert list(subject.get_pylabber_information()["ID Number"]) == ["c", "d"]
+    assert subject.get_crf_information()["Questionnaire"].item() == "q2"
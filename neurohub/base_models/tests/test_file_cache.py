@@ -0,0 +1,55 @@
+import os
+
+import pandas as pd
+import pytest
+
+from neurohub.base_models.file_cache import FileCache
+from neurohub.base_models.models import TensorDerivative
+
+
+@pytest.fixture
+def pickles(tmp_path):
+    paths = []
+    for index in range(3):
+        path = tmp_path / f"sub-{index}_dseg.pickle"
+        pd.DataFrame({"FA": [0.1 * index] * 100}).to_pickle(path)
+        paths.append(path)
+    return paths
+
+
+def test_hits_and_misses(pickles):
+    cache = FileCache(max_bytes=10**6)
+    first = cache.get_or_load("dataframe", pickles[0], pd.read_pickle)
+    second = cache.get_or_load("dataframe", pickles[0], pd.read_pickle)
+    assert first is second
+    assert cache.get_stats()["hits"] == 1
+    assert cache.get_stats()["misses"] == 1
+
+
+def test_invalidated_by_mtime(pickles):
+    cache = FileCache(max_bytes=10**6)
+    first = cache.get_or_load("dataframe", pickles[0], pd.read_pickle)
+    stat = pickles[0].stat()
+    os.utime(pickles[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert cache.get_or_load("dataframe", pickles[0], pd.read_pickle) is not first
+    assert cache.get_stats()["entries"] == 1
+
+
+def test_evicts_least_recently_used(pickles):
+    size = pd.read_pickle(pickles[0]).memory_usage(deep=True).sum()
+    cache = FileCache(max_bytes=2 * size)
+    for path in pickles[:2]:
+        cache.get_or_load("dataframe", path, pd.read_pickle)
+    cache.get_or_load("dataframe", pickles[0], pd.read_pickle)
+    cache.get_or_load("dataframe", pickles[2], pd.read_pickle)
+    stats = cache.get_stats()
+    assert stats["evictions"] == 1
+    assert stats["entries"] == 2
+    cache.get_or_load("dataframe", pickles[0], pd.read_pickle)
+    assert cache.get_stats()["hits"] == 2
+
+
+def test_tensor_derivative_data_is_shared(pickles):
+    first = TensorDerivative(path=str(pickles[1]))
+    second = TensorDerivative(path=str(pickles[1]))
+    assert first.data is second.data
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from neurohub.base_models.gradient_table import GradientTable
+from neurohub.base_models.models import NIfTI, Session
+
+BVALS = [0, 995, 1000, 1005, 2000, 2010, 5, 1000]
+BVECS = [
+    [0, 0, 0],
+    [1, 0, 0],
+    [0, 1, 0],
+    [0, 0, 1],
+    [1, 0, 0],
+    [0, 1, 0],
+    [0, 0, 0],
+    [1, 0, 0],
+]
+
+
+@pytest.fixture
+def gradient_table() -> GradientTable:
+    return GradientTable(BVALS, BVECS)
+
+
+def write_fsl_files(directory, name, bvals=BVALS, bvecs=BVECS):
+    np.savetxt(directory / f"{name}.bval", [bvals], fmt="%d")
+    np.savetxt(directory / f"{name}.bvec", np.asarray(bvecs).T, fmt="%.6f")
+
+
+def test_b0_indices(gradient_table):
+    assert gradient_table.b0_indices.tolist() == [0, 6]
+
+
+def test_shells(gradient_table):
+    assert gradient_table.shells.tolist() == [1000, 2005]
+    assert gradient_table.shell_labels.tolist() == [0, 1, 1, 1, 2, 2, 0, 1]
+
+
+def test_directions_per_shell(gradient_table):
+    assert gradient_table.get_directions_per_shell() == {1000: 3, 2005: 2}
+
+
+def test_validate(gradient_table):
+    assert gradient_table.validate(n_volumes=8) == []
+    bvecs = np.array(BVECS, dtype=float)
+    bvecs[2] *= 2
+    problems = GradientTable(BVALS, bvecs).validate(n_volumes=9)
+    assert problems == [
+        "8 gradients but 9 volumes.",
+        "Non-unit b-vectors at volumes [2].",
+    ]
+
+
+def test_from_files(tmp_path):
+    write_fsl_files(tmp_path, "dwi")
+    gradient_table = GradientTable.from_files(
+        tmp_path / "dwi.bval", tmp_path / "dwi.bvec"
+    )
+    np.testing.assert_array_equal(gradient_table.bvals, BVALS)
+    np.testing.assert_array_equal(gradient_table.bvecs, BVECS)
+
+
+def test_from_files_three_volumes(tmp_path):
+    bvals = np.array([0, 1000, 1000])
+    bvecs = np.array([[0, 0, 0], [1, 0, 0], [0, 0.6, 0.8]])
+    np.savetxt(tmp_path / "dwi.bval", bvals[None])
+    np.savetxt(tmp_path / "dwi.bvec", bvecs.T)
+    gradient_table = GradientTable.from_files(
+        tmp_path / "dwi.bval", tmp_path / "dwi.bvec"
+    )
+    np.testing.assert_array_equal(gradient_table.bvecs, bvecs)
+
+
+def test_from_files_invalid_shape(tmp_path):
+    np.savetxt(tmp_path / "dwi.bval", np.zeros((1, 4)))
+    np.savetxt(tmp_path / "dwi.bvec", np.zeros((4, 4)))
+    with pytest.raises(ValueError):
+        GradientTable.from_files(tmp_path / "dwi.bval", tmp_path / "dwi.bvec")
+
+
+def test_nifti_b_value_and_vector(tmp_path):
+    write_fsl_files(tmp_path, "sub-1_dwi")
+    nifti = NIfTI(path=str(tmp_path / "sub-1_dwi.nii.gz"))
+    assert nifti.b_value == BVALS
+    assert nifti.b_vector == np.asarray(BVECS, dtype=float).T.tolist()
+    assert nifti.gradient_table is nifti.gradient_table
+
+
+@pytest.mark.django_db
+def test_session_validate_gradient_tables(tmp_path):
+    write_fsl_files(tmp_path, "sub-1_dir-FWD_dwi")
+    write_fsl_files(tmp_path, "sub-1_dir-REV_dwi", bvals=[1000] * 8)
+    session = Session.objects.create(bids_dir="ses-202202131331")
+    for direction in ("FWD", "REV"):
+        NIfTI.objects.create(
+            path=str(tmp_path / f"sub-1_dir-{direction}_dwi.nii.gz"),
+            session=session,
+            suffix="dwi",
+            direction=direction,
+            shape=[4, 4, 4, 8],
+        )
+    problems = {
+        nifti.direction: problems
+        for nifti, problems in session.validate_gradient_tables().items()
+    }
+    assert problems == {
+        "FWD": [],
+        "REV": ["No b0 volumes.", "Non-unit b-vectors at volumes [0, 6]."],
+    }
@@ -0,0 +1,129 @@
+import os
+import threading
+
+import nibabel as nib
+import numpy as np
+import pytest
+
+from neurohub.base_models.file_cache import get_file_cache
+from neurohub.base_models.image_access import (
+    ScratchCache,
+    build_gzip_index,
+    get_gzip_index_path,
+    get_indexed_image,
+    load_image,
+    load_indexed_image,
+)
+from neurohub.base_models.models import NIfTI
+
+
+@pytest.fixture
+def compressed_image(tmp_path):
+    path = tmp_path / "sub-1_dwi.nii.gz"
+    data = np.arange(4 * 4 * 4 * 3, dtype=np.int16).reshape(4, 4, 4, 3)
+    nib.save(nib.Nifti1Image(data, np.eye(4)), path)
+    return path, data
+
+
+def test_load_compressed_image_is_memory_mapped(tmp_path, compressed_image):
+    path, data = compressed_image
+    scratch_cache = ScratchCache(tmp_path / "scratch", max_bytes=10**6)
+    image = load_image(path, scratch_cache=scratch_cache)
+    volume = image.dataobj[..., 1]
+    assert isinstance(np.asanyarray(image.dataobj), np.memmap)
+    np.testing.assert_array_equal(volume, data[..., 1])
+    assert scratch_cache.get(path) == scratch_cache.get(path)
+    assert len(list((tmp_path / "scratch").iterdir())) == 1
+
+
+def test_loaded_image_survives_eviction(tmp_path, compressed_image):
+    path, data = compressed_image
+    scratch_cache = ScratchCache(tmp_path / "scratch", max_bytes=1)
+    image = load_image(path, scratch_cache=scratch_cache)
+    scratch_cache.get(path).unlink()
+    scratch_cache.evict()
+    assert not list((tmp_path / "scratch").iterdir())
+    np.testing.assert_array_equal(image.dataobj[..., 2], data[..., 2])
+    np.testing.assert_array_equal(image.get_fdata(), data)
+
+
+def test_scratch_cache_invalidated_by_mtime(tmp_path, compressed_image):
+    path, _ = compressed_image
+    scratch_cache = ScratchCache(tmp_path / "scratch", max_bytes=10**6)
+    first = scratch_cache.get(path)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert scratch_cache.get(path) != first
+
+
+def test_scratch_cache_eviction(tmp_path):
+    scratch_cache = ScratchCache(tmp_path / "scratch", max_bytes=1)
+    paths = []
+    for index in range(3):
+        path = tmp_path / f"sub-{index}_T1w.nii.gz"
+        nib.save(nib.Nifti1Image(np.zeros((4, 4, 4), np.int16), np.eye(4)), path)
+        paths.append(scratch_cache.get(path))
+    remaining = list((tmp_path / "scratch").iterdir())
+    assert remaining == [paths[-1]]
+
+
+def test_read_volume_through_gzip_index(tmp_path, settings, compressed_image):
+    path, data = compressed_image
+    settings.NIFTI_GZIP_INDEX_DIR = str(tmp_path / "index")
+    settings.NIFTI_SCRATCH_DIR = str(tmp_path / "scratch")
+    assert load_indexed_image(path) is None
+    index_path = build_gzip_index(path, spacing=64 * 1024)
+    assert index_path == get_gzip_index_path(path)
+    nifti = NIfTI(path=str(path))
+    np.testing.assert_array_equal(nifti.read_volume(2), data[..., 2])
+    np.testing.assert_array_equal(
+        nifti.read_slice(axis=1, index=3, volume=1), data[:, 3, :, 1]
+    )
+    # The indexed read never decompresses the file into the scratch cache.
+    assert not (tmp_path / "scratch").exists()
+
+
+def test_indexed_image_is_cached(tmp_path, settings, compressed_image):
+    path, data = compressed_image
+    settings.NIFTI_GZIP_INDEX_DIR = str(tmp_path / "index")
+    build_gzip_index(path, spacing=64 * 1024)
+    file_cache = get_file_cache()
+    file_cache.clear()
+    image = get_indexed_image(path)
+    assert get_indexed_image(path) is image
+    nifti = NIfTI(path=str(path))
+    for index in range(data.shape[-1]):
+        np.testing.assert_array_equal(nifti.read_volume(index), data[..., index])
+    assert file_cache.get_stats()["entries"] == 1
+    # Evicted images stay readable by their holders.
+    file_cache.clear()
+    np.testing.assert_array_equal(image.dataobj[..., 1], data[..., 1])
+
+
+def test_indexed_image_evicted_while_reading(tmp_path, settings, compressed_image):
+    path, data = compressed_image
+    settings.NIFTI_GZIP_INDEX_DIR = str(tmp_path / "index")
+    build_gzip_index(path, spacing=64 * 1024)
+    file_cache = get_file_cache()
+    file_cache.clear()
+    errors = []
+
+    def read_volumes():
+        try:
+            for _ in range(50):
+                image = get_indexed_image(path)
+                for index in range(data.shape[-1]):
+                    volume = np.asarray(image.dataobj[..., index])
+                    np.testing.assert_array_equal(volume, data[..., index])
+        except Exception as error:
+            errors.append(error)
+
+    readers = [threading.Thread(target=read_volumes) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    while any(reader.is_alive() for reader in readers):
+        file_cache.clear()
+    for reader in readers:
+        reader.join()
+    assert not errors
+    file_cache.clear()
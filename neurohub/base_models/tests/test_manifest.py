@@ -0,0 +1,87 @@
+import os
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from neurohub.base_models.manifest import get_session_manifests
+from neurohub.base_models.models import NIfTI, Session, TensorDerivative
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def create_session(tmp_path, index: int) -> Session:
+    session = Session.objects.create(bids_dir=f"ses-20220213{1000 + index}")
+    dwi_dir = tmp_path / f"ses-{index}" / "dwi"
+    dwi_dir.mkdir(parents=True)
+    for suffix in (".nii.gz", ".json", ".bval"):
+        (dwi_dir / f"sub-1_dwi{suffix}").touch()
+    nifti = NIfTI.objects.create(
+        path=str(dwi_dir / "sub-1_dwi.nii.gz"), session=session
+    )
+    TensorDerivative.objects.create(
+        path=str(dwi_dir / "direct_dseg.pickle"), session_parent=session
+    )
+    TensorDerivative.objects.create(
+        path=str(dwi_dir / "nifti_dseg.pickle"), nifti_parent=nifti
+    )
+    return session
+
+
+def count_queries(function, *args) -> int:
+    with CaptureQueriesContext(connection) as context:
+        function(*args)
+    return len(context.captured_queries)
+
+
+@pytest.mark.django_db
+def test_session_manifests_constant_queries(tmp_path):
+    sessions = [create_session(tmp_path, index) for index in range(2)]
+    few = count_queries(get_session_manifests, sessions)
+    cache.clear()
+    sessions += [create_session(tmp_path, index) for index in range(2, 12)]
+    assert count_queries(get_session_manifests, sessions) == few
+    manifest = get_session_manifests(sessions)[sessions[0].pk]
+    assert len(manifest["niftis"]) == 1
+    assert len(manifest["niftis"][0]["files"]) == 3
+    assert len(manifest["derivatives"]) == 2
+
+
+@pytest.mark.django_db
+def test_session_manifest_invalidation(tmp_path):
+    session = create_session(tmp_path, 0)
+    assert len(session.list_nifti_files()) == 3
+    # Cached manifests only cost the signature queries.
+    assert count_queries(get_session_manifests, [session]) == 2
+    dwi_dir = tmp_path / "ses-0" / "dwi"
+    (dwi_dir / "sub-1_dwi.bvec").touch()
+    stat = dwi_dir.stat()
+    os.utime(dwi_dir, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert len(session.list_nifti_files()) == 4
+    NIfTI.objects.create(path=str(dwi_dir / "sub-1_T1w.nii.gz"), session=session)
+    assert len(session.list_nifti_files()) == 5
+
+
+@pytest.mark.django_db
+def test_list_derivatives(tmp_path):
+    session = create_session(tmp_path, 0)
+    create_session(tmp_path, 1)
+    assert session.list_derivatives().count() == 2
+
+
+@pytest.mark.django_db
+def test_session_manifest_view(client, django_user_model, tmp_path):
+    session = create_session(tmp_path, 0)
+    client.force_login(django_user_model.objects.create_user("user", password="x"))
+    url = reverse("base_models:session-manifest")
+    response = client.get(url, {"session": [session.pk]})
+    assert response.status_code == 200
+    assert response.json()["sessions"][0]["session"] == session.pk
+    assert client.get(url, {"session": "x"}).status_code == 400
@@ -1,7 +1,14 @@
+import json
+import os
 import unittest
 from pathlib import Path
 
-from neurohub.base_models.models.nifti import NIfTI  # noqa: F401
+import nibabel as nib
+import numpy as np
+import pytest
+
+from neurohub.base_models.filesystem import get_directory_cache
+from neurohub.base_models.models.nifti import NIfTI, read_sidecar
 
 
 class TestNifti(unittest.TestCase):
@@ -41,3 +48,72 @@ class TestNifti(unittest.TestCase):
     def test_dwi_bvector(self):
         nifti = NIfTI(path=Path(self.TEST_BIDS_DIR) / self.NIFTIS["dwi"])
         assert nifti.b_vector_file is not None
+
+    def test_resolution_from_stored_header(self):
+        nifti = NIfTI(path="missing.nii.gz", shape=[96, 96, 60, 5])
+        assert nifti.resolution == (96, 96, 60, 5)
+
+
+@pytest.mark.django_db
+def test_header_refreshed_on_mtime_change(tmp_path):
+    path = tmp_path / "sub-1_ses-202202131331_T1w.nii.gz"
+    nib.save(nib.Nifti1Image(np.zeros((4, 4, 4), dtype=np.int16), np.eye(4)), path)
+    nifti = NIfTI.objects.create(path=str(path))
+    assert nifti.shape == [4, 4, 4]
+    assert nifti.file_size == path.stat().st_size
+    assert not nifti.header_is_stale()
+    nib.save(nib.Nifti1Image(np.zeros((6, 6, 6), dtype=np.int16), np.eye(4)), path)
+    os.utime(path, ns=(nifti.file_mtime_ns + 10**9,) * 2)
+    assert nifti.header_is_stale()
+    nifti.save(update_fields=["is_raw"])
+    nifti.refresh_from_db()
+    assert nifti.get_resolution() == (6, 6, 6)
+
+
+def test_file_paths_from_directory_listing(tmp_path):
+    path = tmp_path / "sub-1_dwi.nii.gz"
+    for name in ("sub-1_dwi.nii.gz", "sub-1_dwi.json", "sub-1_dwi.bval"):
+        (tmp_path / name).touch()
+    nifti = NIfTI(path=str(path))
+    cache = get_directory_cache()
+    listing = cache.list_files(tmp_path)
+    assert {p.name for p in nifti.get_file_paths(listing=listing)} == {
+        "sub-1_dwi.nii.gz",
+        "sub-1_dwi.json",
+        "sub-1_dwi.bval",
+    }
+    assert nifti.b_vector_file is None
+    # The listing is reused until the directory is modified.
+    assert cache.list_files(tmp_path) is listing
+    (tmp_path / "sub-1_dwi.bvec").touch()
+    stat = tmp_path.stat()
+    os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert nifti.b_vector_file == tmp_path / "sub-1_dwi.bvec"
+    assert len(nifti.get_file_paths()) == 4
+
+
+def test_read_sidecar_coerces_values(tmp_path):
+    json_path = tmp_path / "sub-1_dwi.json"
+    sidecar = {
+        "EchoTime": "n/a",
+        "RepetitionTime": "3.5",
+        "TotalReadoutTime": True,
+        "PhaseEncodingDirection": "j-" * 5,
+        "Manufacturer": 42,
+    }
+    json_path.write_text(json.dumps(sidecar))
+    fields = read_sidecar(str(json_path))
+    assert fields["sidecar"] == sidecar
+    assert fields["echo_time"] is None
+    assert fields["repetition_time"] == 3.5
+    assert fields["total_readout_time"] is None
+    assert fields["phase_encoding_direction"] is None
+    assert fields["manufacturer"] == "42"
+
+
+def test_read_sidecar_unreadable(tmp_path):
+    json_path = tmp_path / "sub-1_dwi.json"
+    json_path.mkdir()
+    fields = read_sidecar(str(json_path))
+    assert fields["sidecar"] == {}
+    assert fields["echo_time"] is None
@@ -0,0 +1,164 @@
+import os
+
+import nibabel as nib
+import numpy as np
+import pytest
+from django.urls import reverse
+
+from neurohub.base_models import previews
+from neurohub.base_models.checksums import update_checksums
+from neurohub.base_models.models import NIfTI, NIfTIPreview, ProcessedInput
+from neurohub.base_models.previews import (
+    MIN_LEVEL_SIZE,
+    STAGE,
+    build_pyramid,
+    compute_preview,
+    downsample,
+    load_level,
+    normalize,
+    save_preview,
+    update_previews,
+)
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path / "media")
+
+
+@pytest.fixture
+def anatomical_path(tmp_path):
+    path = tmp_path / "sub-1_T1w.nii.gz"
+    data = np.arange(80 * 70 * 40, dtype=np.int16).reshape(80, 70, 40)
+    nib.save(nib.Nifti1Image(data, np.eye(4)), path)
+    return path
+
+
+def test_downsample():
+    volume = np.zeros((4, 4, 3), dtype=np.uint8)
+    volume[:2, :2, :2] = 200
+    downsampled = downsample(volume)
+    assert downsampled.shape == (2, 2, 2)
+    assert downsampled[0, 0, 0] == 200
+    assert downsampled[1, 1, 1] == 0
+    with pytest.raises(ValueError):
+        downsample(np.zeros((4, 4), dtype=np.uint8))
+
+
+def test_normalize_non_finite():
+    volume = np.arange(64, dtype=np.float32).reshape(4, 4, 4)
+    volume[0, 0, 0] = np.nan
+    volume[0, 0, 1] = np.inf
+    normalized = normalize(volume)
+    assert normalized[0, 0, 0] == 0
+    assert normalized[0, 0, 1] == normalized.max() > 250
+    assert normalized[-1, -1, -1] > normalized[2, 0, 0] > 0
+    assert not normalize(np.full((2, 2, 2), np.nan)).any()
+
+
+def test_build_pyramid():
+    levels = build_pyramid(np.zeros((130, 100, 60), dtype=np.uint8))
+    assert [level.shape for level in levels] == [
+        (130, 100, 60),
+        (65, 50, 30),
+        (33, 25, 15),
+    ]
+    assert max(levels[-1].shape) < 2 * MIN_LEVEL_SIZE
+
+
+@pytest.mark.django_db
+def test_update_previews(anatomical_path):
+    nifti = NIfTI.objects.create(path=str(anatomical_path))
+    assert update_previews(max_workers=1) == 1
+    preview = NIfTIPreview.objects.get(nifti=nifti)
+    assert preview.level_shapes == [[80, 70, 40], [40, 35, 20]]
+    assert preview.axial.read().startswith(b"\x89PNG")
+    # Up to date previews are never rebuilt.
+    assert update_previews(max_workers=1) == 0
+    old_level = preview.get_level_name(0)
+    stat = anatomical_path.stat()
+    os.utime(anatomical_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    nifti.save()
+    assert update_previews(max_workers=1) == 1
+    preview.refresh_from_db()
+    assert preview.get_level_name(0) != old_level
+    assert not preview.axial.storage.exists(old_level)
+
+
+def test_compute_preview_dimensions(tmp_path):
+    data = np.zeros((70, 40, 20, 1, 2), dtype=np.int16)
+    data[..., 0, 1] = 1
+    path = tmp_path / "sub-1_dwi.nii.gz"
+    nib.save(nib.Nifti1Image(data, np.eye(4)), path)
+    levels = compute_preview(str(path))["levels"]
+    assert [level.shape for level in levels] == [(70, 40, 20), (35, 20, 10)]
+    assert not levels[0].any()
+    flat_path = tmp_path / "sub-1_flat.nii.gz"
+    nib.save(nib.Nifti1Image(np.zeros((70, 40), dtype=np.int16), np.eye(4)), flat_path)
+    assert compute_preview(str(flat_path)) is None
+
+
+@pytest.mark.django_db
+def test_update_previews_skips_unreadable_images(anatomical_path, tmp_path):
+    truncated_path = tmp_path / "sub-2_T1w.nii.gz"
+    content = anatomical_path.read_bytes()
+    truncated_path.write_bytes(content[: len(content) // 2])
+    truncated = NIfTI.objects.create(path=str(truncated_path), shape=[80, 70, 40])
+    nifti = NIfTI.objects.create(path=str(anatomical_path))
+    assert update_previews(max_workers=1) == 1
+    assert NIfTIPreview.objects.filter(nifti=nifti).exists()
+    assert not NIfTIPreview.objects.filter(nifti=truncated).exists()
+
+
+@pytest.mark.django_db
+def test_update_previews_reuses_duplicates(anatomical_path, monkeypatch):
+    copies = [anatomical_path.with_name(f"sub-{pk}_T1w.nii.gz") for pk in (2, 3)]
+    for copy in copies:
+        copy.write_bytes(anatomical_path.read_bytes())
+    NIfTI.objects.create(path=str(anatomical_path))
+    NIfTI.objects.create(path=str(copies[0]))
+    update_checksums()
+    assert update_previews(max_workers=1) == 2
+    content_hash = NIfTI.objects.first().content_hash
+    assert ProcessedInput.is_processed(STAGE, content_hash)
+    # Copies of processed contents are never read again.
+    duplicate = NIfTI.objects.create(path=str(copies[1]))
+    update_checksums()
+    monkeypatch.setattr(previews, "ProcessPoolExecutor", None)
+    assert update_previews() == 1
+    preview = NIfTIPreview.objects.get(nifti=duplicate)
+    source = NIfTIPreview.objects.exclude(nifti=duplicate).first()
+    assert preview.level_shapes == source.level_shapes
+    assert preview.axial.read() == source.axial.read()
+    assert preview.source_mtime_ns == duplicate.file_mtime_ns
+    assert update_previews() == 0
+
+
+@pytest.mark.django_db
+def test_save_preview_replaces_level_files(anatomical_path):
+    nifti = NIfTI.objects.create(path=str(anatomical_path))
+    computed = compute_preview(str(anatomical_path))
+    preview = save_preview(nifti, computed)
+    # Leftover files at the level names are replaced, not shadowed.
+    preview.delete()
+    levels = [np.ones_like(level) for level in computed["levels"]]
+    preview = save_preview(nifti, {**computed, "levels": levels})
+    assert load_level(preview, 0).all()
+
+
+@pytest.mark.django_db
+def test_preview_tile_view(client, django_user_model, anatomical_path):
+    nifti = NIfTI.objects.create(path=str(anatomical_path))
+    update_previews(max_workers=1)
+    client.force_login(django_user_model.objects.create_user("user", password="x"))
+
+    def get_tile(level, axis, index):
+        kwargs = {"level": level, "axis": axis, "index": index, "row": 0, "col": 0}
+        url = reverse("base_models:preview-tile", kwargs={"pk": nifti.pk, **kwargs})
+        return client.get(url)
+
+    response = get_tile(level=1, axis=2, index=10)
+    assert response.status_code == 200
+    assert response["Content-Type"] == "image/png"
+    assert get_tile(level=2, axis=2, index=10).status_code == 404
+    assert get_tile(level=1, axis=2, index=20).status_code == 404
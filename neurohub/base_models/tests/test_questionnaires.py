@@ -0,0 +1,78 @@
+import pandas as pd
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from neurohub.base_models.models import QuestionnaireResponse, Subject
+from neurohub.base_models.questionnaires import (
+    get_latest_responses,
+    refresh_questionnaire_responses,
+)
+
+
+def write_workbook(path, rows: list[tuple]) -> None:
+    pd.DataFrame(rows, columns=["Timestamp", "Subject ID", "Age", "Sleep"]).to_excel(
+        path, index=False
+    )
+
+
+@pytest.fixture
+def workbook(settings, tmp_path):
+    settings.QUESTIONNAIRE_PATH = str(tmp_path / "questionnaire.xlsx")
+    write_workbook(
+        settings.QUESTIONNAIRE_PATH,
+        [
+            (pd.Timestamp("2022-01-01 10:00"), "q-1", 30, 7.5),
+            (pd.Timestamp("2022-02-01 10:00"), "q-1", 31, None),
+            (pd.Timestamp("2022-01-05 09:00"), "q-2", 25, 8.0),
+        ],
+    )
+    return settings.QUESTIONNAIRE_PATH
+
+
+@pytest.mark.django_db
+def test_refresh_is_incremental(workbook):
+    assert refresh_questionnaire_responses() == (3, 0)
+    assert QuestionnaireResponse.objects.count() == 3
+    # An unchanged workbook is not parsed again.
+    with CaptureQueriesContext(connection) as queries:
+        assert refresh_questionnaire_responses() == (0, 0)
+    assert len(queries) == 1
+    # Only modified responses are written and removed ones are deleted.
+    write_workbook(
+        workbook,
+        [
+            (pd.Timestamp("2022-01-01 10:00"), "q-1", 30, 7.5),
+            (pd.Timestamp("2022-02-01 10:00"), "q-1", 31, 6.0),
+        ],
+    )
+    assert refresh_questionnaire_responses() == (1, 1)
+    response = QuestionnaireResponse.objects.get(
+        subject_id="q-1", timestamp=pd.Timestamp("2022-02-01 10:00")
+    )
+    assert response.answers[-1] == ["Sleep", 6.0]
+    assert not QuestionnaireResponse.objects.filter(subject_id="q-2").exists()
+
+
+@pytest.mark.django_db
+def test_get_latest_responses(workbook):
+    refresh_questionnaire_responses()
+    with CaptureQueriesContext(connection) as queries:
+        responses = get_latest_responses(["q-2", "q-1", "missing"], refresh=False)
+    assert len(queries) == 1
+    assert list(responses.columns) == ["Timestamp", "Subject ID", "Age", "Sleep"]
+    assert list(responses["Subject ID"]) == ["q-2", "q-1"]
+    assert list(responses["Timestamp"]) == [
+        "2022-01-05 09:00:00",
+        "2022-02-01 10:00:00",
+    ]
+    assert responses["Sleep"].isna().tolist() == [False, True]
+
+
+@pytest.mark.django_db
+def test_subject_questionnaire_data(workbook):
+    subject = Subject.objects.create(pylabber_id=1, questionnaire_id="q-1")
+    data = subject.get_questionnaire_data()
+    assert len(data) == 1
+    assert data["Age"].item() == 31
+    assert Subject(pylabber_id=2).get_questionnaire_data().empty
@@ -0,0 +1,92 @@
+import pandas as pd
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from neurohub.base_models.models import Condition, Group, Study, Subject
+
+
+@pytest.fixture
+def study():
+    study = Study.objects.create(title="Sleep")
+    groups = [Group.objects.create(title=title) for title in ("b", "a", "other")]
+    conditions = [Condition.objects.create(title=title) for title in ("x", "y")]
+    study.groups.add(*groups[:2])
+    study.conditions.add(conditions[0])
+    subjects = Subject.objects.bulk_create(
+        [Subject(pylabber_id=pk) for pk in range(1, 201)]
+    )
+    for subject in subjects:
+        subject.group_set.add(groups[subject.pk % 2])
+        subject.condition_set.add(conditions[0])
+    # Subjects in several study groups are listed once, with the first group.
+    groups[1].subjects.add(subjects[1])
+    groups[2].subjects.add(subjects[2])
+    # Subjects outside the study's groups or conditions are excluded.
+    outsider = Subject.objects.create(pylabber_id=1000)
+    groups[0].subjects.add(outsider)
+    conditions[1].subjects.add(outsider)
+    return study
+
+
+@pytest.mark.django_db
+def test_generate_subjects_table(study):
+    with CaptureQueriesContext(connection) as queries:
+        table = study.generate_subjects_table()
+    assert len(queries) == 1
+    assert list(table.columns) == ["id", "study", "group", "condition"]
+    assert list(table["id"]) == list(range(200, 0, -1))
+    assert (table["study"] == "Sleep").all()
+    assert (table["condition"] == "x").all()
+    groups = table.set_index("id")["group"]
+    assert groups[2] == "a"
+    assert groups[3] == "a"
+    assert groups[4] == "b"
+
+
+@pytest.mark.django_db
+def test_generate_subjects_table_empty():
+    table = Study.objects.create(title="Empty").generate_subjects_table()
+    assert table.empty
+    assert list(table.columns) == ["id", "study", "group", "condition"]
+
+
+@pytest.mark.django_db
+def test_generate_full_subjects_table(study, settings, tmp_path):
+    settings.QUESTIONNAIRE_PATH = str(tmp_path / "questionnaire.xlsx")
+    pd.DataFrame(
+        {
+            "Timestamp": pd.to_datetime(["2022-01-01", "2022-02-01", "2022-01-01"]),
+            "Subject ID": ["q-2", "q-2", "q-3"],
+            "Age": [30, 31, 40],
+        }
+    ).to_excel(settings.QUESTIONNAIRE_PATH, index=False)
+    Subject.objects.filter(pk=2).update(questionnaire_id="q-2")
+    Subject.objects.filter(pk=3).update(questionnaire_id="q-3")
+    table = study.generate_full_subjects_table()
+    assert list(table.columns) == [
+        "Timestamp",
+        "Subject ID",
+        "Age",
+        "pylabber_id",
+        "study",
+        "group",
+        "condition",
+    ]
+    assert list(table["pylabber_id"]) == [3, 2]
+    assert list(table["Age"]) == [40, 31]
+    assert list(table["group"]) == ["a", "a"]
+    for column in ("study", "group", "condition"):
+        assert isinstance(table[column].dtype, pd.CategoricalDtype)
+    # The workbook is parsed once, not once per subject.
+    with CaptureQueriesContext(connection) as queries:
+        study.generate_full_subjects_table()
+    assert len(queries) == 3
+
+
+@pytest.mark.django_db
+def test_generate_full_subjects_table_without_responses(study, settings, tmp_path):
+    settings.QUESTIONNAIRE_PATH = str(tmp_path / "missing.xlsx")
+    table = study.generate_full_subjects_table()
+    assert table.empty
+    assert list(table.columns) == ["pylabber_id", "study", "group", "condition"]
@@ -0,0 +1,69 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from neurohub.base_models.file_cache import get_file_cache
+from neurohub.base_models.models import Subject
+from neurohub.base_models.subject_sync import sync_subjects
+
+
+@pytest.fixture(autouse=True)
+def table_files(settings, tmp_path):
+    settings.EXTERNAL_TABLE_CACHE_DIR = str(tmp_path / "cache")
+    settings.PYLABBER_TABLE_PATH = str(tmp_path / "pylabber.csv")
+    settings.CRF_TABLE_PATH = str(tmp_path / "CRF.xlsx")
+    cache.clear()
+    get_file_cache().clear()
+    yield
+    cache.clear()
+    get_file_cache().clear()
+
+
+def write_tables(settings, n_subjects: int, first_name: str = "Dana") -> None:
+    ids = range(1, n_subjects + 1)
+    pd.DataFrame(
+        {
+            "ID": list(ids),
+            "ID Number": [1000 + pk for pk in ids],
+            "First Name": [first_name] * n_subjects,
+            "Last Name": ["Levi"] * n_subjects,
+            "Date Of Birth": ["1990-01-02"] * n_subjects,
+            "Sex": ["F"] * n_subjects,
+            "Dominant Hand": ["R"] * n_subjects,
+        }
+    ).to_csv(settings.PYLABBER_TABLE_PATH, index=False)
+    pd.DataFrame({"ID": [1001, 1003], "Questionnaire": ["q-1", None]}).to_excel(
+        settings.CRF_TABLE_PATH, sheet_name="גיליון1", index=False
+    )
+    get_file_cache().clear()
+
+
+@pytest.mark.django_db
+def test_sync_subjects(settings):
+    Subject.objects.create(pylabber_id=2, first_name="Dana", questionnaire_id="old")
+    Subject.objects.create(pylabber_id=99, first_name="Noa")
+    write_tables(settings, 3)
+    assert sync_subjects() == (2, 1)
+    subject = Subject.objects.get(pylabber_id=1)
+    assert subject.id_number == "000001001"
+    assert subject.date_of_birth == date(1990, 1, 2)
+    assert subject.questionnaire_id == "q-1"
+    # Subjects missing from the CRF keep their questionnaire ID.
+    assert Subject.objects.get(pylabber_id=2).questionnaire_id == "old"
+    assert Subject.objects.get(pylabber_id=99).first_name == "Noa"
+    # Unchanged rows are never written again.
+    assert sync_subjects() == (0, 0)
+
+
+@pytest.mark.django_db
+def test_sync_subjects_constant_queries(settings):
+    write_tables(settings, 5)
+    sync_subjects(batch_size=1000)
+    write_tables(settings, 50, first_name="Yael")
+    with CaptureQueriesContext(connection) as context:
+        assert sync_subjects(batch_size=1000) == (45, 5)
+    assert len(context.captured_queries) <= 5
@@ -0,0 +1,108 @@
+import os
+
+import nibabel as nib
+import numpy as np
+import pytest
+
+from neurohub.base_models import volume_statistics
+from neurohub.base_models.checksums import update_checksums
+from neurohub.base_models.models import NIfTI, ProcessedInput, VolumeStatistics
+from neurohub.base_models.volume_statistics import (
+    STAGE,
+    compute_volume_statistics,
+    update_volume_statistics,
+)
+
+
+@pytest.fixture
+def dwi_path(tmp_path):
+    path = tmp_path / "sub-1_dwi.nii.gz"
+    data = np.zeros((6, 6, 4, 3), dtype=np.int16)
+    data[..., 1] = 2
+    data[:3, ..., 2] = 4
+    nib.save(nib.Nifti1Image(data, np.eye(4)), path)
+    return path
+
+
+def test_compute_volume_statistics(dwi_path):
+    volumes = compute_volume_statistics(str(dwi_path), bins=4, chunk_volumes=2)
+    assert [volume["volume"] for volume in volumes] == [0, 1, 2]
+    assert volumes[1]["mean"] == 2
+    assert volumes[2]["mean"] == 2
+    assert volumes[2]["std"] == 2
+    assert volumes[2]["nonzero_count"] == 72
+    assert volumes[2]["histogram"] == [72, 0, 0, 72]
+    assert volumes[0]["max"] == 0
+
+
+@pytest.mark.django_db
+def test_volume_statistics_non_finite(tmp_path):
+    path = tmp_path / "sub-1_bold.nii.gz"
+    data = np.ones((4, 4, 2, 2), dtype=np.float32)
+    data[0, 0, 0, 0] = np.nan
+    data[1, 0, 0, 0] = np.inf
+    data[2, 0, 0, 0] = 3
+    data[..., 1] = np.nan
+    nib.save(nib.Nifti1Image(data, np.eye(4)), path)
+    first, empty = compute_volume_statistics(str(path), bins=2)
+    assert first["min"] == 1
+    assert first["max"] == 3
+    assert first["nonzero_count"] == 30
+    assert first["histogram"] == [29, 1]
+    assert first["mean"] == pytest.approx(32 / 30)
+    assert np.isnan(empty["mean"])
+    assert empty["nonzero_count"] == 0
+    assert empty["histogram"] == [0, 0]
+    nifti = NIfTI.objects.create(path=str(path))
+    assert update_volume_statistics(max_workers=1) == 1
+    assert nifti.volume_statistics_set.get(volume=0).max == 3
+    assert update_volume_statistics(max_workers=1) == 0
+
+
+@pytest.mark.django_db
+def test_update_volume_statistics(dwi_path):
+    nifti = NIfTI.objects.create(path=str(dwi_path))
+    assert update_volume_statistics(max_workers=1) == 1
+    assert nifti.volume_statistics_set.count() == 3
+    # Up to date statistics are never recomputed.
+    assert update_volume_statistics(max_workers=1) == 0
+    stat = dwi_path.stat()
+    os.utime(dwi_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    nifti.save()
+    assert update_volume_statistics(max_workers=1) == 1
+    assert VolumeStatistics.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_update_volume_statistics_skips_truncated_images(dwi_path, tmp_path):
+    truncated_path = tmp_path / "sub-2_dwi.nii.gz"
+    content = dwi_path.read_bytes()
+    truncated_path.write_bytes(content[: len(content) // 2])
+    assert compute_volume_statistics(str(truncated_path)) is None
+    truncated = NIfTI.objects.create(path=str(truncated_path), shape=[6, 6, 4, 3])
+    nifti = NIfTI.objects.create(path=str(dwi_path))
+    assert update_volume_statistics(max_workers=1) == 1
+    assert nifti.volume_statistics_set.count() == 3
+    assert not truncated.volume_statistics_set.exists()
+
+
+@pytest.mark.django_db
+def test_update_volume_statistics_reuses_duplicates(dwi_path, monkeypatch):
+    copies = [dwi_path.with_name(f"sub-{pk}_dwi.nii.gz") for pk in (2, 3)]
+    for copy in copies:
+        copy.write_bytes(dwi_path.read_bytes())
+    NIfTI.objects.create(path=str(dwi_path))
+    NIfTI.objects.create(path=str(copies[0]))
+    update_checksums()
+    assert update_volume_statistics(max_workers=1) == 2
+    assert VolumeStatistics.objects.count() == 6
+    content_hash = NIfTI.objects.first().content_hash
+    assert ProcessedInput.is_processed(STAGE, content_hash)
+    # Copies of processed contents are never read again.
+    VolumeStatistics.objects.filter(volume=1).update(mean=-1)
+    duplicate = NIfTI.objects.create(path=str(copies[1]))
+    update_checksums()
+    monkeypatch.setattr(volume_statistics, "ProcessPoolExecutor", None)
+    assert update_volume_statistics() == 1
+    assert duplicate.volume_statistics_set.get(volume=1).mean == -1
+    assert update_volume_statistics() == 0
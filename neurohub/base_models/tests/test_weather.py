@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from neurohub.base_models.models import Session, WeatherFetch, WeatherReading
+from neurohub.base_models.weather import (
+    fill_weather_table,
+    get_missing_ranges,
+    get_sessions_weather,
+    read_weather_file,
+)
+
+
+@pytest.fixture
+def weather_file(settings, tmp_path):
+    path = tmp_path / "weather.csv"
+    times = pd.date_range("2022-02-13", "2022-02-16 23:00", freq="H")
+    pd.DataFrame({"time": times, "temp": range(len(times))}).to_csv(path, index=False)
+    settings.WEATHER_FILE = str(path)
+    settings.WEATHER_FETCHER = "neurohub.base_models.weather.read_weather_file"
+    return path
+
+
+@pytest.fixture
+def counting_fetcher(weather_file):
+    calls = []
+
+    def fetcher(start, end):
+        calls.append((start, end))
+        return read_weather_file(start, end)
+
+    fetcher.calls = calls
+    return fetcher
+
+
+@pytest.mark.django_db
+def test_fill_weather_table(counting_fetcher):
+    assert fill_weather_table(
+        datetime(2022, 2, 14, 10), datetime(2022, 2, 14, 12), counting_fetcher
+    )
+    assert WeatherReading.objects.count() == 24
+    missing = get_missing_ranges(datetime(2022, 2, 13), datetime(2022, 2, 16))
+    assert missing == [
+        (datetime(2022, 2, 13), datetime(2022, 2, 13, 23, 59, 59, 999999)),
+        (datetime(2022, 2, 15), datetime(2022, 2, 16, 23, 59, 59, 999999)),
+    ]
+    fill_weather_table(datetime(2022, 2, 13), datetime(2022, 2, 16), counting_fetcher)
+    assert len(counting_fetcher.calls) == 3
+    assert WeatherReading.objects.count() == 96
+    # Stored days are never fetched again.
+    assert not fill_weather_table(
+        datetime(2022, 2, 13), datetime(2022, 2, 16), counting_fetcher
+    )
+    assert len(counting_fetcher.calls) == 3
+
+
+@pytest.mark.django_db
+def test_fill_weather_table_partial_days(counting_fetcher):
+    day = (datetime(2022, 2, 13), datetime(2022, 2, 13, 23, 59, 59, 999999))
+    WeatherReading.objects.create(time=datetime(2022, 2, 13, 5))
+    # Partially stored days are completed.
+    assert get_missing_ranges(*day) == [day]
+    assert fill_weather_table(*day, fetcher=counting_fetcher) == 24
+    assert WeatherReading.objects.count() == 24
+    # Days the fetcher has no readings for are only requested once.
+    empty = (datetime(2022, 2, 20), datetime(2022, 2, 21))
+    assert not fill_weather_table(*empty, fetcher=counting_fetcher)
+    assert not fill_weather_table(*empty, fetcher=counting_fetcher)
+    assert counting_fetcher.calls[1:] == [
+        (datetime(2022, 2, 20), datetime(2022, 2, 21, 23, 59, 59, 999999))
+    ]
+    assert WeatherFetch.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_fill_weather_table_recent_days(counting_fetcher):
+    now = datetime.now()
+    fill_weather_table(now, now, counting_fetcher)
+    fill_weather_table(now, now, counting_fetcher)
+    # Days whose readings may still arrive are requested again.
+    assert len(counting_fetcher.calls) == 2
+    assert not WeatherFetch.objects.exists()
+    yesterday = now - timedelta(days=1)
+    fill_weather_table(yesterday, yesterday, counting_fetcher)
+    assert not WeatherFetch.objects.exists()
+
+
+@pytest.mark.django_db
+def test_get_sessions_weather(counting_fetcher):
+    sessions = [
+        Session.objects.create(bids_dir="ses-202202131331"),
+        Session.objects.create(bids_dir="ses-202202151310"),
+    ]
+    weather = get_sessions_weather(sessions, counting_fetcher)
+    assert len(counting_fetcher.calls) == 1
+    assert list(weather.index) == [session.id for session in sessions]
+    assert weather.loc[sessions[0].id, "reading_time"] == pd.Timestamp(
+        "2022-02-13 14:00"
+    )
+    assert weather.loc[sessions[1].id, "temp"] == 61
+
+
+@pytest.mark.django_db
+def test_session_weather_data(weather_file):
+    session = Session(bids_dir="ses-202202131331")
+    weather = session.get_weather_data()
+    assert list(weather.index) == [pd.Timestamp("2022-02-13 14:00")]
+    assert weather["temp"].iloc[0] == 14
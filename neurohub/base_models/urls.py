@@ -0,0 +1,13 @@
+from django.urls import path
+
+from neurohub.base_models.views import preview_tile_view, session_manifest_view
+
+app_name = "base_models"
+urlpatterns = [
+    path(
+        "niftis/<int:pk>/tiles/<int:level>/<int:axis>/<int:index>/<int:row>/<int:col>.png",
+        view=preview_tile_view,
+        name="preview-tile",
+    ),
+    path("sessions/manifest/", view=session_manifest_view, name="session-manifest"),
+]
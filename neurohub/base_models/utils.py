@@ -6,6 +6,29 @@ def convert_id_to_str(value: float) -> str:
     return str(int(value)).zfill(9) if not pd.isna(value) else value
 
 
+def normalize_id_number(value) -> str:
+    """
+    Formats numeric ID numbers like the CRF table does (zero-padded to nine
+    digits), so that tables storing them as numbers can be matched with it.
+
+    Parameters
+    ----------
+    value
+        ID number as read from a table
+
+    Returns
+    -------
+    str
+        Normalized ID number, or *None* if missing
+    """
+    if pd.isna(value):
+        return None
+    value = str(value).strip()
+    if value.endswith(".0"):
+        value = value[:-2]
+    return value.zfill(9) if value.isdigit() else value
+
+
 def read_subject_table() -> pd.DataFrame:
     """
     Temporary method to use an external table to retrieve subject
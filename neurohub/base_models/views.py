@@ -1,3 +1,46 @@
-from django.shortcuts import render  # noqa: F401
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.cache import cache_control
 
-# Create your views here.
+from neurohub.base_models.manifest import get_session_manifests
+from neurohub.base_models.models import NIfTIPreview
+from neurohub.base_models.previews import render_tile
+
+
+@method_decorator(cache_control(private=True, max_age=60 * 60), name="get")
+class PreviewTileView(LoginRequiredMixin, View):
+    """
+    Serves a PNG tile of a slice from a NIfTI's precomputed preview pyramid.
+    """
+
+    def get(self, request, pk, level, axis, index, row, col):
+        preview = get_object_or_404(NIfTIPreview, nifti_id=pk)
+        try:
+            png = render_tile(preview, level, axis, index, row, col)
+        except IndexError as error:
+            raise Http404(str(error))
+        return HttpResponse(png, content_type="image/png")
+
+
+preview_tile_view = PreviewTileView.as_view()
+
+
+class SessionManifestView(LoginRequiredMixin, View):
+    """
+    Returns the NIfTI files, sidecar files and tensor derivatives of the
+    sessions given by the *session* query parameters as JSON.
+    """
+
+    def get(self, request):
+        try:
+            session_ids = [int(pk) for pk in request.GET.getlist("session")]
+        except ValueError:
+            return JsonResponse({"error": "Invalid session ID."}, status=400)
+        manifests = get_session_manifests(session_ids)
+        return JsonResponse({"sessions": list(manifests.values())})
+
+
+session_manifest_view = SessionManifestView.as_view()
@@ -0,0 +1,340 @@
+"""
+Streaming computation of per-volume statistics for 3D and 4D images.
+
+Voxel data is read one chunk of volumes at a time and reduced in float32, so
+memory use is bounded by the chunk size rather than the image size.
+"""
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import nibabel as nib
+import numpy as np
+from django.db.models import Exists, F, OuterRef, QuerySet
+
+from neurohub.base_models.checksums import group_by_content
+from neurohub.base_models.image_access import get_indexed_image
+from neurohub.base_models.models import NIfTI, ProcessedInput, VolumeStatistics
+from neurohub.base_models.models.nifti import HEADER_READ_ERRORS
+
+#: Default number of histogram bins.
+DEFAULT_BINS: int = 64
+
+#: Default number of volumes read at once.
+DEFAULT_CHUNK_VOLUMES: int = 1
+
+#: :class:`VolumeStatistics` fields updated when statistics are recomputed.
+STATISTICS_FIELDS = [
+    "mean",
+    "std",
+    "min",
+    "max",
+    "nonzero_count",
+    "histogram",
+    "source_mtime_ns",
+    "modified",
+]
+
+#: :class:`VolumeStatistics` fields copied between images with identical
+#: contents.
+COPIED_FIELDS = ["volume", "mean", "std", "min", "max", "nonzero_count", "histogram"]
+
+#: :class:`ProcessedInput` stage of volume statistics computation.
+STAGE: str = "volume_statistics"
+
+#: Errors raised when the voxel data of a missing, corrupt or truncated image
+#: is read (see :func:`read_voxels`).
+IMAGE_READ_ERRORS = (*HEADER_READ_ERRORS, zlib.error)
+
+
+def open_image(path: str) -> nib.Nifti1Image:
+    """
+    Opens an image for sequential volume reads. Compressed files are read
+    through their gzip seek index if one exists, otherwise the file is kept
+    open so that consecutive reads continue decompressing where the previous
+    one stopped.
+
+    Parameters
+    ----------
+    path : str
+        Image file path
+
+    Returns
+    -------
+    nib.Nifti1Image
+        Image with lazily read voxel data
+    """
+    if path.endswith(".gz"):
+        image = get_indexed_image(path)
+        if image is not None:
+            return image
+    return nib.load(path, mmap="r", keep_file_open=True)
+
+
+def read_voxels(dataobj: nib.arrayproxy.ArrayProxy, index: tuple) -> np.ndarray:
+    """
+    Reads a region of an image's voxel data.
+
+    Parameters
+    ----------
+    dataobj : nib.arrayproxy.ArrayProxy
+        Image data object
+    index : tuple
+        Slicing index
+
+    Returns
+    -------
+    np.ndarray
+        Voxel data
+
+    Raises
+    ------
+    EOFError
+        If the file holds less data than its header describes, which nibabel
+        reports as a :class:`ValueError`
+    """
+    try:
+        return np.asanyarray(dataobj[index])
+    except ValueError as error:
+        raise EOFError(str(error)) from error
+
+
+def summarize_volumes(data: np.ndarray, bins: int = DEFAULT_BINS) -> list[dict]:
+    """
+    Computes the statistics of every volume in a chunk of voxel data,
+    ignoring non-finite (NaN or infinite) voxels. Volumes without finite
+    voxels get NaN statistics and an empty histogram.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        Voxel data shaped (X, Y, Z, N), in float32
+    bins : int, optional
+        Number of histogram bins, by default 64
+
+    Returns
+    -------
+    list[dict]
+        Statistics of each of the N volumes
+    """
+    flat = data.reshape(-1, data.shape[-1])
+    summaries = []
+    for volume in flat.T:
+        values = volume[np.isfinite(volume)]
+        if values.size:
+            minimum, maximum = float(values.min()), float(values.max())
+            histogram, _ = np.histogram(values, bins=bins, range=(minimum, maximum))
+            mean = float(values.mean(dtype=np.float32))
+            std = float(values.std(dtype=np.float32))
+        else:
+            minimum = maximum = mean = std = np.nan
+            histogram = np.zeros(bins, dtype=np.int64)
+        summaries.append(
+            {
+                "mean": mean,
+                "std": std,
+                "min": minimum,
+                "max": maximum,
+                "nonzero_count": int(np.count_nonzero(values)),
+                "histogram": histogram.tolist(),
+            }
+        )
+    return summaries
+
+
+def compute_volume_statistics(
+    path: str,
+    bins: int = DEFAULT_BINS,
+    chunk_volumes: int = DEFAULT_CHUNK_VOLUMES,
+) -> list[dict]:
+    """
+    Computes the statistics of every volume of an image, streaming
+    *chunk_volumes* volumes at a time. Runs inside worker processes, so it
+    must not touch the database.
+
+    Parameters
+    ----------
+    path : str
+        Image file path
+    bins : int, optional
+        Number of histogram bins, by default 64
+    chunk_volumes : int, optional
+        Number of volumes read at once, by default 1
+
+    Returns
+    -------
+    list[dict]
+        Statistics of each volume, including its index, or *None* if the
+        image cannot be read
+    """
+    try:
+        return _compute_volume_statistics(path, bins, chunk_volumes)
+    except IMAGE_READ_ERRORS:
+        return None
+
+
+def _compute_volume_statistics(path: str, bins: int, chunk_volumes: int) -> list:
+    mtime_ns = os.stat(path).st_mtime_ns
+    dataobj = open_image(path).dataobj
+    shape = dataobj.shape
+    n_volumes = shape[3] if len(shape) > 3 else 1
+    results = []
+    for start in range(0, n_volumes, chunk_volumes):
+        stop = min(start + chunk_volumes, n_volumes)
+        if len(shape) > 3:
+            chunk = read_voxels(dataobj, (..., slice(start, stop)))
+        else:
+            chunk = read_voxels(dataobj, (...,))[..., np.newaxis]
+        chunk = np.asarray(chunk, dtype=np.float32).reshape(*shape[:3], -1)
+        for volume, summary in enumerate(summarize_volumes(chunk, bins), start):
+            results.append({"volume": volume, "source_mtime_ns": mtime_ns, **summary})
+    return results
+
+
+def query_stale_niftis(niftis: QuerySet = None) -> QuerySet:
+    """
+    Returns the images whose statistics are missing or were computed from
+    an older version of the file.
+
+    Parameters
+    ----------
+    niftis : QuerySet, optional
+        Images to check, by default all images with header data
+
+    Returns
+    -------
+    QuerySet
+        Images requiring (re)computation
+    """
+    if niftis is None:
+        niftis = NIfTI.objects.all()
+    up_to_date = VolumeStatistics.objects.filter(
+        nifti=OuterRef("pk"), source_mtime_ns=OuterRef("file_mtime_ns")
+    )
+    return niftis.filter(~Exists(up_to_date), shape__isnull=False)
+
+
+def read_processed_statistics(content_hash: str, exclude: list[NIfTI]) -> list:
+    """
+    Returns the up to date statistics of another image with the same
+    contents, if their computation was recorded as a :class:`ProcessedInput`.
+
+    Parameters
+    ----------
+    content_hash : str
+        Content hash of the images to process
+    exclude : list[NIfTI]
+        Images to process, which may not be used as the source
+
+    Returns
+    -------
+    list
+        Statistics of each volume, or *None* if none are stored
+    """
+    if content_hash is None or not ProcessedInput.is_processed(STAGE, content_hash):
+        return None
+    up_to_date = VolumeStatistics.objects.filter(
+        nifti=OuterRef("pk"), source_mtime_ns=OuterRef("file_mtime_ns")
+    )
+    source = (
+        NIfTI.objects.filter(
+            Exists(up_to_date),
+            content_hash=content_hash,
+            content_hash_mtime_ns__gte=F("file_mtime_ns"),
+        )
+        .exclude(pk__in=[nifti.pk for nifti in exclude])
+        .first()
+    )
+    if source is None:
+        return None
+    return list(source.volume_statistics_set.order_by("volume").values(*COPIED_FIELDS))
+
+
+def write_volume_statistics(
+    nifti: NIfTI, volumes: list[dict], source_mtime_ns: int = None
+) -> None:
+    """
+    Stores the statistics of an image, replacing those of removed volumes.
+
+    Parameters
+    ----------
+    nifti : NIfTI
+        Described image
+    volumes : list[dict]
+        Output of :func:`compute_volume_statistics`
+    source_mtime_ns : int, optional
+        Modification time recorded instead of the computed one, for
+        statistics copied from an image with the same contents
+    """
+    if source_mtime_ns is not None:
+        volumes = [{**volume, "source_mtime_ns": source_mtime_ns} for volume in volumes]
+    VolumeStatistics.objects.bulk_create(
+        [VolumeStatistics(nifti=nifti, **volume) for volume in volumes],
+        update_conflicts=True,
+        unique_fields=["nifti", "volume"],
+        update_fields=STATISTICS_FIELDS,
+    )
+    VolumeStatistics.objects.filter(nifti=nifti, volume__gte=len(volumes)).delete()
+
+
+def update_volume_statistics(
+    niftis: QuerySet = None,
+    bins: int = DEFAULT_BINS,
+    chunk_volumes: int = DEFAULT_CHUNK_VOLUMES,
+    max_workers: int = None,
+) -> int:
+    """
+    Computes and stores the statistics of images in a process pool, skipping
+    images whose statistics are up to date and images that cannot be read.
+    Duplicate copies of the same contents (see
+    :func:`~neurohub.base_models.checksums.group_by_content`) are read once,
+    and copies of already processed contents reuse the stored statistics.
+
+    Parameters
+    ----------
+    niftis : QuerySet, optional
+        Images to process, by default all images. Images whose statistics
+        are up to date are skipped (see :func:`query_stale_niftis`)
+    bins : int, optional
+        Number of histogram bins, by default 64
+    chunk_volumes : int, optional
+        Number of volumes read at once, by default 1
+    max_workers : int, optional
+        Number of processes, by default the number of CPUs
+
+    Returns
+    -------
+    int
+        Number of processed images
+    """
+    niftis = list(query_stale_niftis(niftis))
+    if not niftis:
+        return 0
+    count = 0
+    pending = []
+    for content_hash, group in group_by_content(niftis):
+        volumes = read_processed_statistics(content_hash, group)
+        if volumes is None:
+            pending.append((content_hash, group))
+            continue
+        for nifti in group:
+            write_volume_statistics(nifti, volumes, nifti.file_mtime_ns)
+        count += len(group)
+    if not pending:
+        return count
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(
+            compute_volume_statistics,
+            [group[0].path for _, group in pending],
+            [bins] * len(pending),
+            [chunk_volumes] * len(pending),
+        )
+        for (content_hash, group), volumes in zip(pending, results):
+            if volumes is None:
+                continue
+            write_volume_statistics(group[0], volumes)
+            for nifti in group[1:]:
+                write_volume_statistics(nifti, volumes, nifti.file_mtime_ns)
+            ProcessedInput.mark_processed(STAGE, [content_hash])
+            count += len(group)
+    return count
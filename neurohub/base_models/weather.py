@@ -0,0 +1,284 @@
+"""
+A local hourly weather table for the scanning location, filled in bulk from a
+swappable fetcher and joined to sessions by nearest reading time.
+"""
+from collections.abc import Callable, Iterable
+from datetime import datetime, time, timedelta
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.utils.module_loading import import_string
+from meteostat import Hourly, Point
+
+from neurohub.base_models.models.weather_fetch import WeatherFetch
+from neurohub.base_models.models.weather_reading import (
+    WEATHER_COLUMNS,
+    WeatherReading,
+)
+
+#: Location of the scanning sessions.
+WEATHER_LOCATION = {"lon": 34.8, "lat": 32.0833}  # Tel Aviv
+
+#: Number of readings inserted per query.
+INSERT_BATCH_SIZE: int = 1000
+
+#: Number of hourly readings of a fully stored day.
+READINGS_PER_DAY: int = 24
+
+#: Time after the end of a day from which its readings are considered final,
+#: after which fetching it once is enough.
+WEATHER_SETTLE_TIME = timedelta(days=1)
+
+#: Signature of weather fetchers: (start, end) -> hourly data indexed by time.
+WeatherFetcher = Callable[[datetime, datetime], pd.DataFrame]
+
+
+def fetch_meteostat(start: datetime, end: datetime) -> pd.DataFrame:
+    """
+    Fetches hourly weather data of the scanning location from meteostat_.
+
+    .. _meteostat: https://dev.meteostat.net/python/hourly.html
+
+    Parameters
+    ----------
+    start : datetime
+        Start of the range
+    end : datetime
+        End of the range
+
+    Returns
+    -------
+    pd.DataFrame
+        Hourly weather data indexed by time
+    """
+    return Hourly(Point(**WEATHER_LOCATION), start, end).fetch()
+
+
+def read_weather_file(start: datetime, end: datetime) -> pd.DataFrame:
+    """
+    Reads hourly weather data from the CSV file configured by the
+    *WEATHER_FILE* setting, with a "time" column and meteostat's column names.
+    Serves as an offline stand-in for :func:`fetch_meteostat`.
+
+    Parameters
+    ----------
+    start : datetime
+        Start of the range
+    end : datetime
+        End of the range
+
+    Returns
+    -------
+    pd.DataFrame
+        Hourly weather data indexed by time
+    """
+    data = pd.read_csv(settings.WEATHER_FILE, parse_dates=["time"], index_col="time")
+    return data.sort_index().loc[start:end]
+
+
+def get_weather_fetcher() -> WeatherFetcher:
+    """
+    Returns the weather fetcher configured by the *WEATHER_FETCHER* setting.
+
+    Returns
+    -------
+    WeatherFetcher
+        Weather fetcher
+    """
+    return import_string(settings.WEATHER_FETCHER)
+
+
+def get_missing_ranges(start: datetime, end: datetime) -> list[tuple[datetime]]:
+    """
+    Returns the ranges of days between *start* and *end* that are neither
+    recorded as fetched nor have all of their hourly readings stored, merging
+    consecutive days.
+
+    Parameters
+    ----------
+    start : datetime
+        Start of the range
+    end : datetime
+        End of the range
+
+    Returns
+    -------
+    list[tuple[datetime]]
+        Start and end of each missing range
+    """
+    first_day, last_day = start.date(), end.date()
+    fetched = set(
+        WeatherFetch.objects.filter(
+            date__gte=first_day, date__lte=last_day
+        ).values_list("date", flat=True)
+    )
+    readings = pd.Series(
+        WeatherReading.objects.filter(
+            time__gte=datetime.combine(first_day, time.min),
+            time__lte=datetime.combine(last_day, time.max),
+        ).values_list("time", flat=True),
+        dtype="datetime64[ns]",
+    )
+    counts = readings.dt.date.value_counts()
+    stored = fetched | set(counts.index[counts >= READINGS_PER_DAY])
+    ranges = []
+    for offset in range((last_day - first_day).days + 1):
+        day = first_day + timedelta(days=offset)
+        if day in stored:
+            continue
+        if ranges and ranges[-1][1] == day - timedelta(days=1):
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+    return [
+        (datetime.combine(range_start, time.min), datetime.combine(range_end, time.max))
+        for range_start, range_end in ranges
+    ]
+
+
+def record_fetched_days(range_start: datetime, range_end: datetime) -> None:
+    """
+    Records the days between *range_start* and *range_end* whose readings
+    were final when fetched (see :data:`WEATHER_SETTLE_TIME`). More recent
+    days stay missing so that their remaining readings are fetched later.
+
+    Parameters
+    ----------
+    range_start : datetime
+        Start of the fetched range
+    range_end : datetime
+        End of the fetched range
+    """
+    last_final = (datetime.now() - WEATHER_SETTLE_TIME).date() - timedelta(days=1)
+    days = pd.date_range(range_start.date(), min(range_end.date(), last_final))
+    WeatherFetch.objects.bulk_create(
+        [WeatherFetch(date=day.date()) for day in days], ignore_conflicts=True
+    )
+
+
+def fill_weather_table(
+    start: datetime, end: datetime, fetcher: WeatherFetcher = None
+) -> int:
+    """
+    Fetches and stores the readings of every day between *start* and *end*
+    that is missing (see :func:`get_missing_ranges`), with one fetch per range
+    of missing days.
+
+    Parameters
+    ----------
+    start : datetime
+        Start of the range
+    end : datetime
+        End of the range
+    fetcher : WeatherFetcher, optional
+        Weather fetcher, by default the one returned by
+        :func:`get_weather_fetcher`
+
+    Returns
+    -------
+    int
+        Number of fetched readings
+    """
+    fetcher = fetcher or get_weather_fetcher()
+    count = 0
+    for range_start, range_end in get_missing_ranges(start, end):
+        data = fetcher(range_start, range_end).reindex(columns=WEATHER_COLUMNS)
+        data = data.astype(float).replace({np.nan: None})
+        readings = [
+            WeatherReading(time=timestamp.to_pydatetime(), **values)
+            for timestamp, values in zip(data.index, data.to_dict("records"))
+        ]
+        WeatherReading.objects.bulk_create(
+            readings, ignore_conflicts=True, batch_size=INSERT_BATCH_SIZE
+        )
+        record_fetched_days(range_start, range_end)
+        count += len(readings)
+    return count
+
+
+def get_weather_table(start: datetime, end: datetime) -> pd.DataFrame:
+    """
+    Returns the stored readings between *start* and *end*.
+
+    Parameters
+    ----------
+    start : datetime
+        Start of the range
+    end : datetime
+        End of the range
+
+    Returns
+    -------
+    pd.DataFrame
+        Hourly weather data indexed by time
+    """
+    rows = WeatherReading.objects.filter(time__gte=start, time__lte=end).values_list(
+        "time", *WEATHER_COLUMNS
+    )
+    data = pd.DataFrame.from_records(rows, columns=["time", *WEATHER_COLUMNS])
+    data["time"] = pd.to_datetime(data["time"])
+    return data.set_index("time").astype(float)
+
+
+def get_nearest_indices(index: pd.DatetimeIndex, times: Iterable) -> np.ndarray:
+    """
+    Finds the position of the nearest reading to each of *times* with a
+    single vectorized search.
+
+    Parameters
+    ----------
+    index : pd.DatetimeIndex
+        Sorted reading times
+    times : Iterable
+        Query times
+
+    Returns
+    -------
+    np.ndarray
+        Position of the nearest reading to each query time
+    """
+    readings = index.values
+    queries = pd.to_datetime(pd.Series(list(times))).values
+    after = np.clip(readings.searchsorted(queries), 0, len(readings) - 1)
+    before = np.clip(after - 1, 0, len(readings) - 1)
+    use_before = np.abs(queries - readings[before]) <= np.abs(readings[after] - queries)
+    return np.where(use_before, before, after)
+
+
+def get_sessions_weather(
+    sessions: Iterable, fetcher: WeatherFetcher = None
+) -> pd.DataFrame:
+    """
+    Returns the nearest stored reading to each session's time, filling the
+    weather table for the sessions' date range first.
+
+    Parameters
+    ----------
+    sessions : Iterable
+        :class:`~neurohub.base_models.models.session.Session` instances
+    fetcher : WeatherFetcher, optional
+        Weather fetcher, by default the one returned by
+        :func:`get_weather_fetcher`
+
+    Returns
+    -------
+    pd.DataFrame
+        Reading time and weather data indexed by session ID
+    """
+    sessions = [session for session in sessions if session.time is not None]
+    columns = ["reading_time", *WEATHER_COLUMNS]
+    if not sessions:
+        return pd.DataFrame(columns=columns)
+    times = [session.time for session in sessions]
+    start, end = min(times) - timedelta(hours=1), max(times) + timedelta(hours=1)
+    fill_weather_table(start, end, fetcher=fetcher)
+    weather = get_weather_table(
+        datetime.combine(start.date(), time.min), datetime.combine(end.date(), time.max)
+    )
+    index = pd.Index([session.id for session in sessions], name="session")
+    if weather.empty:
+        return pd.DataFrame(index=index, columns=columns)
+    nearest = weather.iloc[get_nearest_indices(weather.index, times)]
+    result = nearest.reset_index().rename(columns={"time": "reading_time"})
+    return result.set_index(index)[columns]
@@ -0,0 +1,62 @@
+"""
+Compares the speed of :func:`~neurohub.base_models.bids_entities.parse_entities`
+with pybids' :func:`~bids.layout.parse_file_entities` on the files of a BIDS
+dataset.
+
+Usage::
+
+    python -m neurohub.scripts.benchmark_bids_entities [BIDS_DIR] [REPEAT]
+"""
+import sys
+import timeit
+from pathlib import Path
+
+from bids.layout import parse_file_entities
+
+from neurohub.base_models.bids_entities import _parse_entities, parse_entities
+
+DEFAULT_BIDS_DIR = "neurohub/base_models/tests/data/bids_dataset"
+
+
+def benchmark(bids_dir: str = DEFAULT_BIDS_DIR, repeat: int = 10) -> dict:
+    """
+    Times parsing every file path in *bids_dir* with each parser.
+
+    Parameters
+    ----------
+    bids_dir : str, optional
+        BIDS dataset directory, by default the test dataset
+    repeat : int, optional
+        Number of passes over the paths, by default 10
+
+    Returns
+    -------
+    dict
+        Seconds per path of pybids, of the uncached and of the cached parser
+    """
+    paths = [str(path) for path in Path(bids_dir).rglob("*") if path.is_file()]
+    n_calls = len(paths) * repeat
+
+    def parse_all(parse):
+        for path in paths:
+            parse(path)
+
+    def parse_uncached(path):
+        _parse_entities.cache_clear()
+        return parse_entities(path)
+
+    return {
+        "pybids": timeit.timeit(lambda: parse_all(parse_file_entities), number=repeat)
+        / n_calls,
+        "uncached": timeit.timeit(lambda: parse_all(parse_uncached), number=repeat)
+        / n_calls,
+        "cached": timeit.timeit(lambda: parse_all(parse_entities), number=repeat)
+        / n_calls,
+    }
+
+
+if __name__ == "__main__":
+    results = benchmark(*sys.argv[1:2], *map(int, sys.argv[2:3]))
+    for name, seconds in results.items():
+        speedup = results["pybids"] / seconds
+        print(f"{name:>8}: {seconds * 1e6:10.1f} us/path ({speedup:.0f}x)")
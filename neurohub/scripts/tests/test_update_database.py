@@ -0,0 +1,270 @@
+import json
+import os
+from pathlib import Path
+
+import nibabel as nib
+import numpy as np
+import pandas as pd
+import pytest
+
+from neurohub.base_models.derivative_store import read_derivative_store
+from neurohub.base_models.filesystem import scan_directory
+from neurohub.base_models.models import (
+    DerivativeValue,
+    FileManifestEntry,
+    NIfTI,
+    Session,
+    Subject,
+    TensorDerivative,
+)
+from neurohub.base_models.models.nifti import get_sidecar_path
+from neurohub.scripts.update_database import (
+    collect_tensor_derivatives,
+    parse_derivative_path,
+    register_nifti_files,
+    write_derivatives_batch,
+)
+
+NIFTI_TEMPLATE = (
+    "sub-{subject}/ses-{session}/{datatype}/sub-{subject}_ses-{session}_{name}"
+)
+
+
+def create_bids_dataset(base_dir: Path) -> Path:
+    names = {
+        "anat": ("T1w.nii.gz", (8, 8, 6)),
+        "dwi": ("dir-FWD_dwi.nii.gz", (8, 8, 6, 5)),
+    }
+    for datatype, (name, shape) in names.items():
+        path = base_dir / NIFTI_TEMPLATE.format(
+            subject="2321", session="202202131331", datatype=datatype, name=name
+        )
+        path.parent.mkdir(parents=True, exist_ok=True)
+        image = nib.Nifti1Image(np.zeros(shape, dtype=np.int16), np.eye(4))
+        image.header.set_zooms((2.0, 2.0, 2.5, 3.0)[: len(shape)])
+        nib.save(image, path)
+        sidecar = {"PhaseEncodingDirection": "j-", "InstitutionName": "TAU"}
+        get_sidecar_path(path).write_text(json.dumps(sidecar))
+    derivative = (
+        base_dir
+        / "derivatives"
+        / "dipy"
+        / NIFTI_TEMPLATE.format(
+            subject="2321", session="202202131331", datatype="dwi", name="FA.nii.gz"
+        )
+    )
+    derivative.parent.mkdir(parents=True)
+    derivative.touch()
+    return base_dir
+
+
+DERIVATIVE_TEMPLATE = (
+    "sub-{subject}/ses-{session}/dwi/{estimator}/"
+    "sub-{subject}_ses-{session}_acq-dwi_atlas-{atlas}_label-GM_dseg.pickle"
+)
+
+
+def create_derivatives(base_dir: Path, n_subjects: int) -> list[Path]:
+    paths = []
+    for subject in range(1, n_subjects + 1):
+        for atlas in ("Brainnetome", "Schaefer"):
+            path = base_dir / DERIVATIVE_TEMPLATE.format(
+                subject=subject,
+                session=f"20220213{subject:04d}",
+                estimator="dipy",
+                atlas=atlas,
+            )
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.touch()
+            paths.append(path)
+    (base_dir / "README").touch()
+    return paths
+
+
+def test_scan_directory(tmp_path):
+    paths = create_derivatives(tmp_path, 3)
+    found = set(scan_directory(tmp_path, "sub-*_dseg.pickle"))
+    assert found == {str(path) for path in paths}
+
+
+def test_parse_derivative_path(tmp_path):
+    path = create_derivatives(tmp_path, 1)[0]
+    fields = parse_derivative_path(str(path))
+    assert fields["subject"] == "1"
+    assert fields["session"] == "202202130001"
+    assert fields["software_used"] == "dipy"
+    assert fields["atlas"] == "Brainnetome"
+
+
+@pytest.mark.django_db
+def test_write_derivatives_batch_constant_queries(
+    tmp_path, django_assert_max_num_queries
+):
+    paths = create_derivatives(tmp_path, 20)
+    parsed = [parse_derivative_path(str(path)) for path in paths]
+    with django_assert_max_num_queries(8):
+        created = write_derivatives_batch(parsed)
+    assert created == 40
+    assert Subject.objects.count() == 20
+    assert Session.objects.filter(subject__isnull=False).count() == 20
+    assert not TensorDerivative.objects.filter(session_parent=None).exists()
+    # Re-writing the same batch must not duplicate anything.
+    assert write_derivatives_batch(parsed) == 0
+
+
+@pytest.mark.django_db
+def test_write_derivatives_batch_counts_new_rows(tmp_path):
+    paths = create_derivatives(tmp_path, 2)
+    parsed = [parse_derivative_path(str(path)) for path in paths]
+    # A row registered under the same path but other entities conflicts.
+    TensorDerivative.objects.create(path=str(paths[0]))
+    assert write_derivatives_batch(parsed) == 3
+    assert TensorDerivative.objects.count() == 4
+
+
+@pytest.mark.django_db
+def test_collect_tensor_derivatives(tmp_path):
+    create_derivatives(tmp_path, 5)
+    collect_tensor_derivatives(tmp_path, batch_size=4, max_workers=1)
+    assert TensorDerivative.objects.count() == 10
+
+
+@pytest.mark.django_db
+def test_collect_tensor_derivatives_incremental(
+    tmp_path, django_assert_max_num_queries
+):
+    paths = create_derivatives(tmp_path, 5)
+    collect_tensor_derivatives(tmp_path, max_workers=1)
+    assert FileManifestEntry.objects.count() == 10
+    # An unchanged tree only needs the manifest to be read.
+    with django_assert_max_num_queries(1):
+        collect_tensor_derivatives(tmp_path, max_workers=1)
+    paths[0].unlink()
+    collect_tensor_derivatives(tmp_path, max_workers=1)
+    assert TensorDerivative.objects.count() == 9
+    assert not FileManifestEntry.objects.filter(path=str(paths[0])).exists()
+
+
+@pytest.mark.django_db
+def test_collect_tensor_derivatives_relative_path(
+    tmp_path, monkeypatch, django_assert_max_num_queries
+):
+    create_derivatives(tmp_path / "data", 2)
+    monkeypatch.chdir(tmp_path)
+    collect_tensor_derivatives(Path("data"), max_workers=1)
+    paths = FileManifestEntry.objects.values_list("path", flat=True)
+    assert all(Path(path).is_absolute() for path in paths)
+    derivatives = TensorDerivative.objects.values_list("path", flat=True)
+    assert all(Path(path).is_absolute() for path in derivatives)
+    # Runs from another directory find the same manifest entries.
+    monkeypatch.chdir(tmp_path / "data")
+    with django_assert_max_num_queries(1):
+        collect_tensor_derivatives(tmp_path / "data", max_workers=1)
+
+
+@pytest.mark.django_db
+def test_register_nifti_files(tmp_path):
+    bids_dir = create_bids_dataset(tmp_path)
+    diff = register_nifti_files(bids_dir, max_workers=1)
+    assert len(diff.added) == NIfTI.objects.count() == 3
+    dwi = NIfTI.objects.get(suffix="dwi", direction="FWD")
+    assert dwi.is_raw
+    assert dwi.datatype == "dwi"
+    assert dwi.session.bids_dir == "202202131331"
+    assert dwi.session.subject_id == 2321
+    assert dwi.shape == [8, 8, 6, 5]
+    assert dwi.voxel_sizes == [2.0, 2.0, 2.5, 3.0]
+    assert dwi.dtype == "int16"
+    assert len(dwi.affine) == 4
+    # Empty files are registered without header data.
+    derivative = NIfTI.objects.get(suffix="FA")
+    assert not derivative.is_raw
+    assert derivative.shape is None
+    assert not register_nifti_files(bids_dir, max_workers=1)
+
+
+@pytest.mark.django_db
+def test_register_nifti_files_sidecars(tmp_path):
+    bids_dir = create_bids_dataset(tmp_path)
+    register_nifti_files(bids_dir, max_workers=1)
+    assert NIfTI.objects.filter(phase_encoding_direction="j-").count() == 2
+    assert NIfTI.objects.filter(sidecar__InstitutionName="TAU").count() == 2
+    dwi = NIfTI.objects.get(suffix="dwi")
+    assert dwi.json_data["InstitutionName"] == "TAU"
+    dwi.json_file.write_text(json.dumps({"InstitutionName": "Sheba"}))
+    os.utime(dwi.json_file, ns=(dwi.sidecar_mtime_ns + 10**9,) * 2)
+    register_nifti_files(bids_dir, max_workers=1)
+    dwi.refresh_from_db()
+    assert dwi.get_institution() == dwi.institution_name == "Sheba"
+    assert dwi.phase_encoding_direction is None
+    dwi.json_file.unlink()
+    register_nifti_files(bids_dir, max_workers=1)
+    dwi.refresh_from_db()
+    assert dwi.sidecar == {}
+    assert dwi.sidecar_mtime_ns is None
+
+
+@pytest.mark.django_db
+def test_collect_tensor_derivatives_store(tmp_path, settings):
+    settings.DERIVATIVE_STORE_DIR = str(tmp_path / "store")
+    paths = create_derivatives(tmp_path / "data", 2)
+    table = pd.DataFrame({"FA": [0.5, 0.6]}, index=["Frontal", "Occipital"])
+    table.to_pickle(paths[0])
+    collect_tensor_derivatives(tmp_path / "data", max_workers=1, store=True)
+    # Unreadable derivatives are registered without being stored.
+    assert TensorDerivative.objects.count() == 4
+    derivative = TensorDerivative.objects.get(path=str(paths[0]))
+    assert os.path.exists(derivative.get_store_path())
+    pd.testing.assert_frame_equal(derivative.get_dataframe(), table)
+    # Changed pickles are converted again...
+    table["FA"] = [0.7, 0.8]
+    table.to_pickle(paths[0])
+    stat = paths[0].stat()
+    os.utime(paths[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    collect_tensor_derivatives(tmp_path / "data", max_workers=1, store=True)
+    stored = read_derivative_store("dipy", "Brainnetome")
+    assert list(stored["FA"]) == [0.7, 0.8]
+    # ...and removed ones are dropped from the store.
+    paths[0].unlink()
+    collect_tensor_derivatives(tmp_path / "data", max_workers=1, store=True)
+    assert not os.path.exists(derivative.get_store_path())
+    assert read_derivative_store("dipy", "Brainnetome").empty
+
+
+@pytest.mark.django_db
+def test_collect_tensor_derivatives_store_duplicates(tmp_path, settings):
+    settings.DERIVATIVE_STORE_DIR = str(tmp_path / "store")
+    paths = [create_derivatives(tmp_path / "data" / copy, 1)[0] for copy in ("a", "b")]
+    for path in paths:
+        pd.DataFrame({"FA": [0.5]}, index=["Frontal"]).to_pickle(path)
+    collect_tensor_derivatives(tmp_path / "data", max_workers=1, store=True)
+    # Duplicates of registered derivatives are never stored.
+    assert TensorDerivative.objects.filter(atlas="Brainnetome").count() == 1
+    assert len(read_derivative_store("dipy", "Brainnetome")) == 1
+
+
+@pytest.mark.django_db
+def test_collect_tensor_derivatives_index_values(tmp_path):
+    paths = create_derivatives(tmp_path, 2)
+    pd.DataFrame({"FA": [0.5, 0.6]}, index=["Frontal", "Occipital"]).to_pickle(paths[0])
+    collect_tensor_derivatives(tmp_path, max_workers=1, index_values=True)
+    assert TensorDerivative.objects.count() == 4
+    derivative = TensorDerivative.objects.get(path=str(paths[0]))
+    values = derivative.regional_values.order_by("region__name")
+    assert list(values.values_list("region__name", "value")) == [
+        ("Frontal", 0.5),
+        ("Occipital", 0.6),
+    ]
+    assert DerivativeValue.objects.count() == 2
+    # Changed pickles are indexed again...
+    pd.DataFrame({"FA": [0.7]}, index=["Frontal"]).to_pickle(paths[0])
+    stat = paths[0].stat()
+    os.utime(paths[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    collect_tensor_derivatives(tmp_path, max_workers=1, index_values=True)
+    assert list(derivative.regional_values.values_list("value", flat=True)) == [0.7]
+    # ...and lose their values once they cannot be read.
+    paths[0].write_bytes(b"corrupt")
+    os.utime(paths[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10**9))
+    collect_tensor_derivatives(tmp_path, max_workers=1, index_values=True)
+    assert not DerivativeValue.objects.exists()
+    assert TensorDerivative.objects.count() == 4
@@ -1,38 +1,544 @@
+import os
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import islice
 from pathlib import Path
+from typing import Any
 
 import tqdm
+from django.db import models
+from django.utils import timezone
 
-from neurohub.base_models.models import Session, Subject, TensorDerivative
+from neurohub.base_models.bids_entities import parse_entities
+from neurohub.base_models.derivative_store import convert_derivatives
+from neurohub.base_models.derivative_values import (
+    read_derivative_values,
+    write_derivative_values,
+)
+from neurohub.base_models.filesystem import snapshot_directory
+from neurohub.base_models.image_access import build_gzip_index
+from neurohub.base_models.models import (
+    FileManifestEntry,
+    NIfTI,
+    Session,
+    Subject,
+    TensorDerivative,
+)
+from neurohub.base_models.models.file_manifest import ManifestDiff
+from neurohub.base_models.models.nifti import (
+    HEADER_FIELDS,
+    HEADER_READ_ERRORS,
+    INDEXED_BIDS_ENTITIES,
+    SIDECAR_FIELDS,
+    get_sidecar_path,
+    read_header,
+    read_sidecar,
+)
+from neurohub.base_models.models.tensor_derivative import TENSOR_ESTIMATORS
+
+#: Number of files parsed and written to the database at once.
+DEFAULT_BATCH_SIZE: int = 1000
+
+#: Fields used to decide whether two derivatives describe the same data.
+DERIVATIVE_IDENTITY_FIELDS = (
+    "subject",
+    "session",
+    "software_used",
+    "acquisition",
+    "atlas",
+    "label",
+)
+
+#: :class:`FileManifestEntry` kind of ingested tensor derivatives.
+TENSOR_DERIVATIVE_MANIFEST_KIND: str = "tensor_derivative"
+
+#: :class:`FileManifestEntry` kind of registered NIfTI files.
+NIFTI_MANIFEST_KIND: str = "nifti"
+
+#: :class:`FileManifestEntry` kind of NIfTI JSON sidecars.
+NIFTI_SIDECAR_MANIFEST_KIND: str = "nifti_sidecar"
+
+#: File name patterns of NIfTI files.
+NIFTI_PATTERNS = ("*.nii", "*.nii.gz")
+
+#: Name of the BIDS directory holding processed (non-raw) data.
+DERIVATIVES_DIRECTORY: str = "derivatives"
+
+#: :class:`NIfTI` fields refreshed when a registered file changes.
+NIFTI_UPDATE_FIELDS = [
+    "session",
+    "is_raw",
+    *HEADER_FIELDS,
+    "entities",
+    *INDEXED_BIDS_ENTITIES,
+    "modified",
+]
+
+
+def parse_derivative_path(path: str, index_values: bool = False) -> dict:
+    """
+    Extracts the :class:`TensorDerivative` field values encoded in a
+    derivative's path. Runs inside worker processes, so it must not touch the
+    database.
+
+    Parameters
+    ----------
+    path : str
+        Derivative file path
+    index_values : bool, optional
+        Whether to also read the derivative's values, to be stored by
+        :func:`write_derivatives_batch`, by default False
+
+    Returns
+    -------
+    dict
+        Field values for a new :class:`TensorDerivative` row
+    """
+    entities = parse_entities(path)
+    estimator = Path(path).parent.name
+    fields = {
+        "path": path,
+        "software_used": estimator if estimator in TENSOR_ESTIMATORS else None,
+    }
+    for field in TensorDerivative.BIDS_ENTITY_FIELDS:
+        fields[field] = entities.get(field)
+    if index_values:
+        fields["values"] = read_derivative_values(path)
+    return fields
+
+
+def _batched(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def ensure_sessions(session_subjects: dict[str, str]) -> dict[str, Session]:
+    """
+    Creates any missing :class:`Subject` and :class:`Session` rows and claims
+    unclaimed sessions, using a fixed number of queries.
+
+    Parameters
+    ----------
+    session_subjects : dict[str, str]
+        Subject ID by session ID (BIDS labels, without prefixes)
+
+    Returns
+    -------
+    dict[str, Session]
+        Sessions by session ID
+    """
+    Subject.objects.bulk_create(
+        [
+            Subject(pylabber_id=subject_id)
+            for subject_id in set(session_subjects.values())
+        ],
+        ignore_conflicts=True,
+    )
+    Session.objects.bulk_create(
+        [
+            Session(bids_dir=session_id, subject_id=subject_id)
+            for session_id, subject_id in session_subjects.items()
+        ],
+        ignore_conflicts=True,
+    )
+    sessions = Session.objects.in_bulk(session_subjects, field_name="bids_dir")
+    unclaimed = []
+    for session_id, session in sessions.items():
+        if session.subject_id is None:
+            session.subject_id = session_subjects[session_id]
+            unclaimed.append(session)
+    Session.objects.bulk_update(unclaimed, ["subject"])
+    return sessions
+
+
+def write_derivatives_batch(
+    parsed: list[dict], store: bool = False, max_workers: int = None
+) -> int:
+    """
+    Writes a batch of parsed derivatives, along with their subjects and
+    sessions, using a fixed number of queries regardless of the batch size.
+
+    Parameters
+    ----------
+    parsed : list[dict]
+        Outputs of :func:`parse_derivative_path`; values read along with them
+        replace those stored for both new and existing derivatives
+    store : bool, optional
+        Whether to write the tables of the batch's registered derivatives to
+        the derivative store (see
+        :func:`~neurohub.base_models.derivative_store.convert_derivatives`),
+        by default False. Files skipped as duplicates have no row and are
+        never stored
+    max_workers : int, optional
+        Number of converting processes, by default the number of CPUs
+
+    Returns
+    -------
+    int
+        Number of new derivatives written
+    """
+    values = {
+        fields["path"]: fields.pop("values") for fields in parsed if "values" in fields
+    }
+    session_subjects = {
+        fields["session"]: fields["subject"]
+        for fields in parsed
+        if fields["session"] and fields["subject"]
+    }
+    subject_ids = set(session_subjects.values())
+    sessions = ensure_sessions(session_subjects)
+    existing = set(
+        TensorDerivative.objects.filter(
+            subject__in=subject_ids, session__in=session_subjects
+        ).values_list(*DERIVATIVE_IDENTITY_FIELDS)
+    )
+    # Rows conflicting on their path are skipped by the insert below, and
+    # with ignore_conflicts Django cannot tell which were, so they are
+    # excluded up front to count new rows exactly.
+    existing_paths = set(
+        TensorDerivative.objects.filter(
+            path__in=[fields["path"] for fields in parsed]
+        ).values_list("path", flat=True)
+    )
+    derivatives = []
+    for fields in parsed:
+        key = tuple(fields[field] for field in DERIVATIVE_IDENTITY_FIELDS)
+        if key in existing or fields["path"] in existing_paths:
+            continue
+        existing.add(key)
+        session = sessions.get(fields["session"])
+        derivatives.append(
+            TensorDerivative(
+                session_parent_id=session.pk if session else None, **fields
+            )
+        )
+    created = TensorDerivative.objects.bulk_create(derivatives, ignore_conflicts=True)
+    if values:
+        write_derivative_values(values)
+    if store:
+        convert_derivatives(
+            TensorDerivative.objects.filter(
+                path__in=[fields["path"] for fields in parsed]
+            ),
+            max_workers=max_workers,
+        )
+    return len(created)
+
+
+def ingest_directory(
+    kind: str,
+    model: type[models.Model],
+    base_dir: Path,
+    pattern: str | tuple[str, ...],
+    parse: Callable[[str], dict],
+    write: Callable[[list[dict]], Any],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_workers: int = None,
+    full: bool = False,
+    reparse_changed: bool = False,
+) -> ManifestDiff:
+    """
+    Ingests the files under *base_dir* that changed since the last run.
+
+    The directory tree is walked once and compared against the
+    :class:`FileManifestEntry` rows recorded by previous runs. Rows of
+    removed files are deleted, and added files are parsed in a process pool
+    and written in batches.
+
+    Parameters
+    ----------
+    kind : str
+        :class:`FileManifestEntry` kind
+    model : type[models.Model]
+        Model whose *path* field holds the ingested files
+    base_dir : Path
+        Base directory
+    pattern : str | tuple[str, ...]
+        Glob pattern(s) matched against file names
+    parse : Callable[[str], dict]
+        Picklable function parsing a single file, run in worker processes
+    write : Callable[[list[dict]], Any]
+        Function writing a batch of parsed files
+    batch_size : int, optional
+        Number of files written per batch, by default 1000
+    max_workers : int, optional
+        Number of parsing processes, by default the number of CPUs
+    full : bool, optional
+        Whether to ignore the manifest and process every file, by default
+        False
+    reparse_changed : bool, optional
+        Whether changed files are parsed and written again, or only have
+        their rows' modification time updated, by default False
+
+    Returns
+    -------
+    ManifestDiff
+        Added, changed and removed paths
+    """
+    snapshot = snapshot_directory(base_dir, pattern)
+    if full:
+        diff = ManifestDiff(added=list(snapshot), changed=[], removed=[])
+    else:
+        diff = FileManifestEntry.diff(kind, base_dir, snapshot)
+    if diff.removed:
+        model.objects.filter(path__in=diff.removed).delete()
+        FileManifestEntry.forget(diff.removed)
+    if diff.changed:
+        # Touching the rows lets anything derived from their content know it
+        # is stale, whether or not they are parsed again.
+        model.objects.filter(path__in=diff.changed).update(modified=timezone.now())
+    pending = diff.added
+    if reparse_changed:
+        pending = pending + diff.changed
+    elif diff.changed:
+        # Same path means same entities, so the rows are left as they are.
+        FileManifestEntry.record(kind, {path: snapshot[path] for path in diff.changed})
+    if not pending:
+        return diff
+    max_workers = max_workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor, tqdm.tqdm(
+        total=len(pending), unit="file"
+    ) as pbar:
+        for batch in _batched(pending, batch_size):
+            chunksize = max(1, len(batch) // (max_workers * 4))
+            parsed = list(executor.map(parse, batch, chunksize=chunksize))
+            write(parsed)
+            FileManifestEntry.record(kind, {path: snapshot[path] for path in batch})
+            pbar.update(len(batch))
+    return diff
 
 
 def collect_tensor_derivatives(
-    base_dir: Path, pattern: str = "sub-*_dseg.pickle"
+    base_dir: Path,
+    pattern: str = "sub-*_dseg.pickle",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_workers: int = None,
+    full: bool = False,
+    store: bool = False,
+    index_values: bool = False,
 ) -> None:
     """
     Collects tensor derivatives from a base directory.
 
+    Only files added, changed or removed since the last run are processed
+    (see :func:`ingest_directory`), and new derivatives are written in
+    batches (see :func:`write_derivatives_batch`).
+
     Parameters
     ----------
     base_dir : Path
         Base directory
     pattern : str, optional
         Glob pattern, by default "sub-*_dseg.pickle"
+    batch_size : int, optional
+        Number of files written per batch, by default 1000
+    max_workers : int, optional
+        Number of parsing processes, by default the number of CPUs
+    full : bool, optional
+        Whether to ignore the manifest and process every file, by default
+        False
+    store : bool, optional
+        Whether to write the tables of new and changed derivatives to the
+        derivative store, by default False
+    index_values : bool, optional
+        Whether to store the values of new and changed derivatives in the
+        normalized value table (see
+        :mod:`~neurohub.base_models.derivative_values`), by default False
+    """
+    base_dir = Path(base_dir).resolve()
+    ingest_directory(
+        TENSOR_DERIVATIVE_MANIFEST_KIND,
+        TensorDerivative,
+        base_dir,
+        pattern,
+        parse=partial(parse_derivative_path, index_values=index_values),
+        write=partial(write_derivatives_batch, store=store, max_workers=max_workers),
+        batch_size=batch_size,
+        max_workers=max_workers,
+        full=full,
+        # Changed pickles must be converted and indexed again.
+        reparse_changed=store or index_values,
+    )
+
+
+def parse_nifti_file(path: str, bids_dir: str, gzip_index: bool = False) -> dict:
+    """
+    Extracts the :class:`NIfTI` field values of a file from its header and
+    path. Runs inside worker processes, so it must not touch the database.
+
+    Parameters
+    ----------
+    path : str
+        *.nii* file path
+    bids_dir : str
+        Root of the BIDS dataset the file belongs to
+    gzip_index : bool, optional
+        Whether to build a gzip seek index for compressed 4D files, by default
+        False
+
+    Returns
+    -------
+    dict
+        Field values for a :class:`NIfTI` row
+    """
+    entities = parse_entities(path)
+    fields = {
+        "path": path,
+        "is_raw": DERIVATIVES_DIRECTORY not in Path(path).relative_to(bids_dir).parts,
+        "entities": entities,
+    }
+    try:
+        fields.update(read_header(path))
+    except HEADER_READ_ERRORS:
+        # Unreadable files are still registered, just without header data.
+        pass
+    else:
+        if gzip_index and path.endswith(".gz") and len(fields["shape"]) > 3:
+            build_gzip_index(path)
+    for entity in INDEXED_BIDS_ENTITIES:
+        fields[entity] = entities.get(entity)
+    return fields
+
+
+def write_niftis_batch(parsed: list[dict]) -> None:
+    """
+    Inserts or updates a batch of parsed NIfTI files, linking each to its
+    session, using a fixed number of queries regardless of the batch size.
+
+    Parameters
+    ----------
+    parsed : list[dict]
+        Outputs of :func:`parse_nifti_file`
+    """
+    session_subjects = {
+        fields["entities"]["session"]: fields["entities"]["subject"]
+        for fields in parsed
+        if "session" in fields["entities"] and "subject" in fields["entities"]
+    }
+    sessions = ensure_sessions(session_subjects)
+    niftis = []
+    for fields in parsed:
+        session = sessions.get(fields["entities"].get("session"))
+        niftis.append(NIfTI(session=session, **fields))
+    NIfTI.objects.bulk_create(
+        niftis,
+        update_conflicts=True,
+        unique_fields=["path"],
+        update_fields=NIFTI_UPDATE_FIELDS,
+    )
+
+
+def register_nifti_files(
+    bids_dir: Path,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_workers: int = None,
+    full: bool = False,
+    gzip_index: bool = False,
+) -> ManifestDiff:
+    """
+    Registers every *.nii* and *.nii.gz* file in a BIDS dataset as a
+    :class:`NIfTI` row, reading headers in a process pool. Only files added,
+    changed or removed since the last run are processed.
+
+    Parameters
+    ----------
+    bids_dir : Path
+        Root of the BIDS dataset
+    batch_size : int, optional
+        Number of files written per batch, by default 1000
+    max_workers : int, optional
+        Number of header reading processes, by default the number of CPUs
+    full : bool, optional
+        Whether to ignore the manifest and process every file, by default
+        False
+    gzip_index : bool, optional
+        Whether to build gzip seek indices for compressed 4D files (see
+        :func:`~neurohub.base_models.image_access.build_gzip_index`), by
+        default False
+
+    Returns
+    -------
+    ManifestDiff
+        Added, changed and removed paths
+    """
+    bids_dir = Path(bids_dir).resolve()
+    diff = ingest_directory(
+        NIFTI_MANIFEST_KIND,
+        NIfTI,
+        bids_dir,
+        NIFTI_PATTERNS,
+        parse=partial(parse_nifti_file, bids_dir=str(bids_dir), gzip_index=gzip_index),
+        write=write_niftis_batch,
+        batch_size=batch_size,
+        max_workers=max_workers,
+        full=full,
+        reparse_changed=True,
+    )
+    sync_nifti_sidecars(
+        bids_dir, registered=diff.added, batch_size=batch_size, full=full
+    )
+    return diff
+
+
+def sync_nifti_sidecars(
+    bids_dir: Path,
+    registered: Iterable[str] = (),
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    full: bool = False,
+) -> ManifestDiff:
+    """
+    Stores the JSON sidecars that were added, changed or removed since the
+    last run in the sidecar fields of their :class:`NIfTI` rows.
+
+    Parameters
+    ----------
+    bids_dir : Path
+        Root of the BIDS dataset
+    registered : Iterable[str], optional
+        Paths of newly registered NIfTI files, whose sidecars are read even if
+        they did not change
+    batch_size : int, optional
+        Number of sidecars written per batch, by default 1000
+    full : bool, optional
+        Whether to ignore the manifest and read every sidecar, by default
+        False
+
+    Returns
+    -------
+    ManifestDiff
+        Added, changed and removed sidecar paths
     """
-    paths = len(list(base_dir.rglob(pattern)))
-    with tqdm.tqdm(total=paths) as pbar:
-        for path in base_dir.rglob(pattern):
-            tensor, created = TensorDerivative.objects.get_or_create(path=path)
-            tensor.software_used = tensor.get_estimator()
-            tensor.set_bids_entities_as_properties()
-            if created and tensor.is_unique_derivative():
-                tensor.save()
-                session_id = tensor.bids_entities.get("session")
-                subject_id = tensor.bids_entities.get("subject")
-                subject, _ = Subject.objects.get_or_create(pylabber_id=subject_id)
-                session, _ = Session.objects.get_or_create(bids_dir=session_id)
-                session.subject = subject
-                session.save()
-            pbar.update(1)
+    snapshot = snapshot_directory(bids_dir, "*.json")
+    if full:
+        diff = ManifestDiff(added=list(snapshot), changed=[], removed=[])
+    else:
+        diff = FileManifestEntry.diff(NIFTI_SIDECAR_MANIFEST_KIND, bids_dir, snapshot)
+    pending = {*diff.added, *diff.changed, *diff.removed}
+    for nifti_path in registered:
+        json_path = str(get_sidecar_path(nifti_path))
+        if json_path in snapshot:
+            pending.add(json_path)
+    with ThreadPoolExecutor() as executor:
+        for batch in _batched(sorted(pending), batch_size):
+            candidates = [
+                json_path[: -len(".json")] + extension
+                for json_path in batch
+                for extension in (".nii", ".nii.gz")
+            ]
+            niftis = list(NIfTI.objects.filter(path__in=candidates))
+            json_paths = [str(nifti.json_file) for nifti in niftis]
+            for nifti, fields in zip(niftis, executor.map(read_sidecar, json_paths)):
+                for field, value in fields.items():
+                    setattr(nifti, field, value)
+            NIfTI.objects.bulk_update(niftis, SIDECAR_FIELDS)
+    FileManifestEntry.forget(diff.removed)
+    FileManifestEntry.record(
+        NIFTI_SIDECAR_MANIFEST_KIND,
+        {path: snapshot[path] for path in (*diff.added, *diff.changed)},
+    )
+    return diff
 
 
 def associate_sessions_to_studies() -> None: